@@ -159,8 +159,16 @@ rrsp_adjustment = 0.05
 # Simulation code, you shouldn't normally need to modify this.
 
 
+# Remembers the last solution between runs of this cell, so that after changing an input, the simulation is re-solved starting from
+# the last solution rather than from scratch, and optimized again starting from the last optimized values. To reuse the last optimized
+# values as they are without optimizing (much faster, but possibly less optimal), set solution_memory.should_reuse_optimized_values =
+# True. To start from scratch, call solution_memory.clear().
+if "solution_memory" not in globals():
+    solution_memory = solve.Solution_Memory()
+
 optimize = solve.Optimizing_Solver(solve.binary_solver, should_invert=True)
 optimize.is_optimization_disabled = not should_optimize
+optimize.memory = solution_memory
 simulation.set_solver(optimize.solve)
 
 ruleset = couple_rulesets.charlie(
@@ -224,6 +232,14 @@ if not simulation.was_solution_found:
 else:
     display(with_colour("Solution found.", "green"))
 
+if solution_memory.was_warm_started:
+    display(
+        with_colour(
+            f"Re-solved from the last solution with {solution_memory.evaluation_count} model evaluations ({solution_memory.evaluations_saved} fewer than from scratch).",
+            "black",
+        )
+    )
+
 display(br())
 
 presenter = present.Dual_Income_Simulation_Presenter(simulation)
@@ -0,0 +1,171 @@
+"""
+Batch runner, which solves a JSON-lines file of scenarios (see scenario.py) on a pool of worker processes.
+
+Each input line is a scenario payload. Lines without a 'type' are taken to be 'Dual_Income_Simulation' payloads, ie the equivalent
+of the notebook's partner1/partner2/simulation configuration for couple_rulesets.charlie().
+
+One line is written (and flushed) to the output file per scenario, as soon as it's solved, so output is in order of completion rather
+than input order, and an interrupted batch keeps the results of the scenarios solved so far. Each output line holds the scenario's
+results (see scenario.get_results()) along with the 'line' number of the scenario in the input file. Scenarios with no solution, and
+lines which couldn't be run at all, are also recorded in the failure file, with their 'line' number and either their 'run_message'
+or an 'error'.
+
+Input is read only as fast as workers become free, and only the results of scenarios being solved are held in memory, so files of any
+length can be processed.
+
+Run from the repository root with:
+    python -m batch scenarios.jsonl results.jsonl --failures failures.jsonl
+"""
+
+import argparse
+import concurrent.futures
+import json
+import multiprocessing
+import os
+import sys
+import threading
+import scenario
+
+
+def run_batch(
+    input_lines,
+    output_file,
+    failure_file,
+    executor: concurrent.futures.Executor,
+    max_in_flight: int,
+):
+    """
+    Solves the scenarios in a sequence of JSON lines on an executor, writing results as they complete.
+
+    :param input_lines: Iterable of JSON lines, each a scenario payload. Blank lines are skipped.
+    :param output_file: Text file to write a line of results to for each scenario.
+    :param failure_file: Text file to write a line to for each scenario which has no solution or couldn't be run. May be None.
+    :param executor: The executor to solve scenarios on.
+    :param max_in_flight: The maximum number of scenarios submitted to the executor at once. Should be at least the number of
+        workers, so that workers don't wait for new scenarios.
+    :return: A tuple of (number of scenarios, number of failures).
+    """
+    # Results are written by the callbacks of their futures, as soon as they complete, so writes are serialized by the condition,
+    # which also lets the main thread wait for slots and for the last writes
+    condition = threading.Condition()
+    scenario_count = 0
+    written_count = 0
+    failure_count = 0
+    errors = []
+
+    def write_result(future):
+        nonlocal written_count, failure_count
+        with condition:
+            try:
+                output_line, failure_line = future.result()
+                if output_line is not None:
+                    output_file.write(output_line)
+                    output_file.flush()
+                if failure_line is not None:
+                    failure_count += 1
+                    if failure_file is not None:
+                        failure_file.write(failure_line)
+                        failure_file.flush()
+            except Exception as e:
+                # Raised by the main thread, since exceptions in callbacks are only logged
+                errors.append(e)
+            finally:
+                written_count += 1
+                condition.notify_all()
+
+    def wait_for_writes(max_unwritten: int):
+        with condition:
+            condition.wait_for(
+                lambda: len(errors) > 0
+                or scenario_count - written_count <= max_unwritten
+            )
+            if len(errors) > 0:
+                raise errors[0]
+
+    for line_number, line in enumerate(input_lines, 1):
+        if line.strip() == "":
+            continue
+        wait_for_writes(max_in_flight - 1)
+        scenario_count += 1
+        executor.submit(_run_line, line_number, line).add_done_callback(write_result)
+
+    wait_for_writes(0)
+    return scenario_count, failure_count
+
+
+def _run_line(line_number: int, line: str):
+    """
+    Solves the scenario on one input line, and returns a tuple of (output line, failure line), either of which may be None.
+    Parsing and serialization are done here, in the worker, so that the main process only does I/O.
+    """
+    try:
+        payload = json.loads(line)
+        if isinstance(payload, dict):
+            payload.setdefault("type", scenario.DUAL_INCOME_SIMULATION)
+        results = scenario.run(payload)
+    except Exception as e:
+        return None, _to_json_line(
+            {"line": line_number, "error": f"{type(e).__name__}: {e}"}
+        )
+
+    failure_line = None
+    if not results["was_solution_found"]:
+        failure_line = _to_json_line(
+            {"line": line_number, "run_message": results["run_message"]}
+        )
+    return _to_json_line({"line": line_number, **results}), failure_line
+
+
+def _to_json_line(value):
+    return json.dumps(value) + "\n"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("input", help="JSON-lines file of scenarios, or - for stdin")
+    parser.add_argument("output", help="JSON-lines file to write results to")
+    parser.add_argument(
+        "--failures",
+        help="JSON-lines file to record scenarios with no solution in",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes, defaults to the number of CPUs",
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=None,
+        help="Maximum number of scenarios submitted to workers at once, defaults to twice the number of workers",
+    )
+    args = parser.parse_args(argv)
+
+    input_file = sys.stdin if args.input == "-" else open(args.input)
+    failure_file = open(args.failures, "w") if args.failures else None
+    try:
+        with open(args.output, "w") as output_file:
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=args.workers,
+                mp_context=multiprocessing.get_context("forkserver"),
+            ) as executor:
+                scenario_count, failure_count = run_batch(
+                    input_file,
+                    output_file,
+                    failure_file,
+                    executor,
+                    args.max_in_flight or 2 * args.workers,
+                )
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if failure_file is not None:
+            failure_file.close()
+
+    print(f"Ran {scenario_count} scenarios, {failure_count} failed", file=sys.stderr)
+    return 0 if failure_count == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
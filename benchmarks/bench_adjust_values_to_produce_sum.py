@@ -0,0 +1,109 @@
+"""
+Benchmark for couple_savings_rules._adjust_values_to_produce_sum.
+
+Compares the water-filling implementation against the previous incremental implementation (reproduced below for reference) on
+near-tie inputs, where the rooms of the values differ only by a tiny amount and the incremental implementation needed one pass per
+distinct room. Checks that both produce the same result, and that the water-filling implementation never takes longer.
+
+Run from the repository root with:
+    python -m benchmarks.bench_adjust_values_to_produce_sum
+"""
+
+import math
+import random
+import sys
+import timeit
+
+import couple_savings_rules
+from loop_utils import Loop_Protection
+
+
+def _incremental_adjust_values_to_produce_sum(values_and_limits, target_sum: float):
+    """The previous implementation, which raises all values with remaining room by repeated small equal increments."""
+    TOLERANCE = 1e-6
+
+    def values_sum():
+        return sum([x[0] for x in values_and_limits])
+
+    if values_sum() > target_sum + TOLERANCE:
+        raise ValueError
+
+    lp = Loop_Protection()
+    while (shortfall := target_sum - values_sum()) > TOLERANCE:
+        lp.iterate()
+        increase_rooms = [x[1] - x[0] for x in values_and_limits]
+        incrs_with_room = [x for x in increase_rooms if x > TOLERANCE]
+        if len(incrs_with_room) == 0:
+            i_last = len(values_and_limits) - 1
+            current_last = values_and_limits[i_last]
+            values_and_limits[i_last] = (current_last[0] + shortfall, current_last[1])
+            break
+        valid_incr = min(incrs_with_room)
+        valid_incr = min(valid_incr, shortfall / len(incrs_with_room))
+        values_and_limits = [
+            (min(x[0] + valid_incr, x[1]), x[1]) for x in values_and_limits
+        ]
+
+    return values_and_limits
+
+
+def _get_near_tie_cases(count: int, size: int, seed: int = 0):
+    """
+    Inputs whose rooms are separated by gaps just above the tolerance, with a target that needs almost all of the total room, so
+    that the incremental implementation saturates only one value per pass.
+    """
+    rng = random.Random(seed)
+    cases = []
+    for _ in range(count):
+        base_room = rng.uniform(1000, 50000)
+        values_and_limits = []
+        for i in range(size):
+            value = rng.uniform(0, 20000)
+            room = base_room + i * 1e-5 * (1 + rng.random())
+            values_and_limits.append((value, value + room))
+        total_room = sum(x[1] - x[0] for x in values_and_limits)
+        target_sum = sum(x[0] for x in values_and_limits) + total_room - 1e-6 * size
+        cases.append((values_and_limits, target_sum))
+    return cases
+
+
+def _time(fn, cases, repeat: int):
+    return min(
+        timeit.repeat(
+            lambda: [fn(list(v), t) for v, t in cases], number=1, repeat=repeat
+        )
+    )
+
+
+def main():
+    is_ok = True
+    print(f"{'size':>6} {'incremental (s)':>16} {'water-filling (s)':>18} {'speed-up':>9}")
+    for size in (4, 16, 64):
+        cases = _get_near_tie_cases(count=200, size=size)
+
+        for values_and_limits, target_sum in cases:
+            expected = _incremental_adjust_values_to_produce_sum(
+                list(values_and_limits), target_sum
+            )
+            actual = couple_savings_rules._adjust_values_to_produce_sum(
+                list(values_and_limits), target_sum
+            )
+            for (expected_value, _), (actual_value, _) in zip(expected, actual):
+                if not math.isclose(expected_value, actual_value, abs_tol=1e-4):
+                    print(f"Mismatch: {expected_value} vs {actual_value}")
+                    is_ok = False
+
+        incremental = _time(_incremental_adjust_values_to_produce_sum, cases, 3)
+        water_filling = _time(couple_savings_rules._adjust_values_to_produce_sum, cases, 3)
+        print(
+            f"{size:>6} {incremental:>16.4f} {water_filling:>18.4f} {incremental / water_filling:>8.1f}x"
+        )
+        if water_filling > incremental:
+            print("Water-filling implementation is slower than the incremental implementation")
+            is_ok = False
+
+    return 0 if is_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,106 @@
+"""
+Benchmark for the throughput of the charlie array kernel (charlie_kernel.py).
+
+Runs a household scenario at a sweep of initial spendings, first one run at a time with sim.Dual_Income_Simulation_Run, then as
+batches of increasing size with the kernel. Then solves a roster of variants of the scenario, which differ in retirement ages and
+salary growth, first one at a time with scenario.Scenario_Spec.run(), then in lock-step with Charlie_Kernel.solve(). Checks that both
+produce the same results, and reports the time taken by each.
+
+Run from the repository root with:
+    python -m benchmarks.bench_charlie_kernel
+"""
+
+import itertools
+import sys
+import time
+
+import numpy
+
+import charlie_kernel
+import scenario
+import sim
+from tests.test_scenario import _get_dual_income_payload
+
+_BATCH_SIZES = (1, 10, 100, 1000, 10000)
+_REFERENCE_RUNS = 200
+
+
+def _get_roster(spec: scenario.Scenario_Spec):
+    return [
+        spec.variant(
+            {
+                "partner1": {
+                    "age_at_retirement": age1,
+                    "salary_compound_rate": rate,
+                },
+                "partner2": {"age_at_retirement": age2},
+            }
+        )
+        for age1, age2, rate in itertools.product(
+            range(55, 71, 2), range(55, 71, 4), (0.02, 0.05)
+        )
+    ]
+
+
+def main():
+    spec = scenario.compile_spec(_get_dual_income_payload())
+    simulation = spec.build().simulation
+    # Solving sets the optimized variables to their initial guesses, so that the simulation can then be run at any spending
+    simulation.run()
+    schedule = simulation._get_exogenous_schedule()
+
+    initial_spendings = numpy.linspace(10000, 90000, _REFERENCE_RUNS)
+    expected = []
+    start = time.perf_counter()
+    for initial_spending in initial_spendings:
+        run = sim.Dual_Income_Simulation_Run(simulation, initial_spending, schedule)
+        run.run()
+        expected.append(run.final_funds.total_savings)
+    per_run = (time.perf_counter() - start) / _REFERENCE_RUNS
+
+    start = time.perf_counter()
+    kernel = charlie_kernel.compile_kernel([spec])
+    print(f"Compile:       {(time.perf_counter() - start) * 1e3:.3f} ms")
+
+    is_ok = True
+    if not numpy.allclose(kernel.run(initial_spendings), expected, rtol=1e-9):
+        print("Mismatch in final savings")
+        is_ok = False
+
+    print(f"Rules:         {per_run * 1e6:.1f} us per run")
+    for batch_size in _BATCH_SIZES:
+        batch = numpy.linspace(10000, 90000, batch_size)
+        start = time.perf_counter()
+        kernel.run(batch)
+        kernel_per_run = (time.perf_counter() - start) / batch_size
+        print(
+            f"Kernel x{batch_size:<6} {kernel_per_run * 1e6:.1f} us per run ({per_run / kernel_per_run:.1f}x)"
+        )
+
+    roster = _get_roster(spec)
+    start = time.perf_counter()
+    expected = [variant.run() for variant in roster]
+    from_rules = time.perf_counter() - start
+    start = time.perf_counter()
+    outcomes = charlie_kernel.compile_kernel(roster).solve()
+    from_kernel = time.perf_counter() - start
+    for results, outcome in zip(expected, outcomes):
+        if outcome["run_message"] != results["run_message"] or not numpy.isclose(
+            outcome["required_initial_spending"],
+            results["required_initial_spending"],
+            rtol=1e-9,
+        ):
+            print(f"Mismatch in solution: {outcome}")
+            is_ok = False
+
+    print(f"{len(roster)} solves")
+    print(f"Rules:         {from_rules:.3f} s")
+    print(
+        f"Kernel:        {from_kernel:.3f} s, including compilation ({from_rules / from_kernel:.1f}x)"
+    )
+
+    return 0 if is_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
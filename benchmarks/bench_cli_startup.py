@@ -0,0 +1,66 @@
+"""
+Benchmark for the startup time of the command-line entry point (cli.py).
+
+Times a fresh interpreter importing cli, which is everything the CLI does before reading its scenario, and checks that the import
+doesn't load IPython, matplotlib or scipy. Fails (exit code 1) if the best time exceeds the budget, so it can be enforced by scheduled
+jobs.
+
+Run from the repository root with:
+    python -m benchmarks.bench_cli_startup --budget 0.5
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+SLOW_MODULES = ["IPython", "matplotlib", "scipy"]
+
+DEFAULT_BUDGET = 0.5
+
+
+def _time_import(module: str):
+    """Returns the wall-clock time for a fresh interpreter to import a module, and the slow modules it loaded."""
+    code = (
+        f"import sys, json, {module}; "
+        f"print(json.dumps([m for m in {SLOW_MODULES!r} if m in sys.modules]))"
+    )
+    start = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    ).stdout
+    return time.perf_counter() - start, json.loads(output)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=DEFAULT_BUDGET,
+        help=f"Maximum allowed startup time in seconds, defaults to {DEFAULT_BUDGET}",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    is_ok = True
+    interpreter_times = [_time_import("os")[0] for _ in range(args.repeat)]
+    cli_results = [_time_import("cli") for _ in range(args.repeat)]
+    cli_time = min(t for t, _ in cli_results)
+    loaded_modules = cli_results[0][1]
+
+    print(f"Interpreter startup: {min(interpreter_times):.3f} s")
+    print(f"CLI startup:         {cli_time:.3f} s (budget {args.budget:.3f} s)")
+    if len(loaded_modules) > 0:
+        print(f"CLI startup loads slow modules: {', '.join(loaded_modules)}")
+        is_ok = False
+    if cli_time > args.budget:
+        print("CLI startup exceeds budget")
+        is_ok = False
+
+    return 0 if is_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Benchmark for the setup cost of scenario variants (scenario.Scenario_Spec.variant()).
+
+Sets up simulations for a sweep of variants of a household scenario, which differ in retirement ages and salary growth, first by
+compiling each variant's payload from scratch, then by deriving the variants from one compiled spec, which shares unchanged rules
+between them. Setup includes building the simulation and its schedule of rules, which is everything done before the first run.
+Checks that both produce the same schedules, and that deriving variants never takes longer.
+
+Run from the repository root with:
+    python -m benchmarks.bench_scenario_variants
+"""
+
+import copy
+import itertools
+import sys
+import time
+
+import scenario
+from tests.test_scenario import _get_dual_income_payload
+
+
+def _get_changes():
+    return [
+        {
+            "partner1": {
+                "age_at_retirement": age1,
+                "salary_compound_rate": rate,
+            },
+            "partner2": {"age_at_retirement": age2},
+        }
+        for age1, age2, rate in itertools.product(
+            range(55, 71), range(55, 71), (0.02, 0.03, 0.04, 0.05)
+        )
+    ]
+
+
+def _get_payload(changes):
+    payload = copy.deepcopy(_get_dual_income_payload())
+    for section, fields in changes.items():
+        payload[section].update(fields)
+    return payload
+
+
+def _set_up(spec: scenario.Scenario_Spec):
+    simulation = spec.build().simulation
+    return simulation._get_exogenous_schedule()
+
+
+def main():
+    all_changes = _get_changes()
+    payloads = [_get_payload(changes) for changes in all_changes]
+
+    start = time.perf_counter()
+    schedules = [_set_up(scenario.compile_spec(payload)) for payload in payloads]
+    from_payloads = time.perf_counter() - start
+
+    start = time.perf_counter()
+    spec = scenario.compile_spec(_get_dual_income_payload())
+    variant_schedules = [_set_up(spec.variant(changes)) for changes in all_changes]
+    from_variants = time.perf_counter() - start
+
+    is_ok = True
+    for schedule, variant_schedule in zip(schedules, variant_schedules):
+        for (deltas, rules), (variant_deltas, variant_rules) in zip(
+            schedule, variant_schedule
+        ):
+            if vars(deltas.partner1_deltas) != vars(
+                variant_deltas.partner1_deltas
+            ) or vars(deltas.partner2_deltas) != vars(variant_deltas.partner2_deltas):
+                print(f"Mismatch in precomputed deltas for {deltas.year}")
+                is_ok = False
+            if len(rules) != len(variant_rules):
+                print(f"Mismatch in rules for {deltas.year}")
+                is_ok = False
+
+    count = len(all_changes)
+    print(f"{count} variants")
+    print(
+        f"From payloads: {from_payloads:.3f} s ({from_payloads / count * 1e3:.3f} ms each)"
+    )
+    print(
+        f"From variants: {from_variants:.3f} s ({from_variants / count * 1e3:.3f} ms each)"
+    )
+    print(f"Speed-up:      {from_payloads / from_variants:.1f}x")
+    if from_variants > from_payloads:
+        print("Deriving variants is slower than compiling payloads")
+        is_ok = False
+
+    return 0 if is_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
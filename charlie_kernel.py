@@ -0,0 +1,833 @@
+"""
+Array kernel for couple_rulesets.charlie(), which runs a batch of dual-income simulations at once.
+
+A 'Dual_Income_Simulation' scenario (see scenario.py) is simulated by applying charlie's rules to immutable deltas and funds states,
+one year and one rule at a time. This is flexible, but most of the cost of a run is in the Python overhead of the rules rather than in
+their arithmetic. The kernel instead runs every year of B simulations together, as NumPy operations over arrays shaped (B,) for
+household values and (B, 2) for the values of each partner. The B simulations can be B households, B initial spendings of one
+household, or both.
+
+The kernel implements the same rules as the ruleset: tax and the following year's refund, investment interest, TFSA and RRSP room,
+salary, Quebec Pension Plan contributions and benefits, mortgage payments, the increasing_savings_increasing_spending spending rule,
+the split_by_investment_then_partner_with_limits savings rule, and employer RRSP matching. The outputs of the rules which are the same
+in every run (eg salaries, pension contributions and mortgage payments) aren't reimplemented: they're read from each simulation's
+precomputed schedule (see sim.Dual_Income_Simulation._get_exogenous_schedule()). The results match sim.Dual_Income_Simulation_Run up
+to floating-point rounding, with two differences in degenerate cases:
+    - Inverted clamp bounds (eg withdrawing from an overdrawn RRSP), which fail an assertion in the rules, are tolerated.
+    - If there's no spendable net income in the first year, the spending rule's savings weight isn't adjusted, whereas the rule keeps
+        the adjustment from its previous run.
+
+Optimized variables (eg 'initial_non_rrsp') take the values of the scenario's settings, as they do when optimization is disabled,
+unless other values are given to the runs (eg the optimizer's current values, see Charlie_Kernel.get_k_section_solver()).
+"""
+
+import numpy
+import scenario
+import solve
+import tax
+
+# Fields recorded by Charlie_Kernel.get_history(), named as in rule_dependencies
+_PARTNER_DELTAS_FIELDS = [
+    "gross_salary",
+    "contributions",
+    "benefits",
+    "tax",
+    "rrsp",
+    "tfsa",
+    "unregistered",
+    "rrsp_interest",
+    "tfsa_interest",
+    "unregistered_interest",
+    "tax_refund",
+    "tfsa_available_room",
+    "rrsp_available_room",
+]
+_PARTNER_FUNDS_FIELDS = [
+    "rrsp_savings",
+    "tfsa_savings",
+    "unregistered_savings",
+    "tfsa_available_room",
+    "rrsp_available_room",
+]
+_HOUSEHOLD_DELTAS_FIELDS = ["household_spending", "household_debt_payments"]
+
+# Precomputed fields of the exogenous schedule
+_EXOGENOUS_PARTNER_FIELDS = [
+    "gross_salary",
+    "contributions",
+    "benefits",
+    "tfsa_available_room",
+    "rrsp_available_room",
+]
+
+# Settings and partner fields read by the endogenous rules
+_SETTINGS_PARAMETERS = [
+    "interest_rate",
+    "increase_savings_weight",
+    "initial_non_rrsp",
+    "final_non_rrsp",
+    "initial_equalize_income_weighting",
+    "final_equalize_income_weighting",
+    "rrsp_adjustment",
+]
+# The settings of the optimized variables of the ruleset, which runs can override
+_OPTIMIZED_PARAMETERS = {
+    "initial_non_rrsp",
+    "final_non_rrsp",
+    "initial_equalize_income_weighting",
+    "final_equalize_income_weighting",
+    "rrsp_adjustment",
+}
+_YEAR_PARAMETERS = {"initial_year", "final_year", "year_of_retirement"}
+_PARTNER_PARAMETERS = [
+    "initial_savings_rrsp",
+    "initial_savings_tfsa",
+    "initial_savings_unregistered",
+    "initial_tfsa_limit",
+    "initial_rrsp_limit",
+    "rrsp_matching_cap_fraction",
+]
+
+# The edge region of the savings weight adjustment of the spending rule, see
+# couple_spending_rules.get_increasing_savings_increasing_spending()
+_EDGE_REGION = 0.05
+
+# See couple_savings_rules._adjust_values_to_produce_sum()
+_TOLERANCE = 1e-6
+
+
+class Charlie_Kernel:
+    """
+    A batch of 'Dual_Income_Simulation' scenarios compiled for the kernel. See compile_kernel().
+    """
+
+    def __init__(self, parameters, exogenous, steps):
+        self._parameters = parameters
+        self._exogenous = exogenous
+        self._steps = steps
+
+    def __len__(self):
+        """The number of compiled scenarios."""
+        return len(self._steps)
+
+    def run(self, initial_spending, scenarios=None, optimized_values=None):
+        """
+        Runs the compiled scenarios, and returns the final total savings of each run.
+
+        :param initial_spending: The initial spending, as a number or an array shaped (B,). It's broadcast against the compiled
+            scenarios, so there can be one spending per scenario, one spending for all scenarios, or B spendings of a single scenario.
+        :param scenarios: Optional array of the indices of the compiled scenarios to run, which the initial spending is broadcast
+            against instead of all of them (eg the scenarios which are still being solved).
+        :param optimized_values: Optional dict of values of the optimized variables (eg 'initial_non_rrsp') to run with, instead of
+            the values of the scenarios' settings. Each value is a number or an array, which is broadcast against the runs.
+        :return: An array shaped (B,) of the final total savings of the runs.
+        """
+        funds = self._run(initial_spending, None, scenarios, optimized_values)
+        return (
+            funds["rrsp_savings"][:, 0]
+            + funds["tfsa_savings"][:, 0]
+            + funds["unregistered_savings"][:, 0]
+        ) + (
+            funds["rrsp_savings"][:, 1]
+            + funds["tfsa_savings"][:, 1]
+            + funds["unregistered_savings"][:, 1]
+        )
+
+    def get_history(self, initial_spending):
+        """
+        Runs the compiled scenarios, and returns the deltas and funds of every year of the runs.
+
+        :param initial_spending: The initial spending, see run().
+        :return: A dict of arrays, keyed by field name as in rule_dependencies (eg 'deltas.gross_salary', 'funds.rrsp_savings',
+            'deltas.household_spending'), with a row for each year of the longest run, starting from the initial year. Partner
+            values are shaped (years, B, 2), and household values (years, B). Shorter runs keep their final values in later years.
+        """
+        history = {}
+        self._run(initial_spending, history)
+        return {name: numpy.array(rows) for name, rows in history.items()}
+
+    def get_k_section_solver(
+        self, optimizer: solve.Optimizing_Solver, interior_point_count: int = 15
+    ):
+        """
+        Returns a k-section solver (see solve.get_k_section_solver()) for the single compiled scenario, which runs the interior points
+        of each iteration as lanes of one batch of the kernel. It replaces the inner solver of the scenario's optimizer
+        (solve.Optimizing_Solver.inner_solver), and only the solution is then run by the rules. The lanes run with the optimized
+        variables at the optimizer's current values, so the scenario can be optimized.
+
+        :param optimizer: The optimizer of the scenario, whose inner solver the solver replaces.
+        :param interior_point_count: The number of spendings run per iteration, defaults to 15
+        :return: A solver with the same signature as solve.binary_solver.
+        """
+        if len(self) != 1:
+            raise ValueError(
+                f"A k-section solver needs a kernel of a single scenario, not {len(self)}"
+            )
+
+        def evaluate_inputs(intermediate_fn, model_fn, inputs):
+            return self.run(
+                numpy.array(inputs),
+                optimized_values=dict(optimizer.get_all_current_values()),
+            )
+
+        return solve.get_k_section_solver(interior_point_count, evaluate_inputs)
+
+    def solve(self, tolerance: float = 0.001, brackets=None):
+        """
+        Solves the required initial spending of each compiled scenario, ie the initial spending whose run ends with the scenario's
+        final savings.
+
+        Each scenario is solved as by solve.binary_solver(), between 0 and the initial combined salary, as in
+        sim.Dual_Income_Simulation.run(). The bisections of all of the scenarios proceed in lock-step: each iteration runs the next
+        guess of every unsolved scenario as one batch, so the overhead of the kernel is paid once per year of the batch, rather than
+        once per scenario. Solved scenarios drop out of the batch, and the batch only runs until the final year of its longest
+        remaining scenario.
+
+        :param tolerance: The allowable deviation from the final savings of the final savings of the solution.
+        :param brackets: Optional list with a (lower, upper) bracket of the required initial spending of each scenario, or None for
+            scenarios without one (eg between the solutions of neighbouring scenarios). As with solve.get_bracketed_solver(), a
+            scenario is searched only within its bracket if the bracket holds its final savings, and otherwise within the full range.
+        :return: A JSON-compatible list with the outcome of each scenario, in order, with its 'required_initial_spending',
+            'was_solution_found' and 'run_message'.
+        """
+        count = len(self)
+        target = self._parameters["final_savings"]
+        initial_upper_bound = (
+            self._parameters["initial_salary"][:, 0]
+            + self._parameters["initial_salary"][:, 1]
+        )
+        outcomes = [None] * count
+        for i in range(count):
+            if initial_upper_bound[i] == 0:
+                outcomes[i] = _get_outcome(
+                    -1,
+                    False,
+                    f"Lower bound (0) and upper bound ({initial_upper_bound[i]}) are identical.",
+                )
+
+        lower_bound = numpy.zeros(count)
+        upper_bound = initial_upper_bound.copy()
+        lower_bound_output = numpy.zeros(count)
+        upper_bound_output = numpy.zeros(count)
+        is_bracketed = numpy.zeros(count, dtype=bool)
+        # The brackets which overlap the full range are searched first
+        bracketed = numpy.array(
+            [
+                i
+                for i, bracket in enumerate(brackets or [None] * count)
+                if outcomes[i] is None
+                and bracket is not None
+                and bracket[1] >= 0
+                and bracket[0] <= initial_upper_bound[i]
+            ],
+            dtype=int,
+        )
+        if len(bracketed) > 0:
+            # Both bounds of every bracket are run as one batch
+            bracket_lower_bound = numpy.maximum([brackets[i][0] for i in bracketed], 0)
+            bracket_upper_bound = numpy.minimum(
+                [brackets[i][1] for i in bracketed], initial_upper_bound[bracketed]
+            )
+            bracket_outputs = self.run(
+                numpy.concatenate([bracket_lower_bound, bracket_upper_bound]),
+                numpy.concatenate([bracketed, bracketed]),
+            )
+            for j, i in enumerate(bracketed):
+                lower_output = bracket_outputs[j]
+                upper_output = bracket_outputs[len(bracketed) + j]
+                is_held = (
+                    min(lower_output, upper_output)
+                    <= target[i]
+                    <= max(lower_output, upper_output)
+                )
+                if bracket_lower_bound[j] < bracket_upper_bound[j] and is_held:
+                    is_bracketed[i] = True
+                    lower_bound[i] = bracket_lower_bound[j]
+                    upper_bound[i] = bracket_upper_bound[j]
+                    lower_bound_output[i] = lower_output
+                    upper_bound_output[i] = upper_output
+
+        # Both bounds of the full range of every other scenario are run as one batch
+        unbracketed = numpy.array(
+            [i for i in range(count) if outcomes[i] is None and not is_bracketed[i]],
+            dtype=int,
+        )
+        if len(unbracketed) > 0:
+            bound_outputs = self.run(
+                numpy.concatenate(
+                    [numpy.zeros(len(unbracketed)), initial_upper_bound[unbracketed]]
+                ),
+                numpy.concatenate([unbracketed, unbracketed]),
+            )
+            lower_bound_output[unbracketed] = bound_outputs[: len(unbracketed)]
+            upper_bound_output[unbracketed] = bound_outputs[len(unbracketed) :]
+
+        for i in range(count):
+            if outcomes[i] is not None:
+                continue
+            if lower_bound_output[i] == upper_bound_output[i]:
+                outcomes[i] = _get_outcome(
+                    lower_bound[i],
+                    False,
+                    "Model outputs are equal for lower and upper input bounds. The model function should be a non-flat monotonic function. ",
+                )
+            elif not solve.is_in_range(
+                target[i], lower_bound_output[i], upper_bound_output[i], tolerance
+            ):
+                # The target can't be reached, so the bound nearest to it is returned without bisecting
+                outcomes[i] = _get_outcome(
+                    (
+                        lower_bound[i]
+                        if abs(lower_bound_output[i] - target[i])
+                        <= abs(upper_bound_output[i] - target[i])
+                        else upper_bound[i]
+                    ),
+                    False,
+                    solve.get_out_of_range_message(
+                        target[i],
+                        lower_bound[i],
+                        lower_bound_output[i],
+                        upper_bound[i],
+                        upper_bound_output[i],
+                    ),
+                )
+
+        is_increasing = upper_bound_output > lower_bound_output
+        lower_guess = numpy.where(is_increasing, lower_bound, upper_bound)
+        upper_guess = numpy.where(is_increasing, upper_bound, lower_bound)
+        eps = tolerance * 1e-5
+
+        scenarios = numpy.array(
+            [i for i, outcome in enumerate(outcomes) if outcome is None], dtype=int
+        )
+        while len(scenarios) > 0:
+            guess = (lower_guess[scenarios] + upper_guess[scenarios]) / 2
+            guess_output = self.run(guess, scenarios)
+
+            is_exhausted = (
+                numpy.abs(lower_guess[scenarios] - upper_guess[scenarios]) < eps
+            )
+            is_above = guess_output > target[scenarios]
+            upper_guess[scenarios] = numpy.where(
+                is_above, guess, upper_guess[scenarios]
+            )
+            lower_guess[scenarios] = numpy.where(
+                is_above, lower_guess[scenarios], guess
+            )
+            is_solved = numpy.abs(guess_output - target[scenarios]) <= tolerance
+
+            for i, spending, exhausted, solved in zip(
+                scenarios, guess, is_exhausted, is_solved
+            ):
+                if exhausted:
+                    # No solution found, return the last guess
+                    outcomes[i] = _get_outcome(
+                        spending, False, "Exhausted value range and no solution found"
+                    )
+                elif solved:
+                    outcomes[i] = _get_outcome(spending, True, "Success")
+            scenarios = scenarios[~(is_exhausted | is_solved)]
+
+        return outcomes
+
+    def _run(self, initial_spending, history, scenarios=None, optimized_values=None):
+        initial_spending = numpy.asarray(initial_spending, dtype=float)
+        if scenarios is None:
+            scenarios = numpy.arange(len(self))
+        shape = numpy.broadcast_shapes(initial_spending.shape, numpy.shape(scenarios))
+        index = numpy.broadcast_to(scenarios, shape)
+        parameters = {name: values[index] for name, values in self._parameters.items()}
+        for name, value in (optimized_values or {}).items():
+            if name not in _OPTIMIZED_PARAMETERS:
+                raise ValueError(f"'{name}' isn't an optimized variable of the kernel")
+            parameters[name] = numpy.broadcast_to(
+                numpy.asarray(value, dtype=float), shape
+            )
+        steps = self._steps[index]
+        is_ragged = numpy.any(steps != steps[0])
+
+        initial_year = parameters["initial_year"]
+        final_year = parameters["final_year"]
+        # The estimated year of 'functional retirement' of the savings rule
+        retirement_year = (
+            parameters["year_of_retirement"][:, 0]
+            + parameters["year_of_retirement"][:, 1]
+        ) / 2
+        interest_rate = parameters["interest_rate"][:, None]
+        unregistered_interest_rate = parameters["unregistered_interest_rate"][:, None]
+
+        gross_salary = parameters["initial_salary"]
+        deltas = {
+            "gross_salary": gross_salary,
+            "benefits": numpy.zeros(gross_salary.shape),
+            "tax": tax.get_income_taxes(gross_salary),
+            "rrsp": numpy.zeros(gross_salary.shape),
+            "unregistered_interest": numpy.zeros(gross_salary.shape),
+            "tax_refund": numpy.zeros(gross_salary.shape),
+            "household_spending": numpy.broadcast_to(initial_spending, shape),
+        }
+        funds = {
+            "rrsp_savings": parameters["initial_savings_rrsp"],
+            "tfsa_savings": parameters["initial_savings_tfsa"],
+            "unregistered_savings": parameters["initial_savings_unregistered"],
+            "tfsa_available_room": parameters["initial_tfsa_limit"]
+            - parameters["initial_savings_tfsa"],
+            "rrsp_available_room": parameters["initial_rrsp_limit"]
+            - parameters["initial_savings_rrsp"],
+        }
+        if history is not None:
+            zeros = numpy.zeros(gross_salary.shape)
+            initial_deltas = {
+                **{name: zeros for name in _PARTNER_DELTAS_FIELDS},
+                **deltas,
+                "household_debt_payments": numpy.zeros(shape),
+            }
+            _record(history, initial_deltas, funds)
+
+        weight = parameters["increase_savings_weight"]
+        for step in range(1, steps.max() + 1):
+            year = initial_year + step
+            exogenous = {
+                name: values[step - 1][index]
+                for name, values in self._exogenous.items()
+            }
+            previous_deltas = deltas
+            previous_funds = funds
+
+            # Pretax rules
+            tax_refund = previous_deltas["tax"] - tax.get_income_taxes(
+                previous_deltas["gross_salary"]
+                + previous_deltas["benefits"]
+                + previous_deltas["unregistered_interest"]
+                - previous_deltas["rrsp"]
+            )
+            rrsp_interest = previous_funds["rrsp_savings"] * interest_rate
+            tfsa_interest = previous_funds["tfsa_savings"] * interest_rate
+            unregistered_interest = (
+                previous_funds["unregistered_savings"] * unregistered_interest_rate
+            )
+            gross_salary = exogenous["gross_salary"]
+            benefits = exogenous["benefits"]
+            income_tax = tax.get_income_taxes(
+                gross_salary + benefits + unregistered_interest
+            )
+            net_income = gross_salary + benefits + tax_refund - income_tax
+            household_net_income = net_income[:, 0] + net_income[:, 1]
+
+            # Spending rule
+            previous_net_income = (
+                previous_deltas["gross_salary"]
+                + previous_deltas["benefits"]
+                + previous_deltas["tax_refund"]
+                - previous_deltas["tax"]
+            )
+            previous_spendable_net_income = (
+                previous_net_income[:, 0] + previous_net_income[:, 1]
+            ) - (previous_deltas["benefits"][:, 0] + previous_deltas["benefits"][:, 1])
+            previous_spending = previous_deltas["household_spending"]
+            has_spendable_net_income = previous_spendable_net_income > 0
+            # Without spendable net income, previous spending is kept, and the values below are discarded
+            with numpy.errstate(divide="ignore", invalid="ignore"):
+                if step == 1:
+                    initial_spending_fraction = numpy.minimum(
+                        previous_spending / previous_spendable_net_income, 1
+                    )
+                    weight = numpy.where(
+                        has_spendable_net_income,
+                        _get_maxed_or_zeroed_out(
+                            1 - initial_spending_fraction, weight, _EDGE_REGION
+                        ),
+                        weight,
+                    )
+                previous_savings_proportional = (
+                    previous_spendable_net_income - previous_spending
+                ) / previous_spendable_net_income
+                spending_ceiling = (
+                    household_net_income
+                    - previous_savings_proportional * household_net_income
+                )
+                spending = numpy.maximum(
+                    spending_ceiling * (1 - weight) + previous_spending * weight,
+                    previous_spending,
+                )
+            spending = numpy.where(
+                has_spendable_net_income, spending, previous_spending
+            )
+
+            # Savings rule
+            raw_savings = (
+                household_net_income
+                - spending
+                - (exogenous["contributions"][:, 0] + exogenous["contributions"][:, 1])
+                - exogenous["household_debt_payments"]
+            )
+            rrsp_room = (
+                previous_funds["rrsp_available_room"] + exogenous["rrsp_available_room"]
+            )
+            tfsa_room = (
+                previous_funds["tfsa_available_room"] + exogenous["tfsa_available_room"]
+            )
+            working_rrsp, working_tfsa, working_unregistered = _get_working_split(
+                parameters,
+                (year - initial_year) / (retirement_year - initial_year),
+                raw_savings,
+                gross_salary,
+                rrsp_room,
+                tfsa_room,
+            )
+            retired_rrsp, retired_tfsa = _get_retired_split(
+                parameters, final_year - year, -raw_savings, previous_funds
+            )
+            is_working = (raw_savings >= 0)[:, None]
+            rrsp = numpy.where(is_working, working_rrsp, retired_rrsp)
+            tfsa = numpy.where(is_working, working_tfsa, retired_tfsa)
+            unregistered = numpy.where(is_working, working_unregistered, 0.0)
+
+            # Post-savings rules
+            remaining_rrsp_room = rrsp_room - numpy.maximum(0, rrsp)
+            match = numpy.maximum(
+                0,
+                numpy.minimum(
+                    numpy.minimum(
+                        rrsp, parameters["rrsp_matching_cap_fraction"] * gross_salary
+                    ),
+                    remaining_rrsp_room,
+                ),
+            )
+            rrsp = rrsp + match
+            benefits = benefits + match
+
+            deltas = {
+                "gross_salary": gross_salary,
+                "benefits": benefits,
+                "tax": income_tax,
+                "rrsp": rrsp,
+                "unregistered_interest": unregistered_interest,
+                "tax_refund": tax_refund,
+                "household_spending": spending,
+            }
+            funds = {
+                "rrsp_savings": previous_funds["rrsp_savings"] + rrsp + rrsp_interest,
+                "tfsa_savings": previous_funds["tfsa_savings"] + tfsa + tfsa_interest,
+                "unregistered_savings": previous_funds["unregistered_savings"]
+                + unregistered
+                + unregistered_interest,
+                "tfsa_available_room": previous_funds["tfsa_available_room"]
+                + exogenous["tfsa_available_room"]
+                - tfsa,
+                "rrsp_available_room": previous_funds["rrsp_available_room"]
+                + exogenous["rrsp_available_room"]
+                - numpy.maximum(0, rrsp),
+            }
+            all_deltas = None
+            if history is not None:
+                all_deltas = {
+                    **deltas,
+                    "contributions": exogenous["contributions"],
+                    "tfsa": tfsa,
+                    "unregistered": unregistered,
+                    "rrsp_interest": rrsp_interest,
+                    "tfsa_interest": tfsa_interest,
+                    "tfsa_available_room": exogenous["tfsa_available_room"],
+                    "rrsp_available_room": exogenous["rrsp_available_room"],
+                    "household_debt_payments": exogenous["household_debt_payments"],
+                }
+
+            if is_ragged:
+                # Runs which have finished keep their final values
+                is_running = step <= steps
+                deltas = _where(is_running, deltas, previous_deltas)
+                funds = _where(is_running, funds, previous_funds)
+                if history is not None:
+                    all_deltas = _where(
+                        is_running,
+                        all_deltas,
+                        {name: rows[-1] for name, rows in _get_deltas(history).items()},
+                    )
+
+            if history is not None:
+                _record(history, all_deltas, funds)
+
+        return funds
+
+
+def compile_kernel(scenarios) -> Charlie_Kernel:
+    """
+    Compiles a batch of 'Dual_Income_Simulation' scenarios for the kernel. Scenarios can have different initial and final years.
+
+    :param scenarios: A list of scenario payloads or scenario.Scenario_Spec (eg variants of one spec, which share their rules).
+    :return: The compiled Charlie_Kernel. Raises ValueError if any scenario isn't a well-formed 'Dual_Income_Simulation' payload.
+    """
+    parameters = {}
+    schedules = []
+    for spec in scenarios:
+        if not isinstance(spec, scenario.Scenario_Spec):
+            spec = scenario.compile_spec(spec)
+        if spec.type != scenario.DUAL_INCOME_SIMULATION:
+            raise ValueError(
+                f"Only '{scenario.DUAL_INCOME_SIMULATION}' scenarios can be compiled for the kernel"
+            )
+        simulation = spec.build().simulation
+        schedules.append(simulation._get_exogenous_schedule())
+
+        payload = spec.to_payload()
+        settings = payload["settings"]
+        partners = [simulation.partner1_parameters, simulation.partner2_parameters]
+        values = {name: settings[name] for name in _SETTINGS_PARAMETERS}
+        values["unregistered_interest_rate"] = settings["unregistered_interest_rate"]
+        if values["unregistered_interest_rate"] is None:
+            values["unregistered_interest_rate"] = settings["interest_rate"]
+        values["initial_year"] = simulation.initial_year
+        values["final_year"] = simulation.final_year
+        values["final_savings"] = simulation.final_savings
+        values["year_of_retirement"] = [p.year_of_retirement for p in partners]
+        values["initial_salary"] = [p.initial_salary for p in partners]
+        for name in _PARTNER_PARAMETERS:
+            values[name] = [getattr(p, name) for p in partners]
+        for name, value in values.items():
+            parameters.setdefault(name, []).append(value)
+
+    parameters = {
+        name: numpy.array(values, dtype=int if name in _YEAR_PARAMETERS else float)
+        for name, values in parameters.items()
+    }
+
+    steps = numpy.array([len(schedule) for schedule in schedules], dtype=int)
+    # Finished runs read the exogenous values of their final year, which are discarded
+    exogenous = {
+        name: numpy.zeros((steps.max(), len(schedules), 2))
+        for name in _EXOGENOUS_PARTNER_FIELDS
+    }
+    exogenous["household_debt_payments"] = numpy.zeros((steps.max(), len(schedules)))
+    for i, schedule in enumerate(schedules):
+        for step, (deltas, _) in enumerate(schedule):
+            for partner, partner_deltas in enumerate(
+                [deltas.partner1_deltas, deltas.partner2_deltas]
+            ):
+                for name in _EXOGENOUS_PARTNER_FIELDS:
+                    exogenous[name][step, i, partner] = getattr(partner_deltas, name)
+            exogenous["household_debt_payments"][
+                step, i
+            ] = deltas.household_debt_payments
+
+    return Charlie_Kernel(parameters, exogenous, steps)
+
+
+def _get_outcome(
+    required_initial_spending: float, was_solution_found: bool, run_message: str
+):
+    return {
+        "required_initial_spending": float(required_initial_spending),
+        "was_solution_found": was_solution_found,
+        "run_message": run_message,
+    }
+
+
+def _get_working_split(parameters, t, raw_savings, gross_salary, rrsp_room, tfsa_room):
+    """
+    Vectorized savings split of couple_savings_rules.get_split_by_investment_then_partner_with_limits() while the couple is working.
+    Returns arrays shaped (B, 2) of the RRSP, TFSA and unregistered contributions of each partner.
+    """
+    t = numpy.clip(t, 0, 1)
+    non_rrsp_norm = parameters["initial_non_rrsp"] + t * (
+        parameters["final_non_rrsp"] - parameters["initial_non_rrsp"]
+    )
+    equalize_income_weighting = numpy.clip(
+        parameters["initial_equalize_income_weighting"]
+        + t
+        * (
+            parameters["final_equalize_income_weighting"]
+            - parameters["initial_equalize_income_weighting"]
+        ),
+        0,
+        1,
+    )
+
+    household_non_rrsp = non_rrsp_norm * raw_savings
+    household_rrsp = _clamp(
+        raw_savings - household_non_rrsp, 0, rrsp_room[:, 0] + rrsp_room[:, 1]
+    )
+    household_non_rrsp = raw_savings - household_rrsp
+
+    # The partner with the higher salary is partner 1, unless partner 2's salary is strictly higher
+    is_partner2_higher = gross_salary[:, 1] > gross_salary[:, 0]
+    higher_salary, lower_salary = _get_higher_and_lower(
+        is_partner2_higher, gross_salary
+    )
+    higher_rrsp_room, lower_rrsp_room = _get_higher_and_lower(
+        is_partner2_higher, rrsp_room
+    )
+    higher_tfsa_room, lower_tfsa_room = _get_higher_and_lower(
+        is_partner2_higher, tfsa_room
+    )
+
+    salary_diff = higher_salary - lower_salary
+    rrsp_equalize_income = numpy.where(
+        salary_diff > household_rrsp,
+        household_rrsp,
+        salary_diff + (household_rrsp - salary_diff) / 2,
+    )
+    rrsp_equal_contribution = household_rrsp / 2
+    rrsp_higher_target = rrsp_equal_contribution + equalize_income_weighting * (
+        rrsp_equalize_income - rrsp_equal_contribution
+    )
+
+    rrsp_higher = _clamp(rrsp_higher_target, 0, higher_rrsp_room)
+    rrsp_lower = household_rrsp - rrsp_higher
+    is_lower_over_limit = rrsp_lower > lower_rrsp_room
+    rrsp_lower = numpy.where(is_lower_over_limit, lower_rrsp_room, rrsp_lower)
+    rrsp_higher = numpy.where(
+        is_lower_over_limit, household_rrsp - rrsp_lower, rrsp_higher
+    )
+
+    target_each = household_non_rrsp / 2
+    tfsa_higher = numpy.minimum(target_each, higher_tfsa_room)
+    tfsa_lower = numpy.minimum(target_each, lower_tfsa_room)
+    remainder = household_non_rrsp - (tfsa_higher + tfsa_lower)
+    has_remainder = remainder > 0
+    extra_higher = numpy.minimum(remainder, higher_tfsa_room - tfsa_higher)
+    tfsa_higher = numpy.where(has_remainder, tfsa_higher + extra_higher, tfsa_higher)
+    remainder = numpy.where(has_remainder, remainder - extra_higher, remainder)
+    extra_lower = numpy.minimum(remainder, lower_tfsa_room - tfsa_lower)
+    tfsa_lower = numpy.where(has_remainder, tfsa_lower + extra_lower, tfsa_lower)
+    remainder = numpy.where(has_remainder, remainder - extra_lower, remainder)
+
+    return (
+        _get_partners(is_partner2_higher, rrsp_higher, rrsp_lower),
+        _get_partners(is_partner2_higher, tfsa_higher, tfsa_lower),
+        _get_partners(is_partner2_higher, numpy.zeros(remainder.shape), remainder),
+    )
+
+
+def _get_retired_split(parameters, years_remaining, spending, previous_funds):
+    """
+    Vectorized savings split of couple_savings_rules.get_split_by_investment_then_partner_with_limits() once the couple is retired.
+    Returns arrays shaped (B, 2) of the RRSP and TFSA withdrawals (as negative contributions) of each partner.
+    """
+    rrsp_savings = previous_funds["rrsp_savings"]
+    tfsa_savings = previous_funds["tfsa_savings"]
+    spending_column = spending[:, None]
+
+    # Runs which have finished (see Charlie_Kernel.get_history()) may have no years remaining, but their values are discarded
+    with numpy.errstate(divide="ignore", invalid="ignore"):
+        rrsp = rrsp_savings / (years_remaining + 1)[:, None]
+    rrsp = rrsp + parameters["rrsp_adjustment"][:, None] * spending_column
+    rrsp = _clamp(rrsp, 0, numpy.minimum(spending_column / 2, rrsp_savings))
+
+    remaining_spending = spending - rrsp[:, 0] - rrsp[:, 1]
+    tfsa = _clamp(remaining_spending[:, None] / 2, 0, numpy.maximum(tfsa_savings, 0))
+
+    allotments = _adjust_values_to_produce_sum(
+        numpy.concatenate([rrsp, tfsa], axis=1),
+        numpy.concatenate([rrsp_savings, tfsa_savings], axis=1),
+        spending,
+    )
+    return -allotments[:, :2], -allotments[:, 2:]
+
+
+def _adjust_values_to_produce_sum(values, limits, target_sum):
+    """
+    Vectorized couple_savings_rules._adjust_values_to_produce_sum(), for arrays of values and limits shaped (B, n), and sums shaped
+    (B,). The values are walked in order of increasing room together, one column at a time.
+    """
+    count = values.shape[1]
+    values_sum = values[:, 0]
+    for i in range(1, count):
+        values_sum = values_sum + values[:, i]
+    shortfall = target_sum - values_sum
+    rooms = limits - values
+
+    order = numpy.argsort(rooms, axis=1, kind="stable")
+    sorted_rooms = numpy.take_along_axis(rooms, order, axis=1)
+    sorted_values = numpy.take_along_axis(values, order, axis=1)
+    sorted_limits = numpy.take_along_axis(limits, order, axis=1)
+
+    saturated_sum = numpy.zeros(target_sum.shape)
+    free_sum = values_sum
+    free_count = numpy.full(target_sum.shape, count)
+    level = numpy.zeros(target_sum.shape)
+    is_level_found = numpy.zeros(target_sum.shape, dtype=bool)
+    for i in range(count):
+        room = sorted_rooms[:, i]
+        candidate_level = (target_sum - saturated_sum - free_sum) / free_count
+        is_level = ~is_level_found & (room > 0) & (candidate_level <= room)
+        level = numpy.where(is_level, candidate_level, level)
+        is_level_found |= is_level
+        saturated_sum = numpy.where(
+            is_level_found, saturated_sum, saturated_sum + sorted_limits[:, i]
+        )
+        free_sum = numpy.where(is_level_found, free_sum, free_sum - sorted_values[:, i])
+        free_count = numpy.where(is_level_found, free_count, free_count - 1)
+
+    # If there's no valid solution, the last value is increased past its limit to satisfy the sum
+    is_room_left = numpy.any(rooms > _TOLERANCE, axis=1)
+    overdrawn = numpy.where(is_room_left[:, None], limits, values)
+    overdrawn[:, -1] += numpy.where(is_room_left, target_sum - saturated_sum, shortfall)
+
+    adjusted = numpy.minimum(values + level[:, None], limits)
+    adjusted = numpy.where(
+        (is_level_found & is_room_left)[:, None], adjusted, overdrawn
+    )
+    return numpy.where((shortfall <= _TOLERANCE)[:, None], values, adjusted)
+
+
+def _get_maxed_or_zeroed_out(x, c_m, end_region_width: float):
+    """Vectorized spending_rules.get_maxed_or_zeroed_out()."""
+    return numpy.where(
+        x <= end_region_width,
+        x * (c_m / end_region_width),
+        numpy.where(
+            x < (1 - end_region_width),
+            c_m,
+            (x - 1) * ((1 - c_m) / end_region_width) + 1,
+        ),
+    )
+
+
+def _clamp(to_clamp, lower_limit, upper_limit):
+    """Vectorized math_utils.clamp(), which tolerates inverted bounds by clamping to the lower limit."""
+    upper_limit = numpy.maximum(upper_limit, lower_limit)
+    return numpy.minimum(numpy.maximum(to_clamp, lower_limit), upper_limit)
+
+
+def _get_higher_and_lower(is_partner2_higher, values):
+    return (
+        numpy.where(is_partner2_higher, values[:, 1], values[:, 0]),
+        numpy.where(is_partner2_higher, values[:, 0], values[:, 1]),
+    )
+
+
+def _get_partners(is_partner2_higher, higher, lower):
+    return numpy.stack(
+        [
+            numpy.where(is_partner2_higher, lower, higher),
+            numpy.where(is_partner2_higher, higher, lower),
+        ],
+        axis=1,
+    )
+
+
+def _where(condition, values, other_values):
+    return {
+        name: numpy.where(
+            condition if value.ndim == 1 else condition[:, None],
+            value,
+            other_values[name],
+        )
+        for name, value in values.items()
+    }
+
+
+def _get_deltas(history):
+    return {
+        name[len("deltas.") :]: rows
+        for name, rows in history.items()
+        if name.startswith("deltas.")
+    }
+
+
+def _record(history, deltas, funds):
+    for name in _PARTNER_DELTAS_FIELDS + _HOUSEHOLD_DELTAS_FIELDS:
+        history.setdefault(f"deltas.{name}", []).append(deltas[name])
+    for name in _PARTNER_FUNDS_FIELDS:
+        history.setdefault(f"funds.{name}", []).append(funds[name])
@@ -0,0 +1,104 @@
+"""
+Command-line entry point, which runs the simulation described by a scenario file (see scenario.py) and writes its results, without
+needing a notebook.
+
+Run from the repository root with:
+    python -m cli scenario.json --output results.json
+    python -m cli scenario.json --format csv --output results.csv
+
+JSON output contains all of the results. CSV output contains one row per year of the simulation, with a column for each year-by-year
+series (partners' series are prefixed by 'partner1.' or 'partner2.').
+
+The exit code is 0 if a solution was found, 1 if none was found (the results of the closest outcome are still written), and 2 if the
+scenario is invalid or can't be read.
+
+This module, and the modules it imports, deliberately avoid importing IPython and matplotlib, and scipy is only imported if the
+scenario is optimized, so that startup stays fast (see benchmarks/bench_cli_startup.py).
+"""
+
+import argparse
+import csv
+import json
+import sys
+import scenario
+
+JSON = "json"
+CSV = "csv"
+
+
+def get_csv_rows(results):
+    """
+    Returns the year-by-year series of a scenario's results as rows, starting with a header row. Series which don't have a value for
+    every year (eg career-only series) are omitted.
+    """
+    series = results["series"]
+    years = series["years_series"]
+    columns = {}
+    for name, values in series.items():
+        if isinstance(values, dict):
+            for partner_series_name, partner_values in values.items():
+                columns[f"{name}.{partner_series_name}"] = partner_values
+        else:
+            columns[name] = values
+
+    columns = {
+        name: values for name, values in columns.items() if len(values) == len(years)
+    }
+    return [list(columns)] + [list(row) for row in zip(*columns.values())]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("scenario", help="Path to a JSON scenario file, or - for stdin")
+    parser.add_argument(
+        "--output", "-o", help="Path to write results to, defaults to stdout"
+    )
+    parser.add_argument("--format", choices=[JSON, CSV], default=JSON)
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help="Report optimizer progress on stderr",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        if args.scenario == "-":
+            payload = json.load(sys.stdin)
+        else:
+            with open(args.scenario) as f:
+                payload = json.load(f)
+        scenario.validate(payload)
+    except OSError as e:
+        print(f"Can't read scenario: {e}", file=sys.stderr)
+        return 2
+    except json.JSONDecodeError as e:
+        print(f"Scenario isn't valid JSON: {e}", file=sys.stderr)
+        return 2
+    except ValueError as e:
+        print(f"Invalid scenario: {e}", file=sys.stderr)
+        return 2
+
+    def report_progress(iteration: int, best_spending: float):
+        print(f"Iteration {iteration}: best spending {best_spending}", file=sys.stderr)
+
+    results = scenario.run(payload, report_progress if args.progress else None)
+
+    output = open(args.output, "w", newline="") if args.output else sys.stdout
+    try:
+        if args.format == CSV:
+            csv.writer(output).writerows(get_csv_rows(results))
+        else:
+            json.dump(results, output, indent=2)
+            output.write("\n")
+    finally:
+        if args.output:
+            output.close()
+
+    if not results["was_solution_found"]:
+        print(f"No solution found: {results['run_message']}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -204,18 +204,23 @@ def _charlie_raw(
     partner2_projected_monthly_pension_at_65: float,
     partner2_retirement_age: int,
     partner2_pension_start_age: int,
+    rule_cache: ruleset.Rule_Cache = None,
 ):
+    if rule_cache is None:
+        rule_cache = ruleset.Rule_Cache()
 
     mortgage_payment_rule = None
     if mortgage_principal > 0 and mortgage_amortization > 0:
-        mortgage_payment_rule = natural_rules.get_couple_mortgage_payment(
+        mortgage_payment_rule = rule_cache.get(
+            natural_rules.get_couple_mortgage_payment,
             remaining_principal=mortgage_principal,
             initial_remaining_amortization_length=mortgage_amortization,
             mortgage_interest=mortgage_interest,
             initial_year=initial_year,
         )
 
-    partner1_qpp_rule = natural_rules.get_quebec_pension_plan(
+    partner1_qpp_rule = rule_cache.get(
+        natural_rules.get_quebec_pension_plan,
         maximum_pensionable_earnings=qpp_maximum_pensionable_earnings,
         pension_contribution=qpp_pension_contribution,
         current_monthly_pension_at_60=partner1_current_monthly_pension_at_60,
@@ -228,7 +233,8 @@ def _charlie_raw(
         retirement_age=partner1_retirement_age,
         pension_start_age=partner1_pension_start_age,
     )
-    partner2_qpp_rule = natural_rules.get_quebec_pension_plan(
+    partner2_qpp_rule = rule_cache.get(
+        natural_rules.get_quebec_pension_plan,
         maximum_pensionable_earnings=qpp_maximum_pensionable_earnings,
         pension_contribution=qpp_pension_contribution,
         current_monthly_pension_at_60=partner2_current_monthly_pension_at_60,
@@ -244,19 +250,23 @@ def _charlie_raw(
 
     # Employer RRSP matching depends on the employer, so the cap differs per partner. It matches each partner's own
     # RRSP contribution, so it runs after the savings allocation.
-    partner1_rrsp_matching_rule = salary_rules.get_rrsp_matching(
-        partner1_rrsp_matching_cap_fraction
+    partner1_rrsp_matching_rule = rule_cache.get(
+        salary_rules.get_rrsp_matching, partner1_rrsp_matching_cap_fraction
     )
-    partner2_rrsp_matching_rule = salary_rules.get_rrsp_matching(
-        partner2_rrsp_matching_cap_fraction
+    partner2_rrsp_matching_rule = rule_cache.get(
+        salary_rules.get_rrsp_matching, partner2_rrsp_matching_cap_fraction
     )
 
     ruleset_func = ruleset.get_couple_ruleset(
-        partner1_salary_rule=salary_rules.get_compound_plateau(
-            partner1_salary_compound_rate, partner1_salary_plateau
+        partner1_salary_rule=rule_cache.get(
+            salary_rules.get_compound_plateau,
+            partner1_salary_compound_rate,
+            partner1_salary_plateau,
         ),
-        partner2_salary_rule=salary_rules.get_compound_plateau(
-            partner2_salary_compound_rate, partner2_salary_plateau
+        partner2_salary_rule=rule_cache.get(
+            salary_rules.get_compound_plateau,
+            partner2_salary_compound_rate,
+            partner2_salary_plateau,
         ),
         spending_rule=couple_spending_rules.get_increasing_savings_increasing_spending(
             initial_year, increase_savings_weight
@@ -283,6 +293,7 @@ def _charlie_raw(
         partner1_post_savings_rules=[partner1_rrsp_matching_rule],
         partner2_post_savings_rules=[partner2_rrsp_matching_rule],
         mortgage_payment_rule=mortgage_payment_rule,
+        rule_cache=rule_cache,
     )
 
     return ruleset_func
@@ -329,9 +340,13 @@ def charlie(
     partner2_projected_monthly_pension_at_65: float,
     partner2_retirement_age: int,
     partner2_pension_start_age: int,
+    rule_cache: ruleset.Rule_Cache = None,
 ):
     """
     A dual-income ruleset which uses the increasing_savings_increasing_spending rule for spending vs. saving, and the split_by_investment_then_partner_with_limits rule for savings allocations
+
+    Optionally takes a ruleset.Rule_Cache, to share stateless rules (eg salary, pension and mortgage rules) with other rulesets built
+    with the same cache.
     """
 
     initial_non_rrsp_func = optimize.subscribe_optimized_scalar(
@@ -393,4 +408,5 @@ def charlie(
         partner2_projected_monthly_pension_at_65=partner2_projected_monthly_pension_at_65,
         partner2_retirement_age=partner2_retirement_age,
         partner2_pension_start_age=partner2_pension_start_age,
+        rule_cache=rule_cache,
     )
@@ -3,7 +3,16 @@ from typing import Callable
 from typing import List
 from math_utils import lerp
 from math_utils import clamp
-from loop_utils import Loop_Protection
+from rule_dependencies import declares
+
+
+def _for_both_partners(scope: str, fields: List[str]):
+    return [f"{scope}.partner{i}.{field}" for i in (1, 2) for field in fields]
+
+
+# Savings rules read benefits (via the undifferentiated savings) provisionally, because employer RRSP matching is applied after the
+# savings are split. Since the match is added both to benefits and to the RRSP, it doesn't change the amount left to allocate.
+_MATCHED_BENEFITS = _for_both_partners("deltas", ["benefits"])
 
 
 def _get_higher_and_lower_partners(deltas: model.couple_deltas_state):
@@ -109,35 +118,63 @@ def _get_tfsa_withdrawal_allotment(funds: model.funds_state, remaining_spending:
 
 
 def _adjust_values_to_produce_sum(values_and_limits, target_sum: float):
-    """Adjust values within respective limits so that they add up to target_sum"""
+    """
+    Adjust values within respective limits so that they add up to target_sum.
+
+    Every value is raised by the same amount d, capped at its limit, ie value_i -> min(value_i + d, limit_i) ('water-filling'). The
+    sum is piecewise linear in d with a breakpoint at each value's remaining room, so d is found exactly by walking the rooms in
+    ascending order, in O(n log n). If the limits can't accommodate target_sum, every value is set to its limit and the last value
+    is increased past its limit to satisfy the sum.
+    """
     TOLERANCE = 1e-6
 
-    def values_sum():
-        return sum([x[0] for x in values_and_limits])
+    values_sum = sum([x[0] for x in values_and_limits])
 
-    if values_sum() > target_sum + TOLERANCE:
+    if values_sum > target_sum + TOLERANCE:
         raise ValueError
 
-    lp = Loop_Protection()
-    while (shortfall := target_sum - values_sum()) > TOLERANCE:
-        lp.iterate()
-        increase_rooms = [x[1] - x[0] for x in values_and_limits]
-        incrs_with_room = [x for x in increase_rooms if x > TOLERANCE]
-        if len(incrs_with_room) == 0:
-            # There's no valid solution. Increase the last value past its limit to satisfy the sum.
-            i_last = len(values_and_limits) - 1
-            current_last = values_and_limits[i_last]
-            values_and_limits[i_last] = (current_last[0] + shortfall, current_last[1])
-            break
-        valid_incr = min(incrs_with_room)
-        valid_incr = min(
-            valid_incr, shortfall / len(incrs_with_room)
-        )  # Ensure not to increment beyond target sum
-        values_and_limits = [
-            (min(x[0] + valid_incr, x[1]), x[1]) for x in values_and_limits
-        ]  # Increase each value that has room to increase
-
-    return values_and_limits
+    shortfall = target_sum - values_sum
+    if shortfall <= TOLERANCE:
+        return values_and_limits
+
+    rooms = [x[1] - x[0] for x in values_and_limits]
+    i_last = len(values_and_limits) - 1
+    if all(room <= TOLERANCE for room in rooms):
+        # There's no valid solution. Increase the last value past its limit to satisfy the sum.
+        values_and_limits = list(values_and_limits)
+        current_last = values_and_limits[i_last]
+        values_and_limits[i_last] = (current_last[0] + shortfall, current_last[1])
+        return values_and_limits
+
+    # Walk the values in order of increasing room. Values whose room is below the current level d are 'saturated' (held at their
+    # limit); the rest are 'free' and increase together.
+    saturated_sum = 0
+    free_sum = values_sum
+    free_count = len(values_and_limits)
+    level = None
+    for i in sorted(range(len(rooms)), key=lambda i: rooms[i]):
+        room = rooms[i]
+        if room > 0:
+            candidate_level = (target_sum - saturated_sum - free_sum) / free_count
+            if candidate_level <= room:
+                level = candidate_level
+                break
+        value, limit = values_and_limits[i]
+        saturated_sum += limit
+        free_sum -= value
+        free_count -= 1
+
+    if level is None:
+        # There's no valid solution. Set every value to its limit, and increase the last value past its limit to satisfy the sum.
+        values_and_limits = [(x[1], x[1]) for x in values_and_limits]
+        current_last = values_and_limits[i_last]
+        values_and_limits[i_last] = (
+            current_last[0] + target_sum - saturated_sum,
+            current_last[1],
+        )
+        return values_and_limits
+
+    return [(min(x[0] + level, x[1]), x[1]) for x in values_and_limits]
 
 
 def get_equalizing_rrsp_only_split():
@@ -152,6 +189,15 @@ def get_equalizing_rrsp_only_split():
     $12k to be saved. Partner 1 is earning $72k and Partner 2 is earning $57k. Partner 1 will save the entire $12k in their RRSP, for taxable incomes of $60k and $57k respectively.
     """
 
+    @declares(
+        reads=[
+            "deltas.household_undifferentiated_savings",
+            *_for_both_partners("deltas", ["gross_salary"]),
+            *_for_both_partners("previous_funds", ["rrsp_savings"]),
+        ],
+        provisional_reads=_MATCHED_BENEFITS,
+        writes=_for_both_partners("deltas", ["rrsp"]),
+    )
     def equalizing_rrsp_only_split(
         deltas: model.couple_deltas_state,
         previous_funds: model.couple_funds_state,
@@ -241,6 +287,16 @@ def get_split_by_investment_then_partner(
         partner1_year_of_retirement + partner2_year_of_retirement
     ) / 2  # This is not very robust, but we are not trying here very seriously to support widely divergent years of retirement
 
+    @declares(
+        reads=[
+            "deltas.year",
+            "deltas.household_undifferentiated_savings",
+            *_for_both_partners("deltas", ["gross_salary"]),
+            *_for_both_partners("previous_funds", ["rrsp_savings", "tfsa_savings"]),
+        ],
+        provisional_reads=_MATCHED_BENEFITS,
+        writes=_for_both_partners("deltas", ["rrsp", "tfsa"]),
+    )
     def split_by_investment_then_partner(
         deltas: model.couple_deltas_state,
         previous_funds: model.couple_funds_state,
@@ -373,6 +429,26 @@ def get_split_by_investment_then_partner_with_limits(
         partner1_year_of_retirement + partner2_year_of_retirement
     ) / 2  # This is not very robust, but we are not trying here very seriously to support widely divergent years of retirement
 
+    @declares(
+        reads=[
+            "deltas.year",
+            "deltas.household_undifferentiated_savings",
+            *_for_both_partners(
+                "deltas", ["gross_salary", "rrsp_available_room", "tfsa_available_room"]
+            ),
+            *_for_both_partners(
+                "previous_funds",
+                [
+                    "rrsp_savings",
+                    "tfsa_savings",
+                    "rrsp_available_room",
+                    "tfsa_available_room",
+                ],
+            ),
+        ],
+        provisional_reads=_MATCHED_BENEFITS,
+        writes=_for_both_partners("deltas", ["rrsp", "tfsa", "unregistered"]),
+    )
     def split_by_investment_then_partner(
         deltas: model.couple_deltas_state,
         previous_funds: model.couple_funds_state,
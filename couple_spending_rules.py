@@ -1,5 +1,6 @@
 import model
 import spending_rules
+from rule_dependencies import declares
 
 
 def get_luxury_over_basic(base_spending: float, luxury_compound_rate: float):
@@ -9,6 +10,14 @@ def get_luxury_over_basic(base_spending: float, luxury_compound_rate: float):
     sp[y] = b + (1 + c)sp[y-1], where sp = spending, b = base_spending, c = luxury_compound_rate
     """
 
+    @declares(
+        reads=[
+            "deltas.partner1.gross_salary",
+            "deltas.partner2.gross_salary",
+            "previous_deltas.household_spending",
+        ],
+        writes=["deltas.household_spending"],
+    )
     def luxury_over_basic(
         deltas: model.couple_deltas_state,
         previous_funds: model.couple_funds_state,
@@ -76,6 +85,18 @@ def get_increasing_savings_increasing_spending(
 
     actual_increase_savings_weight = increase_savings_weight
 
+    # This year's net income is read provisionally, since RRSP matching (a taxable benefit) is only added after savings are
+    # determined. See the note on previous_spendable_net_income below.
+    @declares(
+        reads=[
+            "previous_deltas.year",
+            "previous_deltas.household_total_net_income",
+            "previous_deltas.household_benefits",
+            "previous_deltas.household_spending",
+        ],
+        writes=["deltas.household_spending"],
+        provisional_reads=["deltas.household_total_net_income"],
+    )
     def increasing_savings_increasing_spending(
         deltas: model.couple_deltas_state,
         previous_funds: model.couple_funds_state,
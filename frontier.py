@@ -0,0 +1,177 @@
+"""
+Retirement-age frontier: the required initial spending of a scenario (see scenario.py) against the age at retirement.
+
+The required initial spending increases with the retirement age, so the solution for any age lies between the solutions for a younger
+and an older age. The frontier is solved in levels, like a bisection over ages: first the youngest and oldest ages, then the age
+halfway between each pair of neighbouring solved ages, and so on. Each solve after the first level searches only the bracket between
+its neighbours' solutions, which takes fewer iterations than searching from scratch. If the bracket doesn't hold the solution (eg
+because optimization makes the frontier slightly non-monotonic), the solve falls back to the full range.
+
+By default, the ages of a level are solved in-process, from variants of one compiled spec, so that the rules which don't depend on
+the retirement age are shared between them. Dual-income scenarios which aren't optimized are solved by the array kernel (see
+charlie_kernel.py), which bisects all of the ages of a level together in lock-step, each within its own bracket. The runs of
+different ages diverge from the first year, since the savings rule depends on the retirement year, so it's the overhead of each
+year of the runs which is shared rather than their state. Other scenarios are solved one age at a time by their rules.
+Alternatively, an executor can be supplied to solve the ages of each level concurrently, each by its rules.
+
+When the ages of a level are solved together (by the kernel or on an executor), a level takes about as long as its slowest solve,
+so the frontier is solved in fewer, wider levels: the first level solves the ages which split the range into quarters, along with
+the youngest and oldest ages, and each later level the ages which split each interval between solved ages into quarters (eg 2
+levels rather than 5 for 16 ages).
+"""
+
+import concurrent.futures
+import charlie_kernel
+import scenario
+
+# Relative margin added around the bracket from neighbouring solutions, so that neighbours with the same solution still bracket it
+_BRACKET_MARGIN = 1e-3
+
+# The number of sections each interval between solved ages is split into by the next level, when the ages of a level are solved
+# together
+_SECTION_COUNT = 4
+
+
+def get_retirement_age_frontier(
+    payload,
+    ages=range(55, 71),
+    sections=None,
+    executor: concurrent.futures.Executor = None,
+):
+    """
+    Solves the required initial spending of a scenario for each of a range of retirement ages.
+
+    :param payload: A scenario payload (see scenario.py).
+    :param ages: The retirement ages to solve for, defaults to 55 to 70.
+    :param sections: The payload sections whose 'age_at_retirement' is set to each age. Defaults to both partners for a
+        'Dual_Income_Simulation' payload, and to 'simulation' for a 'Simulation' payload.
+    :param executor: Optional executor on which to solve the ages of each level concurrently, by their rules. By default they're
+        solved in-process, by the kernel if the scenario can be compiled for it.
+    :return: A JSON-compatible list with an entry for each age, in order, with its 'age_at_retirement', and the
+        'required_initial_spending', 'was_solution_found' and 'run_message' of its solve.
+    """
+    spec = scenario.compile_spec(payload)
+    if sections is None:
+        sections = (
+            ("partner1", "partner2")
+            if spec.type == scenario.DUAL_INCOME_SIMULATION
+            else ("simulation",)
+        )
+    ages = sorted(set(ages))
+    if len(ages) == 0:
+        return []
+
+    variants = [
+        spec.variant({section: {"age_at_retirement": age} for section in sections})
+        for age in ages
+    ]
+    is_kernel_solved = (
+        executor is None
+        and spec.type == scenario.DUAL_INCOME_SIMULATION
+        and not spec.to_payload()["settings"]["should_optimize"]
+    )
+    # Levels whose ages are solved together are split into more sections, see the module docstring
+    section_count = _SECTION_COUNT if is_kernel_solved or executor is not None else 2
+    outcomes = [None] * len(ages)
+
+    # The first level has no neighbouring solutions to bracket it, so it's only split if levels are solved together
+    splits = []
+    if section_count > 2:
+        splits = _get_splits(0, len(ages) - 1, section_count)
+    level = [(i, None) for i in sorted({0, *splits, len(ages) - 1})]
+    intervals = _get_intervals(0, splits, len(ages) - 1)
+    while len(level) > 0:
+        for i, outcome in zip(
+            [i for i, _ in level],
+            _solve_level(variants, level, executor, is_kernel_solved),
+        ):
+            outcomes[i] = outcome
+
+        level = []
+        next_intervals = []
+        for lower, upper in intervals:
+            splits = _get_splits(lower, upper, section_count)
+            bracket = _get_bracket(outcomes[lower], outcomes[upper])
+            level += [(i, bracket) for i in splits]
+            next_intervals += _get_intervals(lower, splits, upper)
+        intervals = next_intervals
+
+    return [
+        {"age_at_retirement": age, **outcome} for age, outcome in zip(ages, outcomes)
+    ]
+
+
+def _get_splits(lower: int, upper: int, section_count: int):
+    """Returns the indices of the ages which split the interval between two solved ages into sections, in order."""
+    return sorted(
+        {lower + (upper - lower) * j // section_count for j in range(1, section_count)}
+        - {lower}
+    )
+
+
+def _get_intervals(lower: int, splits, upper: int):
+    """Returns the intervals between the splits of an interval which have unsolved ages between them, as (lower, upper) pairs."""
+    bounds = [lower, *splits, upper]
+    return [
+        (lower, upper)
+        for lower, upper in zip(bounds[:-1], bounds[1:])
+        if upper - lower >= 2
+    ]
+
+
+def _get_bracket(lower_outcome, upper_outcome):
+    """Returns the bracket of initial spending between the outcomes of two solved ages, or None if either has no solution."""
+    if (
+        not lower_outcome["was_solution_found"]
+        or not upper_outcome["was_solution_found"]
+    ):
+        return None
+    lower = min(
+        lower_outcome["required_initial_spending"],
+        upper_outcome["required_initial_spending"],
+    )
+    upper = max(
+        lower_outcome["required_initial_spending"],
+        upper_outcome["required_initial_spending"],
+    )
+    return (
+        lower - abs(lower) * _BRACKET_MARGIN,
+        upper + abs(upper) * _BRACKET_MARGIN,
+    )
+
+
+def _solve_level(
+    variants, level, executor: concurrent.futures.Executor, is_kernel_solved: bool
+):
+    """Solves the variants at the indices of a level of the frontier, given as (index, bracket) pairs, and returns their outcomes."""
+    if is_kernel_solved:
+        return charlie_kernel.compile_kernel([variants[i] for i, _ in level]).solve(
+            brackets=[bracket for _, bracket in level]
+        )
+    if executor is None:
+        return [
+            _get_outcome(variants[i].run(initial_spending_bracket=bracket))
+            for i, bracket in level
+        ]
+    futures = [
+        executor.submit(_solve, variants[i].to_payload(), bracket)
+        for i, bracket in level
+    ]
+    return [future.result() for future in futures]
+
+
+def _solve(payload, initial_spending_bracket):
+    """Solves a scenario in a worker process, returning only the outcome of the solve rather than all of its results."""
+    return _get_outcome(
+        scenario.compile_spec(payload).run(
+            initial_spending_bracket=initial_spending_bracket
+        )
+    )
+
+
+def _get_outcome(results):
+    return {
+        "required_initial_spending": results["required_initial_spending"],
+        "was_solution_found": results["was_solution_found"],
+        "run_message": results["run_message"],
+    }
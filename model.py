@@ -2,6 +2,9 @@
 Base state classes and update logic.
 """
 
+import rule_dependencies
+import rule_schedule
+
 
 class funds_state:
     """Fund-related state, including accumulated savings across different asset classes (RRSP, TFSA, unregistered) and contribution limits for registered savings classes."""
@@ -165,24 +168,10 @@ class deltas_state:
         )
 
     def _copy(self):
-        output = deltas_state(
-            year=self.year,
-            gross_salary=self.gross_salary,
-            contributions=self.contributions,
-            benefits=self.benefits,
-            tax=self.tax,
-            rrsp=self.rrsp,
-            tfsa=self.tfsa,
-            spending=self.spending,
-            rrsp_interest=self.rrsp_interest,
-            tfsa_interest=self.tfsa_interest,
-            unregistered=self._unregistered,
-            unregistered_interest=self._unregistered_interest,
-            tax_refund=self._tax_refund,
-            tfsa_available_room=self._tfsa_available_room,
-            rrsp_available_room=self._rrsp_available_room,
-            debt_payments=self.debt_payments,
-        )
+        # Copy the backing fields directly rather than going through __init__, since this is called for every update_x() call of
+        # every rule.
+        output = deltas_state.__new__(deltas_state)
+        output.__dict__.update(self.__dict__)
         return output
 
     # region Immutable properties
@@ -421,6 +410,15 @@ class couple_deltas_state:
         output._partner2_deltas = new_value
         return output
 
+    def update_partners_deltas(
+        self, new_partner1_value: deltas_state, new_partner2_value: deltas_state
+    ):
+        """Updates the deltas of both partners with a single copy."""
+        output = self.copy()
+        output._partner1_deltas = new_partner1_value
+        output._partner2_deltas = new_partner2_value
+        return output
+
     @property
     def year(self):
         assert self.partner1_deltas.year == self.partner2_deltas.year
@@ -495,17 +493,23 @@ def get_updated_funds_from_deltas(previous_funds: funds_state, deltas: deltas_st
 
 
 def get_updated_deltas_from_rules(
-    previous_funds: funds_state, previous_deltas: deltas_state, rules
+    previous_funds: funds_state,
+    previous_deltas: deltas_state,
+    rules,
+    deltas: deltas_state = None,
 ):
     """Applies the provided list of rules in sequence to produce a set of deltas. The signature for a rule is:
      def rule(deltas: model.deltas_state, previous_funds: model.funds_state, previous_deltas: model.deltas_state)
     Each rule operates on the output of the previous rule.
 
-    The output deltas are for the year subsequent to that of previous_funds and previous_deltas.
+    The output deltas are for the year subsequent to that of previous_funds and previous_deltas. The first rule is applied to the
+    supplied deltas if any (eg precomputed outputs of other rules), otherwise to empty deltas.
     """
 
     assert previous_funds.year == previous_deltas.year
-    deltas = deltas_state.from_year(previous_funds.year + 1)
+    if deltas is None:
+        deltas = deltas_state.from_year(previous_funds.year + 1)
+    assert deltas.year == previous_funds.year + 1
     for rule in rules:
         deltas = rule(deltas, previous_funds, previous_deltas)
 
@@ -527,17 +531,23 @@ def get_updated_couple_funds_from_deltas(
 
 
 def get_updated_couple_deltas_from_rules(
-    previous_funds: couple_funds_state, previous_deltas: couple_deltas_state, rules
+    previous_funds: couple_funds_state,
+    previous_deltas: couple_deltas_state,
+    rules,
+    deltas: couple_deltas_state = None,
 ):
     """
-    Applies the provided list of couple rules in sequence to produce a set of deltas.
+    Applies the provided list of couple rules in sequence to produce a set of deltas. The first rule is applied to the supplied deltas
+    if any (eg precomputed outputs of other rules), otherwise to empty deltas.
 
     The signature for a couples rule is:
     def rule(deltas: model.couple_deltas_state, previous_funds: model.couple_funds_state, previous_deltas: model.couple_deltas_state)
     """
 
     assert previous_funds.year == previous_deltas.year
-    deltas = couple_deltas_state.from_year(previous_funds.year + 1)
+    if deltas is None:
+        deltas = couple_deltas_state.from_year(previous_funds.year + 1)
+    assert deltas.year == previous_funds.year + 1
     for rule in rules:
         deltas = rule(deltas, previous_funds, previous_deltas)
 
@@ -575,4 +585,50 @@ def get_couple_rule_from_single_rule(single_rule, partner: int):
         new_deltas = deltas.update_partner2_deltas(new_partner2_deltas)
         return new_deltas
 
-    return apply_partner1 if partner == 1 else apply_partner2
+    couple_rule = rule_dependencies.declare_for_partner(
+        apply_partner1 if partner == 1 else apply_partner2, single_rule, partner
+    )
+    return rule_schedule.copy_active_years(couple_rule, [single_rule])
+
+
+def get_couple_rule_from_partner_rules(partner1_rules, partner2_rules):
+    """
+    Wraps a sequence of rules for each individual income-earner as a single rule for a dual-income couple. Each partner's rules are
+    chained in order on that partner's deltas, and the couple deltas are updated once at the end.
+
+    This is equivalent to wrapping each rule with get_couple_rule_from_single_rule(), as long as the individual rules only depend on
+    their own partner's state (which is always the case, since they only see one partner), but avoids unpacking and rebuilding the
+    couple deltas for every rule.
+    """
+    partner1_rules = list(partner1_rules)
+    partner2_rules = list(partner2_rules)
+
+    def apply_partners(
+        deltas: couple_deltas_state,
+        previous_funds: couple_funds_state,
+        previous_deltas: couple_deltas_state,
+    ):
+        partner1_deltas = deltas.partner1_deltas
+        partner1_previous_funds = previous_funds.partner1_funds
+        partner1_previous_deltas = previous_deltas.partner1_deltas
+        for rule in partner1_rules:
+            partner1_deltas = rule(
+                partner1_deltas, partner1_previous_funds, partner1_previous_deltas
+            )
+
+        partner2_deltas = deltas.partner2_deltas
+        partner2_previous_funds = previous_funds.partner2_funds
+        partner2_previous_deltas = previous_deltas.partner2_deltas
+        for rule in partner2_rules:
+            partner2_deltas = rule(
+                partner2_deltas, partner2_previous_funds, partner2_previous_deltas
+            )
+
+        return deltas.update_partners_deltas(partner1_deltas, partner2_deltas)
+
+    couple_rule = rule_dependencies.declare_for_partners(
+        apply_partners, partner1_rules, partner2_rules
+    )
+    return rule_schedule.copy_active_years(
+        couple_rule, partner1_rules + partner2_rules
+    )
@@ -5,8 +5,17 @@ Covers 'natural' update rules, rules that are set by law, economics and/or mathe
 import model
 import tax
 import math_utils
+from rule_dependencies import declares
+from rule_schedule import active_during
 
 
+# Benefits are read provisionally, since taxable benefits (eg employer RRSP matching) can be added after tax is first applied. The
+# difference is picked up by the following year's tax refund.
+@declares(
+    reads=["deltas.gross_salary", "deltas.unregistered_interest"],
+    writes=["deltas.tax"],
+    provisional_reads=["deltas.benefits"],
+)
 def apply_tax(
     deltas: model.deltas_state,
     previous_funds: model.funds_state,
@@ -19,6 +28,14 @@ def apply_tax(
     return deltas.update_tax(income_tax)
 
 
+@declares(
+    reads=[
+        "previous_deltas.taxable_income",
+        "previous_deltas.tax",
+        "previous_deltas.rrsp_interest",
+    ],
+    writes=["deltas.tax_refund"],
+)
 def apply_tax_refund(
     deltas: model.deltas_state,
     previous_funds: model.funds_state,
@@ -49,6 +66,18 @@ def get_calculate_investment_interest(
     Gets a rule which applies compound interest to accumulate savings, according to the supplied interest rates (fractions).
     """
 
+    @declares(
+        reads=[
+            "previous_funds.rrsp_savings",
+            "previous_funds.tfsa_savings",
+            "previous_funds.unregistered_savings",
+        ],
+        writes=[
+            "deltas.rrsp_interest",
+            "deltas.tfsa_interest",
+            "deltas.unregistered_interest",
+        ],
+    )
     def calculate_investment_interest(
         deltas: model.deltas_state,
         previous_funds: model.funds_state,
@@ -74,6 +103,7 @@ def increase_tfsa_limit(yearly_increase: float):
     Returns a rule which sets the TFSA contribution room delta for the year to the supplied yearly_increase.
     """
 
+    @declares(writes=["deltas.tfsa_available_room"])
     def apply_increase(
         deltas: model.deltas_state,
         previous_funds: model.funds_state,
@@ -90,6 +120,10 @@ def get_update_rrsp_limit(income_fraction: float, annual_limit: float):
     income_fraction * last year's gross income and annual_limit.
     """
 
+    @declares(
+        reads=["previous_deltas.gross_salary"],
+        writes=["deltas.rrsp_available_room"],
+    )
     def apply_update(
         deltas: model.deltas_state,
         previous_funds: model.funds_state,
@@ -155,6 +189,16 @@ def get_quebec_pension_plan(
     )
     yearly_contribution = maximum_pensionable_earnings * pension_contribution
 
+    # Contributions are paid until retirement, and benefits are received from the start of the pension
+    year_of_retirement = initial_year + retirement_age - current_age
+    year_of_pension_start = initial_year + pension_start_age - current_age
+
+    # Contributions and benefits are added to, rather than read, so they're declared only as written.
+    @active_during([(None, year_of_retirement), (year_of_pension_start, None)])
+    @declares(
+        reads=["deltas.year"],
+        writes=["deltas.contributions", "deltas.benefits"],
+    )
     def apply_qpp(
         deltas: model.deltas_state,
         previous_funds: model.funds_state,
@@ -232,6 +276,8 @@ def get_mortgage_payment(
     # the payment window runs from initial_year + 1 up to and including initial_year + amortization.
     end_year = initial_year + initial_remaining_amortization_length + 1
 
+    @active_during([(None, end_year)])
+    @declares(reads=["deltas.year"], writes=["deltas.debt_payments"])
     def mortgage_payment(
         deltas: model.deltas_state,
         previous_funds: model.funds_state,
@@ -266,6 +312,8 @@ def get_couple_mortgage_payment(
     # the payment window runs from initial_year + 1 up to and including initial_year + amortization.
     end_year = initial_year + initial_remaining_amortization_length + 1
 
+    @active_during([(None, end_year)])
+    @declares(reads=["deltas.year"], writes=["deltas.household_debt_payments"])
     def mortgage_payment(
         deltas: model.couple_deltas_state,
         previous_funds: model.couple_funds_state,
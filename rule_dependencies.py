@@ -0,0 +1,388 @@
+"""
+Declared read/write dependencies of rules, and analysis of rule ordering based on them.
+
+A rule can declare which fields it reads and writes, as names qualified by the argument they're read from, eg 'deltas.gross_salary',
+'previous_deltas.spending' or 'previous_funds.rrsp_savings'. For couple rules, the fields of an individual partner are qualified by
+the partner, eg 'deltas.partner1.tax' or 'previous_funds.partner2.tfsa_savings', and household-level fields are named directly, eg
+'deltas.household_spending'. Derived properties (eg 'deltas.total_net_income') may be declared as reads, and are expanded to the
+underlying fields. A rule which adds to the existing value of a field (eg an extra pension benefit) only needs to declare it as
+written.
+
+Rules without declarations are treated as opaque: they may read and write anything, so they're never reported as unused or misordered,
+and never grouped with other rules.
+"""
+
+from typing import Iterable
+from typing import List
+
+_DELTAS_SCOPE = "deltas"
+
+# Derived properties and the fields they're calculated from, relative to the object they're read from.
+_DERIVED_FIELDS = {
+    "total_net_income": ["gross_salary", "benefits", "tax_refund", "tax"],
+    "taxable_income": ["gross_salary", "benefits", "unregistered_interest", "rrsp"],
+    "undifferentiated_savings": [
+        "total_net_income",
+        "spending",
+        "debt_payments",
+        "contributions",
+    ],
+    "total_savings": ["rrsp_savings", "tfsa_savings", "unregistered_savings"],
+    "household_total_net_income": [
+        "partner1.total_net_income",
+        "partner2.total_net_income",
+    ],
+    "household_contributions": ["partner1.contributions", "partner2.contributions"],
+    "household_benefits": ["partner1.benefits", "partner2.benefits"],
+    "household_undifferentiated_savings": [
+        "household_total_net_income",
+        "household_spending",
+        "household_contributions",
+        "household_debt_payments",
+    ],
+}
+
+# Fields of the deltas which are consumed when they're applied to the funds (see model.get_updated_funds_from_deltas).
+_FUNDS_UPDATE_FIELDS = [
+    "rrsp",
+    "rrsp_interest",
+    "tfsa",
+    "tfsa_interest",
+    "unregistered",
+    "unregistered_interest",
+    "tfsa_available_room",
+    "rrsp_available_room",
+]
+
+
+def declares(
+    reads: Iterable[str] = (),
+    writes: Iterable[str] = (),
+    provisional_reads: Iterable[str] = (),
+):
+    """
+    Decorator which declares the fields read and written by a rule.
+
+    :param reads: Fields read by the rule.
+    :param writes: Fields written by the rule.
+    :param provisional_reads: Fields read by the rule, which it's acceptable for later rules in the same year to modify. (Eg, tax is
+        initially calculated without taxable benefits that are only determined later in the year, and corrected by the following
+        year's tax refund.) These are counted as reads, but not as ordering violations.
+    """
+
+    def decorate(rule):
+        return declare(rule, reads, writes, provisional_reads)
+
+    return decorate
+
+
+def declare(
+    rule,
+    reads: Iterable[str] = (),
+    writes: Iterable[str] = (),
+    provisional_reads: Iterable[str] = (),
+):
+    """
+    Declares the fields read and written by a rule. See declares(). Returns the rule, for chaining.
+    """
+    provisional_reads = frozenset(_expand_all(provisional_reads))
+    rule.reads = frozenset(_expand_all(reads)) | provisional_reads
+    rule.writes = frozenset(writes)
+    rule.provisional_reads = provisional_reads
+    return rule
+
+
+def is_declared(rule) -> bool:
+    """True if the fields read and written by the rule have been declared."""
+    return hasattr(rule, "reads") and hasattr(rule, "writes")
+
+
+def declare_for_partner(couple_rule, single_rule, partner: int):
+    """
+    Declares the dependencies of a couple rule which applies single_rule to one person in the couple, by qualifying the declared
+    dependencies of single_rule with the partner. Does nothing if single_rule has no declarations.
+    """
+    if not is_declared(single_rule):
+        return couple_rule
+
+    return declare_for_partners(
+        couple_rule,
+        [single_rule] if partner == 1 else [],
+        [single_rule] if partner == 2 else [],
+    )
+
+
+def declare_for_partners(couple_rule, partner1_rules, partner2_rules):
+    """
+    Declares the dependencies of a couple rule which applies a sequence of single rules to each person in the couple, as the union of
+    the qualified declarations of the single rules. Does nothing unless all of the single rules have declarations.
+    """
+    partner_rules = [(1, rule) for rule in partner1_rules] + [
+        (2, rule) for rule in partner2_rules
+    ]
+    if not all(is_declared(rule) for _, rule in partner_rules):
+        return couple_rule
+
+    # The partner rules are hidden inside the couple rule, so their order is checked here, once.
+    Rule_Dependency_Graph(partner1_rules).check_order()
+    Rule_Dependency_Graph(partner2_rules).check_order()
+
+    reads = set()
+    writes = set()
+    provisional_reads = set()
+    for partner, rule in partner_rules:
+        reads |= {_qualify(field, partner) for field in rule.reads}
+        writes |= {_qualify(field, partner) for field in rule.writes}
+        provisional_reads |= {
+            _qualify(field, partner) for field in rule.provisional_reads
+        }
+
+    couple_rule.reads = frozenset(reads)
+    couple_rule.writes = frozenset(writes)
+    couple_rule.provisional_reads = frozenset(provisional_reads)
+    return couple_rule
+
+
+class Rule_Dependency_Graph:
+    """
+    The dependency graph for a sequence of rules applied in order within a year, based on their declared dependencies.
+
+    There's an edge from rule A to a later rule B if B reads a current-year field written by A. Fields read from previous_deltas
+    and previous_funds refer to the previous year, so they only ever depend on the outcome of the previous year.
+    """
+
+    def __init__(self, rules):
+        self._rules = list(rules)
+
+    @property
+    def rules(self):
+        return self._rules
+
+    def get_edges(self):
+        """
+        Returns a list of (writer index, reader index, field) tuples, one for each current-year field read by a rule that was
+        written by an earlier rule.
+        """
+        edges = []
+        for i_reader, reader in enumerate(self._rules):
+            if not is_declared(reader):
+                continue
+            for i_writer in range(0, i_reader):
+                writer = self._rules[i_writer]
+                if not is_declared(writer):
+                    continue
+                for field in sorted(_current_year(reader.reads) & writer.writes):
+                    edges.append((i_writer, i_reader, field))
+        return edges
+
+    def get_ordering_violations(self) -> List[str]:
+        """
+        Returns a description of each case where a rule reads a current-year field that a later rule writes, ie it reads the field
+        before its value for the year is final. Fields that a rule declares as provisional reads are exempt.
+        """
+        violations = []
+        for i_reader, reader in enumerate(self._rules):
+            if not is_declared(reader):
+                continue
+            checked_reads = _current_year(reader.reads - reader.provisional_reads)
+            for i_writer in range(i_reader + 1, len(self._rules)):
+                writer = self._rules[i_writer]
+                if not is_declared(writer):
+                    continue
+                for field in sorted(checked_reads & writer.writes):
+                    violations.append(
+                        f"{_get_name(reader)} (rule {i_reader}) reads {field} before it's written by {_get_name(writer)} (rule {i_writer})"
+                    )
+        return violations
+
+    def check_order(self):
+        """
+        Raises a ValueError if any rule reads a current-year field before a later rule writes it.
+        """
+        violations = self.get_ordering_violations()
+        if len(violations) > 0:
+            raise ValueError("Rules are incorrectly ordered: " + "; ".join(violations))
+
+    def get_unused_rules(self):
+        """
+        Returns the rules whose outputs are never used: no field they write is read by a later rule in the same year, by any rule
+        in the following year (assuming the same rules are applied), or when the deltas are applied to the funds.
+        """
+        consumed_next_year = set()
+        for rule in self._rules:
+            if not is_declared(rule):
+                # An opaque rule may read anything, so all outputs are potentially used.
+                return []
+            consumed_next_year |= _previous_year_as_current(rule.reads)
+
+        unused = []
+        for i, rule in enumerate(self._rules):
+            if len(rule.writes) == 0:
+                continue
+            consumed = set(consumed_next_year)
+            for later_rule in self._rules[i + 1 :]:
+                consumed |= _current_year(later_rule.reads)
+            if not any(
+                field in consumed or _is_consumed_by_funds_update(field)
+                for field in rule.writes
+            ):
+                unused.append(rule)
+        return unused
+
+    def get_independent_groups(self):
+        """
+        Partitions the rules, in order, into consecutive groups of rules that don't depend on each other: no rule in a group reads
+        or writes a current-year field written by another rule in the group. The rules within a group can be fused, batched or
+        reordered freely. Undeclared rules are always placed in a group of their own.
+        """
+        groups = []
+        group = []
+        group_reads = set()
+        group_writes = set()
+        for rule in self._rules:
+            if not is_declared(rule):
+                if len(group) > 0:
+                    groups.append(group)
+                groups.append([rule])
+                group = []
+                group_reads = set()
+                group_writes = set()
+                continue
+
+            reads = _current_year(rule.reads)
+            is_conflicting = (
+                len(reads & group_writes) > 0
+                or len(rule.writes & group_reads) > 0
+                or len(rule.writes & group_writes) > 0
+            )
+            if is_conflicting and len(group) > 0:
+                groups.append(group)
+                group = []
+                group_reads = set()
+                group_writes = set()
+
+            group.append(rule)
+            group_reads |= reads
+            group_writes |= rule.writes
+
+        if len(group) > 0:
+            groups.append(group)
+        return groups
+
+
+def get_exogenous_rules(rule_lists, endogenous_fields: Iterable[str] = ()):
+    """
+    Returns the set of rules whose outputs don't depend on the outcome of a simulation run, so they can be computed once and reused
+    across runs.
+
+    A rule is exogenous if it reads no funds, and every field it reads is only written by exogenous rules (eg it reads only the year,
+    or last year's value of a field that it writes itself). Since the outputs of exogenous rules are applied before the other rules of
+    the year, no other rule may read or write a field an exogenous rule writes before the exogenous rule. (Later rules may add to it,
+    eg RRSP matching adds to pension benefits.) If any rule is undeclared, there are no exogenous rules.
+
+    Rules are assumed to depend only on their declared reads and on fixed parameters. (A rule whose output depends on eg an optimized
+    variable reads funds or savings, so it's never exogenous.)
+
+    :param rule_lists: The lists of rules applied in each year.
+    :param endogenous_fields: Fields of the previous deltas which aren't exogenous, even if they're only written by exogenous rules,
+        because they're seeded with run-dependent values in the initial state (eg 'previous_deltas.spending').
+    """
+    rule_lists = [list(rules) for rules in rule_lists]
+    if not all(is_declared(rule) for rules in rule_lists for rule in rules):
+        return set()
+
+    endogenous_seeds = _previous_year_as_current(_expand_all(endogenous_fields))
+    exogenous_rules = {rule for rules in rule_lists for rule in rules}
+
+    def is_exogenous(
+        rule, rules, i_rule, list_endogenous_writes, all_endogenous_writes
+    ):
+        for field in rule.reads:
+            if field.startswith("previous_funds."):
+                return False
+        if len(_current_year(rule.reads) & list_endogenous_writes) > 0:
+            return False
+        previous_reads = _previous_year_as_current(rule.reads)
+        if len(previous_reads & (endogenous_seeds | all_endogenous_writes)) > 0:
+            return False
+        for earlier_rule in rules[:i_rule]:
+            if earlier_rule not in exogenous_rules and (
+                len(_current_year(earlier_rule.reads) & rule.writes) > 0
+                or len(earlier_rule.writes & rule.writes) > 0
+            ):
+                return False
+        return True
+
+    is_changed = True
+    while is_changed:
+        is_changed = False
+        endogenous_writes = {
+            id(rules): {
+                field
+                for rule in rules
+                if rule not in exogenous_rules
+                for field in rule.writes
+            }
+            for rules in rule_lists
+        }
+        all_endogenous_writes = set().union(*endogenous_writes.values())
+        for rules in rule_lists:
+            for i_rule, rule in enumerate(rules):
+                if rule in exogenous_rules and not is_exogenous(
+                    rule,
+                    rules,
+                    i_rule,
+                    endogenous_writes[id(rules)],
+                    all_endogenous_writes,
+                ):
+                    exogenous_rules.remove(rule)
+                    is_changed = True
+
+    return exogenous_rules
+
+
+def _expand_all(fields: Iterable[str]):
+    expanded = set()
+    for field in fields:
+        expanded |= _expand(field)
+    return expanded
+
+
+def _expand(field: str):
+    """Expands a derived property into the fields it's calculated from, recursively."""
+    scope, _, name = field.rpartition(".")
+    if name not in _DERIVED_FIELDS:
+        return {field}
+
+    root_scope = scope.split(".")[0]
+    expanded = set()
+    for dependency in _DERIVED_FIELDS[name]:
+        dependency_scope = root_scope if "." in dependency else scope
+        expanded |= _expand(f"{dependency_scope}.{dependency}")
+    return expanded
+
+
+def _qualify(field: str, partner: int):
+    scope, _, name = field.partition(".")
+    return f"{scope}.partner{partner}.{name}"
+
+
+def _current_year(fields):
+    return {field for field in fields if field.startswith(_DELTAS_SCOPE + ".")}
+
+
+def _previous_year_as_current(fields):
+    prefix = "previous_" + _DELTAS_SCOPE + "."
+    return {
+        _DELTAS_SCOPE + "." + field[len(prefix) :]
+        for field in fields
+        if field.startswith(prefix)
+    }
+
+
+def _is_consumed_by_funds_update(field: str):
+    return field.rpartition(".")[2] in _FUNDS_UPDATE_FIELDS
+
+
+def _get_name(rule):
+    return getattr(rule, "__qualname__", repr(rule))
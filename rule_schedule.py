@@ -0,0 +1,99 @@
+"""
+Activation windows for rules that only apply in some years, per-year schedules of the rules to apply, and precomputation of the rules
+whose outputs are the same in every run.
+
+A rule can publish the years in which it's active, as a list of (first year, end year) windows, where the first year is inclusive, the
+end year is exclusive, and None means the window is open at that end. Years are those of the deltas being updated by the rule (ie
+deltas.year). The simulation uses the windows to build its schedule of rules once, so rules are never invoked outside their windows.
+
+Rules should still behave correctly if they're applied outside their windows (eg by returning the deltas unchanged), since they may be
+used directly, or by a ruleset that doesn't check windows.
+"""
+
+from typing import List
+from typing import Optional
+from typing import Tuple
+import rule_dependencies
+
+
+def active_during(windows: List[Tuple[Optional[int], Optional[int]]]):
+    """
+    Decorator which publishes the years in which a rule is active.
+
+    :param windows: List of (first year, end year) windows. The first year is inclusive, the end year is exclusive, and None leaves the
+        window open at that end.
+    """
+
+    def decorate(rule):
+        rule.active_years = list(windows)
+        return rule
+
+    return decorate
+
+
+def has_active_years(rule) -> bool:
+    """True if the rule has published the years in which it's active."""
+    return hasattr(rule, "active_years")
+
+
+def is_active(rule, year: int) -> bool:
+    """True if the rule is active when updating the deltas for the given year. Rules without published windows are always active."""
+    if not has_active_years(rule):
+        return True
+
+    return any(
+        (first is None or year >= first) and (end is None or year < end)
+        for first, end in rule.active_years
+    )
+
+
+def get_active_rules(rules, year: int):
+    """Returns the rules which are active when updating the deltas for the given year, in order."""
+    return [rule for rule in rules if is_active(rule, year)]
+
+
+def copy_active_years(wrapper_rule, rules):
+    """
+    Publishes the years in which a rule wrapping the supplied rules is active, which are those in which any of the supplied rules is
+    active. Returns the wrapper rule, for chaining.
+    """
+    if len(rules) == 0 or not all(has_active_years(rule) for rule in rules):
+        # At least one wrapped rule is always active
+        return wrapper_rule
+
+    wrapper_rule.active_years = [
+        window for rule in rules for window in rule.active_years
+    ]
+    return wrapper_rule
+
+
+def get_exogenous_schedule(
+    schedule, initial_deltas, initial_funds, endogenous_fields: List[str]
+):
+    """
+    Precomputes the outputs of the exogenous rules of a schedule (see rule_dependencies.get_exogenous_rules()), which are the same for
+    every run.
+
+    :param schedule: The list of rules to apply in each year of a run.
+    :param initial_deltas: The initial deltas of a run. Only fields read by exogenous rules need to be set.
+    :param initial_funds: The initial funds of a run. (These are never read by exogenous rules.)
+    :param endogenous_fields: Fields of the previous deltas which are seeded with different values in the initial deltas of each run
+        (eg 'previous_deltas.spending').
+    :return: A list containing, for each year, a tuple of the deltas produced by the exogenous rules, and the list of remaining rules
+        to apply to them.
+    """
+    exogenous_rules = rule_dependencies.get_exogenous_rules(schedule, endogenous_fields)
+
+    exogenous_schedule = []
+    previous_deltas = initial_deltas
+    for rules in schedule:
+        deltas = type(previous_deltas).from_year(previous_deltas.year + 1)
+        remaining_rules = []
+        for rule in rules:
+            if rule in exogenous_rules:
+                deltas = rule(deltas, initial_funds, previous_deltas)
+            else:
+                remaining_rules.append(rule)
+        exogenous_schedule.append((deltas, remaining_rules))
+        previous_deltas = deltas
+    return exogenous_schedule
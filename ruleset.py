@@ -2,8 +2,45 @@
 Helper functions for building a ruleset.
 """
 
+import collections
 import natural_rules
 import model
+import rule_dependencies
+from rule_dependencies import declares
+import rule_schedule
+
+
+class Rule_Cache:
+    """
+    Memoizes rule factories, so that rulesets built with the same arguments share rule objects rather than building their own (eg
+    variants of a scenario which differ only in a few fields). Only factories which return stateless rules should be cached, since
+    shared rules may be applied by several simulations.
+
+    The cache holds at most max_size rules, and forgets the least recently used rule beyond that, so that sweeps over many variants
+    don't keep every rule alive.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        """
+        :param max_size: The maximum number of rules held, defaults to 1024
+        """
+        self._max_size = max_size
+        self._rules = collections.OrderedDict()
+
+    def get(self, factory, *args, **kwargs):
+        """Returns factory(*args, **kwargs), reusing the result of a previous call with equal arguments. Arguments must be hashable."""
+        key = (factory, args, tuple(sorted(kwargs.items())))
+        if key in self._rules:
+            self._rules.move_to_end(key)
+            return self._rules[key]
+        rule = factory(*args, **kwargs)
+        self._rules[key] = rule
+        if len(self._rules) > self._max_size:
+            self._rules.popitem(last=False)
+        return rule
+
+    def __len__(self):
+        return len(self._rules)
 
 
 def get_career_rules(
@@ -64,6 +101,7 @@ def get_retirement_rules(
     :return: The retirement ruleset.
     """
 
+    @declares(writes=["deltas.spending"])
     def retirement_spending(
         deltas: model.deltas_state,
         previous_funds: model.funds_state,
@@ -98,62 +136,114 @@ def get_couple_ruleset(
     partner1_post_savings_rules,
     partner2_post_savings_rules,
     mortgage_payment_rule=None,
+    rule_cache: Rule_Cache = None,
 ):
+    # Without a cache shared with other rulesets, rules are only shared between years of this ruleset
+    if rule_cache is None:
+        rule_cache = Rule_Cache()
+
+    # These rules don't have dependencies and apply both pre- and post-retirement
+    # (Tax 'refund' can have either sign and is actually a payment when deducting from the RRSP)
+    natural_rules_for_each_partner = [
+        natural_rules.apply_tax_refund,
+        rule_cache.get(
+            natural_rules.get_calculate_investment_interest,
+            rrsp_interest_rate,
+            tfsa_interest_rate,
+            unregistered_interest_rate,
+        ),
+        # Natural limits: TFSA room increase and RRSP limit based on prior-year income
+        rule_cache.get(natural_rules.increase_tfsa_limit, tfsa_yearly_increase),
+        rule_cache.get(
+            natural_rules.get_update_rrsp_limit, rrsp_income_fraction, rrsp_annual_limit
+        ),
+    ]
+
+    def get_pretax_rules(salary_rule, pretax_rules, is_retired: bool):
+        # Those who are working earn income; both pay tax (eg on unregistered interest)
+        earned_income_rules = [] if is_retired else [salary_rule]
+        return [
+            *natural_rules_for_each_partner,
+            *earned_income_rules,
+            *pretax_rules,
+            natural_rules.apply_tax,
+        ]
+
+    # Each partner's individual rules are chained into couple rules, rather than wrapping each of them separately. The combined
+    # rules only depend on who's retired and which of the pretax rules are active (eg pension contributions stop at retirement), so
+    # they're built once for each case and reused every year, and by other rulesets sharing the cache with the same partner rules.
+    def get_combined_pretax_rules(
+        year: int, is_partner1_retired: bool, is_partner2_retired: bool
+    ):
+        partner1_active_rules = rule_schedule.get_active_rules(
+            partner1_pretax_rules, year
+        )
+        partner2_active_rules = rule_schedule.get_active_rules(
+            partner2_pretax_rules, year
+        )
+        return rule_cache.get(
+            _get_exogenous_and_endogenous_couple_rules,
+            tuple(
+                get_pretax_rules(
+                    partner1_salary_rule, partner1_active_rules, is_partner1_retired
+                )
+            ),
+            tuple(
+                get_pretax_rules(
+                    partner2_salary_rule, partner2_active_rules, is_partner2_retired
+                )
+            ),
+        )
+
+    # Rules that depend on the savings allocation (eg RRSP matching, which matches deltas.rrsp)
+    post_savings_rule = None
+    if partner1_post_savings_rules or partner2_post_savings_rules:
+        post_savings_rule = rule_cache.get(
+            model.get_couple_rule_from_partner_rules,
+            tuple(partner1_post_savings_rules),
+            tuple(partner2_post_savings_rules),
+        )
+
     def ruleset(
         current_year: int, is_partner1_retired: bool, is_partner2_retired: bool
     ):
         if mortgage_payment_rule:
             yield mortgage_payment_rule
 
-        for i in range(1, 3):
-            # These rules don't have dependencies and apply both pre- and post-retirement
-            # (Tax 'refund' can have either sign and is actually a payment when deducting from the RRSP)
-            yield model.get_couple_rule_from_single_rule(
-                natural_rules.apply_tax_refund, i
-            )
-            yield model.get_couple_rule_from_single_rule(
-                natural_rules.get_calculate_investment_interest(
-                    rrsp_interest_rate, tfsa_interest_rate, unregistered_interest_rate
-                ),
-                i,
-            )
-            # Natural limits: TFSA room increase and RRSP limit based on prior-year income
-            yield model.get_couple_rule_from_single_rule(
-                natural_rules.increase_tfsa_limit(tfsa_yearly_increase),
-                i,
-            )
-            yield model.get_couple_rule_from_single_rule(
-                natural_rules.get_update_rrsp_limit(
-                    rrsp_income_fraction, rrsp_annual_limit
-                ),
-                i,
-            )
-
-        # Those who are working earn income; both pay tax (eg on unregistered interest)
-        if not is_partner1_retired:
-            yield model.get_couple_rule_from_single_rule(partner1_salary_rule, 1)
-
-        for partner1_pretax_rule in partner1_pretax_rules:
-            yield model.get_couple_rule_from_single_rule(partner1_pretax_rule, 1)
-
-        yield model.get_couple_rule_from_single_rule(natural_rules.apply_tax, 1)
-
-        if not is_partner2_retired:
-            yield model.get_couple_rule_from_single_rule(partner2_salary_rule, 2)
-
-        for partner2_pretax_rule in partner2_pretax_rules:
-            yield model.get_couple_rule_from_single_rule(partner2_pretax_rule, 2)
-
-        yield model.get_couple_rule_from_single_rule(natural_rules.apply_tax, 2)
+        # The rules provided for current_year update the deltas of the following year
+        yield from get_combined_pretax_rules(
+            current_year + 1, is_partner1_retired, is_partner2_retired
+        )
 
         yield spending_rule
         yield savings_rule
 
-        # Rules that depend on the savings allocation (eg RRSP matching, which matches deltas.rrsp)
-        for partner1_post_savings_rule in partner1_post_savings_rules:
-            yield model.get_couple_rule_from_single_rule(partner1_post_savings_rule, 1)
-
-        for partner2_post_savings_rule in partner2_post_savings_rules:
-            yield model.get_couple_rule_from_single_rule(partner2_post_savings_rule, 2)
+        if post_savings_rule:
+            yield post_savings_rule
 
     return ruleset
+
+
+def _get_exogenous_and_endogenous_couple_rules(partner1_rules, partner2_rules):
+    """
+    Chains each partner's rules into couple rules: first one for the rules that don't depend on the outcome of a run (eg salary and
+    pension contributions), which the simulation can precompute, then one for the remaining rules. See
+    rule_dependencies.get_exogenous_rules().
+    """
+    partner1_exogenous_rules = rule_dependencies.get_exogenous_rules([partner1_rules])
+    partner2_exogenous_rules = rule_dependencies.get_exogenous_rules([partner2_rules])
+    if len(partner1_exogenous_rules) == 0 and len(partner2_exogenous_rules) == 0:
+        return [
+            model.get_couple_rule_from_partner_rules(partner1_rules, partner2_rules)
+        ]
+
+    return [
+        model.get_couple_rule_from_partner_rules(
+            [rule for rule in partner1_rules if rule in partner1_exogenous_rules],
+            [rule for rule in partner2_rules if rule in partner2_exogenous_rules],
+        ),
+        model.get_couple_rule_from_partner_rules(
+            [rule for rule in partner1_rules if rule not in partner1_exogenous_rules],
+            [rule for rule in partner2_rules if rule not in partner2_exogenous_rules],
+        ),
+    ]
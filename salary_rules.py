@@ -3,6 +3,7 @@ Rules describing the increase of salary over time.
 """
 
 import model
+from rule_dependencies import declares
 
 def get_compound_plateau(compound_rate: float, plateau: float):
     """
@@ -11,6 +12,7 @@ def get_compound_plateau(compound_rate: float, plateau: float):
     s[y] = min[p, (1 + c)s[y-1]] where s = salary, y = year, p = plateau value and c = compound_rate
     """
 
+    @declares(reads=["previous_deltas.gross_salary"], writes=["deltas.gross_salary"])
     def compound_plateau(deltas: model.deltas_state, previous_funds: model.funds_state, previous_deltas: model.deltas_state):
         compounded_salary = (1 + compound_rate) * previous_deltas.gross_salary
         new_salary = min(plateau, compounded_salary)
@@ -35,6 +37,15 @@ def get_rrsp_matching(matching_cap_fraction: float):
     The match is added both to the RRSP contribution (it's deposited in the RRSP) and to benefits (it's a taxable benefit).
     """
 
+    @declares(
+        reads=[
+            "deltas.gross_salary",
+            "deltas.rrsp",
+            "deltas.rrsp_available_room",
+            "previous_funds.rrsp_available_room",
+        ],
+        writes=["deltas.rrsp", "deltas.benefits"],
+    )
     def rrsp_matching(deltas: model.deltas_state, previous_funds: model.funds_state, previous_deltas: model.deltas_state):
         cap = matching_cap_fraction * deltas.gross_salary
         current_funds = model.get_updated_funds_from_deltas(previous_funds, deltas)
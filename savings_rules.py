@@ -1,5 +1,6 @@
 import model
 from typing import Callable
+from rule_dependencies import declares
 
 
 def get_simple_linear(
@@ -30,6 +31,10 @@ def get_simple_linear_func(
         a = initial_rrsp (normalized value), b = (final_rrsp - initial_rrsp) / career_length_yrs, y_0 = initial_year, y = current year
     """
 
+    @declares(
+        reads=["deltas.year", "deltas.undifferentiated_savings"],
+        writes=["deltas.rrsp", "deltas.tfsa"],
+    )
     def simple_linear(
         deltas: model.deltas_state,
         previous_funds: model.funds_state,
@@ -87,6 +92,14 @@ def get_simple_retirement_deduction(retirement_year: int, year_of_death: int):
     constant level of RRSP withdrawals, to minimize marginal tax.
     """
 
+    @declares(
+        reads=[
+            "deltas.year",
+            "deltas.undifferentiated_savings",
+            "previous_funds.rrsp_savings",
+        ],
+        writes=["deltas.rrsp", "deltas.tfsa"],
+    )
     def simple_retirement_deduction(
         deltas: model.deltas_state,
         previous_funds: model.funds_state,
@@ -142,6 +155,10 @@ def get__linear_retirement_deduction_func(
         fail_func,
     )
 
+    @declares(
+        reads=list(inner_rule.reads) + ["previous_funds.rrsp_savings", "deltas.rrsp"],
+        writes=inner_rule.writes,
+    )
     def checked_rule(
         deltas: model.deltas_state,
         previous_funds: model.funds_state,
@@ -166,6 +183,14 @@ def get_adjusted_heuristic_retirement_deduction(
     constant level of RRSP withdrawals, to minimize marginal tax, adjusted by an optimizable constant proportional offset.
     """
 
+    @declares(
+        reads=[
+            "deltas.year",
+            "deltas.undifferentiated_savings",
+            "previous_funds.rrsp_savings",
+        ],
+        writes=["deltas.rrsp", "deltas.tfsa"],
+    )
     def simple_retirement_deduction(
         deltas: model.deltas_state,
         previous_funds: model.funds_state,
@@ -0,0 +1,847 @@
+"""
+Scenario payloads, which describe a simulation as plain JSON-compatible data, so that simulations can be run without a notebook.
+
+A payload is a dict whose 'type' is either 'Dual_Income_Simulation' or 'Simulation'.
+
+A 'Dual_Income_Simulation' payload mirrors the configuration section of DualIncomeForecast.nb.py, and is run with
+couple_rulesets.charlie():
+
+    {
+        "type": "Dual_Income_Simulation",
+        "partner1": {"year_of_birth": 1990, "age_at_retirement": 60, ...},
+        "partner2": {...},
+        "simulation": {"initial_year": 2025, "final_savings": 0},
+        "settings": {"interest_rate": 0.05, "tfsa_yearly_increase": 6000, ..., "should_optimize": false}
+    }
+
+A 'Simulation' payload sets the attributes of a single-income sim.Simulation, and names one of the rulesets in rulesets.py along with
+its arguments. The ruleset arguments that are determined by the simulation (initial_year, year_of_retirement, year_of_death and
+optimize) are filled in automatically:
+
+    {
+        "type": "Simulation",
+        "simulation": {"age_at_retirement": 60, "year_of_birth": 1990, ...},
+        "ruleset": "hawking",
+        "ruleset_arguments": {"salary_compound_rate": 0.05, ...},
+        "settings": {"should_optimize": false}
+    }
+
+Fields listed with a default below may be omitted. Any other missing or unknown field is an error. Fields are numbers, except for
+'name' (a string), years and ages at death (whole numbers), 'should_optimize' (true or false), and ruleset arguments, whose types
+are those of the ruleset's parameters. A field whose default is null may also be null.
+
+Payloads are validated once by compile_spec(), which returns a Scenario_Spec. Sweeps over many variants of a scenario should derive
+them from one spec with Scenario_Spec.variant(), which avoids revalidating the payload and shares unchanged rules between variants.
+"""
+
+import concurrent.futures
+import copy
+import inspect
+import multiprocessing
+import numbers
+import threading
+import couple_rulesets
+import present
+import ruleset
+import rulesets
+import sim
+import solve
+
+DUAL_INCOME_SIMULATION = "Dual_Income_Simulation"
+SIMULATION = "Simulation"
+
+_REQUIRED = object()
+
+_PARTNER_FIELDS = {
+    "name": None,
+    "year_of_birth": _REQUIRED,
+    "age_at_retirement": _REQUIRED,
+    "age_at_death": _REQUIRED,
+    "initial_salary": _REQUIRED,
+    "initial_savings_rrsp": _REQUIRED,
+    "initial_savings_tfsa": _REQUIRED,
+    "initial_savings_unregistered": _REQUIRED,
+    "initial_rrsp_limit": _REQUIRED,
+    "initial_tfsa_limit": _REQUIRED,
+    "salary_plateau": _REQUIRED,
+    "salary_compound_rate": _REQUIRED,
+    "rrsp_matching_cap_fraction": 0.0,
+    "current_monthly_pension_at_60": _REQUIRED,
+    "projected_monthly_pension_at_60": _REQUIRED,
+    "current_monthly_pension_at_65": _REQUIRED,
+    "projected_monthly_pension_at_65": _REQUIRED,
+    "pension_start_age": _REQUIRED,
+}
+
+_DUAL_INCOME_SIMULATION_FIELDS = {
+    "initial_year": _REQUIRED,
+    "final_savings": 0,
+}
+
+_DUAL_INCOME_SETTINGS_FIELDS = {
+    "interest_rate": 0.05,
+    # Defaults to interest_rate
+    "unregistered_interest_rate": None,
+    "tfsa_yearly_increase": _REQUIRED,
+    "rrsp_income_fraction": 0.18,
+    "rrsp_annual_limit": _REQUIRED,
+    "qpp_maximum_pensionable_earnings": _REQUIRED,
+    "qpp_pension_contribution": _REQUIRED,
+    "mortgage_principal": 0,
+    "mortgage_amortization": 0,
+    "mortgage_interest": 0,
+    "increase_savings_weight": 0.5,
+    "should_optimize": False,
+    "initial_non_rrsp": 0.5,
+    "final_non_rrsp": 0.5,
+    "initial_equalize_income_weighting": 0.5,
+    "final_equalize_income_weighting": 0.5,
+    "rrsp_adjustment": 0.05,
+}
+
+_SIMULATION_FIELDS = {
+    "age_at_retirement": _REQUIRED,
+    "year_of_birth": _REQUIRED,
+    "initial_year": _REQUIRED,
+    "age_at_death": _REQUIRED,
+    "savings_at_death": 0,
+    "initial_salary": _REQUIRED,
+    "initial_savings_rrsp": _REQUIRED,
+    "initial_savings_tfsa": _REQUIRED,
+    "initial_savings_unregistered": 0,
+    "initial_tfsa_limit": _REQUIRED,
+    "initial_rrsp_limit": _REQUIRED,
+}
+
+_SIMULATION_SETTINGS_FIELDS = {
+    "should_optimize": False,
+}
+
+# Fields which aren't numbers (or true or false, for fields whose default is), or which must be whole numbers
+_FIELD_TYPES = {
+    "name": str,
+    "year_of_birth": int,
+    "initial_year": int,
+    "age_at_death": int,
+}
+
+_DUAL_INCOME_SECTIONS = {
+    "partner1": _PARTNER_FIELDS,
+    "partner2": _PARTNER_FIELDS,
+    "simulation": _DUAL_INCOME_SIMULATION_FIELDS,
+    "settings": _DUAL_INCOME_SETTINGS_FIELDS,
+}
+
+_SIMULATION_SECTIONS = {
+    "simulation": _SIMULATION_FIELDS,
+    "settings": _SIMULATION_SETTINGS_FIELDS,
+}
+
+# Ruleset arguments which are determined by the simulation
+_SIMULATION_RULESET_ARGUMENTS = {
+    "initial_year",
+    "year_of_retirement",
+    "year_of_death",
+    "optimize",
+}
+
+_SIMULATION_RULESETS = {
+    name: getattr(rulesets, name)
+    for name in [
+        "ampere",
+        "bose",
+        "curie",
+        "dirac",
+        "einstein",
+        "franklin",
+        "galileo",
+        "hawking",
+    ]
+}
+
+
+class Scenario:
+    """A simulation built from a scenario payload, ready to be run, along with the solver it uses."""
+
+    def __init__(
+        self, payload_type: str, simulation, optimizer: solve.Optimizing_Solver
+    ):
+        self._type = payload_type
+        self._simulation = simulation
+        self._optimizer = optimizer
+
+    @property
+    def type(self):
+        """The type of the payload, either 'Dual_Income_Simulation' or 'Simulation'."""
+        return self._type
+
+    @property
+    def simulation(self):
+        """The sim.Dual_Income_Simulation or sim.Simulation."""
+        return self._simulation
+
+    @property
+    def optimizer(self):
+        """The optimizing solver used by the simulation. Progress can be observed by setting its progress_callback."""
+        return self._optimizer
+
+    def run(self):
+        """Runs the simulation, and returns its results (see get_results())."""
+        self._simulation.run()
+        return get_results(self)
+
+
+class Scenario_Spec:
+    """
+    A scenario payload which has been validated, with defaults filled in. It can be built into any number of simulations, and
+    variants which change a few of its fields can be derived without revalidating the rest.
+
+    Variants share a ruleset.Rule_Cache, so the stateless rules which their changes don't affect (eg salary, pension and mortgage
+    rules, and the partners' combined rules) are built once and reused by all of them.
+    """
+
+    def __init__(self, payload_type: str, sections, rule_cache: ruleset.Rule_Cache):
+        self._type = payload_type
+        self._sections = sections
+        self._rule_cache = rule_cache
+
+    @property
+    def type(self):
+        """The type of the payload, either 'Dual_Income_Simulation' or 'Simulation'."""
+        return self._type
+
+    def to_payload(self):
+        """Returns the equivalent payload, with defaults filled in."""
+        return {"type": self._type, **copy.deepcopy(self._sections)}
+
+    def variant(self, changes) -> "Scenario_Spec":
+        """
+        Returns a spec with some fields changed. Only the changed sections are validated again.
+
+        :param changes: A partial payload, eg {"partner1": {"age_at_retirement": 62}}. Fields which aren't mentioned keep their value.
+        """
+        if not isinstance(changes, dict):
+            raise ValueError("Changes must be an object")
+        _check_keys("scenario", changes, set(self._sections))
+
+        sections = dict(self._sections)
+        for name, section_changes in changes.items():
+            if isinstance(sections[name], dict):
+                if not isinstance(section_changes, dict):
+                    raise ValueError(f"'{name}' must be an object")
+                sections[name] = {**sections[name], **section_changes}
+            else:
+                sections[name] = section_changes
+        if self._type == DUAL_INCOME_SIMULATION:
+            for name in changes:
+                sections[name] = _get_fields(
+                    name, sections[name], _DUAL_INCOME_SECTIONS[name]
+                )
+        else:
+            for name in changes.keys() & _SIMULATION_SECTIONS.keys():
+                sections[name] = _get_fields(
+                    name, sections[name], _SIMULATION_SECTIONS[name]
+                )
+            if "ruleset" in changes or "ruleset_arguments" in changes:
+                _check_ruleset_arguments(
+                    sections["ruleset"], sections["ruleset_arguments"]
+                )
+        return Scenario_Spec(self._type, sections, self._rule_cache)
+
+    def build(
+        self, initial_spending_guess: float = None, initial_spending_bracket=None
+    ) -> Scenario:
+        """
+        Builds the simulation described by the spec.
+
+        :param initial_spending_guess: Optional guess of the required initial spending (eg the solution of a similar scenario), which
+            the solver searches around first (see solve.get_warm_started_solver()).
+        :param initial_spending_bracket: Optional (lower, upper) bracket of the required initial spending (eg between the solutions
+            of two neighbouring scenarios), which the solver searches first (see solve.get_bracketed_solver()). Takes precedence
+            over initial_spending_guess.
+        """
+        optimizer = _get_optimizer(
+            self._sections["settings"]["should_optimize"],
+            initial_spending_guess,
+            initial_spending_bracket,
+        )
+        if self._type == DUAL_INCOME_SIMULATION:
+            return _build_dual_income_simulation(
+                self._sections, optimizer, self._rule_cache
+            )
+        return _build_simulation(self._sections, optimizer)
+
+    def run(
+        self,
+        progress_callback=None,
+        initial_spending_guess: float = None,
+        initial_spending_bracket=None,
+    ):
+        """
+        Builds and runs the simulation described by the spec, and returns its results (see get_results()).
+
+        :param progress_callback: Optional function, called as progress_callback(iteration, best_spending) while solving (see
+            solve.Optimizing_Solver.progress_callback).
+        :param initial_spending_guess: Optional guess of the required initial spending, see build().
+        :param initial_spending_bracket: Optional bracket of the required initial spending, see build().
+        """
+        scenario = self.build(initial_spending_guess, initial_spending_bracket)
+        scenario.optimizer.progress_callback = progress_callback
+        return scenario.run()
+
+
+def compile_spec(payload) -> Scenario_Spec:
+    """Validates a scenario payload, and returns it as a Scenario_Spec. Raises ValueError describing the first problem found."""
+    payload_type = _get_payload_type(payload)
+    if payload_type == DUAL_INCOME_SIMULATION:
+        _check_keys("scenario", payload, {"type", *_DUAL_INCOME_SECTIONS})
+        sections = {
+            name: _get_fields(name, payload.get(name), fields)
+            for name, fields in _DUAL_INCOME_SECTIONS.items()
+        }
+    else:
+        _check_keys(
+            "scenario",
+            payload,
+            {"type", "ruleset", "ruleset_arguments", *_SIMULATION_SECTIONS},
+        )
+        sections = {
+            name: _get_fields(name, payload.get(name, {}), fields)
+            for name, fields in _SIMULATION_SECTIONS.items()
+        }
+        sections["ruleset"] = payload.get("ruleset")
+        sections["ruleset_arguments"] = payload.get("ruleset_arguments", {})
+        _check_ruleset_arguments(sections["ruleset"], sections["ruleset_arguments"])
+    return Scenario_Spec(payload_type, sections, ruleset.Rule_Cache())
+
+
+def validate(payload):
+    """
+    Checks that a scenario payload is well-formed, without building the simulation. Raises ValueError describing the first problem
+    found.
+    """
+    compile_spec(payload)
+
+
+def build(payload) -> Scenario:
+    """Builds the simulation described by a scenario payload. Raises ValueError if the payload isn't well-formed."""
+    return compile_spec(payload).build()
+
+
+def run(payload, progress_callback=None):
+    """
+    Builds and runs the simulation described by a scenario payload, and returns its results (see get_results()).
+
+    :param progress_callback: Optional function, called as progress_callback(iteration, best_spending) while solving (see
+        solve.Optimizing_Solver.progress_callback).
+    """
+    return compile_spec(payload).run(progress_callback)
+
+
+def get_parallel_coarse_search(
+    payload, executor: concurrent.futures.Executor, sample_count: int = 32
+) -> solve.Coarse_Search:
+    """
+    Returns a solve.Coarse_Search which solves its sampled points concurrently on an executor, for the optimizer of a scenario built
+    from the payload. Each point is solved in a worker process, by building the scenario with optimization disabled and the
+    optimized variables at the point.
+
+    :param payload: A scenario payload, which must be the one the optimizer's scenario was built from.
+    :param executor: The executor to solve points on, eg a process pool.
+    :param sample_count: The number of points sampled, see solve.Coarse_Search.
+    """
+    payload = compile_spec(payload).to_payload()
+
+    def evaluate_points(variable_names, points, tolerance):
+        futures = [
+            executor.submit(
+                _evaluate_coarse_point,
+                payload,
+                variable_names,
+                [float(value) for value in point],
+                tolerance,
+            )
+            for point in points
+        ]
+        return [future.result() for future in futures]
+
+    return solve.Coarse_Search(sample_count, evaluate_points=evaluate_points)
+
+
+def _evaluate_coarse_point(payload, variable_names, point, tolerance: float):
+    """
+    Solves a scenario in a worker process with its optimized variables at a point, at the given tolerance, and returns a tuple of
+    (required initial spending, was_solution_found).
+    """
+    scenario = compile_spec(payload).build()
+    optimizer = scenario.optimizer
+    optimizer.is_optimization_disabled = True
+    for name, value in zip(variable_names, point):
+        optimizer.set_initial_guess(name, value)
+
+    def solver(intermediate_fn, model_fn, target_output, lower_bound, upper_bound, _):
+        return optimizer.solve(
+            intermediate_fn,
+            model_fn,
+            target_output,
+            lower_bound,
+            upper_bound,
+            tolerance,
+        )
+
+    simulation = scenario.simulation
+    simulation.set_solver(solver)
+    simulation.run()
+    return simulation.required_initial_spending, bool(simulation.was_solution_found)
+
+
+def get_parallel_k_section_solver(
+    payload,
+    optimizer: solve.Optimizing_Solver,
+    executor: concurrent.futures.Executor,
+    interior_point_count: int = 3,
+):
+    """
+    Returns a k-section solver (see solve.get_k_section_solver()) which runs the interior points of each iteration concurrently on an
+    executor, for a scenario built from the payload. It replaces the inner solver of the scenario's optimizer
+    (solve.Optimizing_Solver.inner_solver). Each point is run in a worker process, with the optimized variables at the optimizer's
+    current values, by a scenario which the worker builds from the payload and those values, and keeps for later points with the same
+    values. Each thread of a worker builds its own scenario.
+
+    :param payload: A scenario payload, which must be the one the optimizer's scenario was built from.
+    :param optimizer: The optimizer of the scenario, whose inner solver the solver replaces.
+    :param executor: The executor to run points on, eg a process pool with interior_point_count workers.
+    :param interior_point_count: The number of points run per iteration, see solve.get_k_section_solver().
+    """
+    payload = compile_spec(payload).to_payload()
+
+    def evaluate_inputs(intermediate_fn, model_fn, inputs):
+        optimized_values = tuple(optimizer.get_all_current_values())
+        futures = [
+            executor.submit(
+                _evaluate_initial_spending, payload, optimized_values, float(x)
+            )
+            for x in inputs
+        ]
+        return [future.result() for future in futures]
+
+    return solve.get_k_section_solver(interior_point_count, evaluate_inputs)
+
+
+# The (intermediate_fn, model_fn) pairs of the simulations of the scenarios run by _evaluate_initial_spending() in each thread, keyed
+# by the repr() of their payloads and optimized values. They're kept per thread, since rules keep state between the years of a run.
+# Since an optimizer moves on from each point once it's solved, only the scenario of the latest point is kept.
+_worker_models = threading.local()
+
+
+def _evaluate_initial_spending(payload, optimized_values, initial_spending: float):
+    """
+    Runs a scenario in a worker process at an initial spending, with its optimized variables at the given (name, value) pairs, and
+    returns its final savings.
+    """
+    models = getattr(_worker_models, "models", None)
+    if models is None:
+        models = _worker_models.models = {}
+    key = repr((payload, optimized_values))
+    if key not in models:
+        scenario = compile_spec(payload).build()
+        optimizer = scenario.optimizer
+        optimizer.is_optimization_disabled = True
+        for name, value in optimized_values:
+            optimizer.set_initial_guess(name, value)
+
+        def solver(intermediate_fn, model_fn, *_):
+            # Keep the simulation's functions rather than solving
+            models.clear()
+            models[key] = (intermediate_fn, model_fn)
+            return (None, None, False, "")
+
+        optimizer.inner_solver = solver
+        scenario.simulation.run()
+    intermediate_fn, model_fn = models[key]
+    return model_fn(intermediate_fn(initial_spending))
+
+
+def get_parallel_multi_start(
+    payload, executor: concurrent.futures.Executor, start_count: int = 8, **kwargs
+) -> solve.Multi_Start:
+    """
+    Returns a solve.Multi_Start which runs its starts concurrently on an executor, for the optimizer of a scenario built from the
+    payload. Each start is run in a worker process, by building the scenario with the optimized variables starting at the start's
+    point. Starts record their best outputs in a mapping shared between workers, so that they can be pruned.
+
+    :param payload: A scenario payload, which must be the one the optimizer's scenario was built from.
+    :param executor: The executor to run starts on, eg a process pool.
+    :param start_count: The number of starts, see solve.Multi_Start.
+    :param kwargs: Other solve.Multi_Start arguments, eg prune_margin.
+    """
+    payload = compile_spec(payload).to_payload()
+
+    def run_starts(variable_names, start_points, tolerance):
+        if not isinstance(executor, concurrent.futures.ProcessPoolExecutor):
+            return _run_starts(
+                executor, payload, variable_names, start_points, tolerance, {}, kwargs
+            )
+        # Worker processes share the best outputs through a manager process
+        with multiprocessing.get_context("forkserver").Manager() as manager:
+            return _run_starts(
+                executor,
+                payload,
+                variable_names,
+                start_points,
+                tolerance,
+                manager.dict(),
+                kwargs,
+            )
+
+    return solve.Multi_Start(start_count, run_starts=run_starts, **kwargs)
+
+
+def _run_starts(
+    executor, payload, variable_names, start_points, tolerance, best_outputs, kwargs
+):
+    futures = [
+        executor.submit(
+            _run_start,
+            payload,
+            variable_names,
+            [float(value) for value in point],
+            tolerance,
+            i,
+            best_outputs,
+            kwargs,
+        )
+        for i, point in enumerate(start_points)
+    ]
+    return [future.result() for future in futures]
+
+
+def _run_start(
+    payload,
+    variable_names,
+    point,
+    tolerance: float,
+    start_index: int,
+    best_outputs,
+    kwargs,
+):
+    """
+    Runs one start of a parallel multi-start in a worker process, at the given tolerance, and returns its local optimum.
+    """
+    scenario = compile_spec(payload).build()
+    optimizer = scenario.optimizer
+    optimizer.is_optimization_disabled = False
+    for name, value in zip(variable_names, point):
+        optimizer.set_initial_guess(name, value)
+    optimizer.multi_start = solve.Multi_Start(
+        1, first_start_index=start_index, best_outputs=best_outputs, **kwargs
+    )
+
+    def solver(intermediate_fn, model_fn, target_output, lower_bound, upper_bound, _):
+        return optimizer.solve(
+            intermediate_fn,
+            model_fn,
+            target_output,
+            lower_bound,
+            upper_bound,
+            tolerance,
+        )
+
+    scenario.simulation.set_solver(solver)
+    scenario.simulation.run()
+    return optimizer.local_optima[0]
+
+
+def get_results(scenario: Scenario):
+    """
+    Returns the results of a scenario which has been run, as a JSON-compatible dict. 'summary' and 'series' contain the values and
+    year-by-year series produced by the presenter in present.py, with each partner's series nested under 'partner1' and 'partner2'.
+    """
+    simulation = scenario.simulation
+    if scenario.type == DUAL_INCOME_SIMULATION:
+        presenter = present.Dual_Income_Simulation_Presenter(simulation)
+    else:
+        presenter = present.Simulation_Presenter(simulation)
+
+    summary, series = _get_presenter_values(presenter)
+    return {
+        "type": scenario.type,
+        "was_solution_found": bool(simulation.was_solution_found),
+        "run_message": str(simulation.run_message),
+        "required_initial_spending": _to_json_value(
+            simulation.required_initial_spending
+        ),
+        "optimized_values": (
+            {
+                name: _to_json_value(value)
+                for name, value in scenario.optimizer.get_all_optimized_values()
+            }
+            if not scenario.optimizer.is_optimization_disabled
+            else {}
+        ),
+        "summary": summary,
+        "series": series,
+    }
+
+
+def _get_payload_type(payload):
+    if not isinstance(payload, dict):
+        raise ValueError("Scenario payload must be an object")
+    payload_type = payload.get("type")
+    if payload_type not in (DUAL_INCOME_SIMULATION, SIMULATION):
+        raise ValueError(
+            f"Scenario type must be '{DUAL_INCOME_SIMULATION}' or '{SIMULATION}', not {payload_type!r}"
+        )
+    return payload_type
+
+
+def _check_ruleset_arguments(ruleset_name, ruleset_arguments):
+    if ruleset_name not in _SIMULATION_RULESETS:
+        raise ValueError(
+            f"Unknown ruleset {ruleset_name!r}, expected one of {sorted(_SIMULATION_RULESETS)}"
+        )
+    if not isinstance(ruleset_arguments, dict):
+        raise ValueError("'ruleset_arguments' must be an object")
+    parameters = inspect.signature(_SIMULATION_RULESETS[ruleset_name]).parameters
+    _check_keys(
+        "ruleset_arguments",
+        ruleset_arguments,
+        set(parameters) - _SIMULATION_RULESET_ARGUMENTS,
+    )
+    missing = [
+        name
+        for name, parameter in parameters.items()
+        if parameter.default is inspect.Parameter.empty
+        and name not in ruleset_arguments
+        and name not in _SIMULATION_RULESET_ARGUMENTS
+    ]
+    if len(missing) > 0:
+        raise ValueError(f"Missing field 'ruleset_arguments.{missing[0]}'")
+    for name, value in ruleset_arguments.items():
+        expected_type = parameters[name].annotation
+        if expected_type in (bool, int, float, str):
+            _check_type(f"ruleset_arguments.{name}", value, expected_type)
+
+
+def _check_keys(section_name: str, section, allowed_keys):
+    unknown = sorted(set(section) - set(allowed_keys))
+    if len(unknown) > 0:
+        raise ValueError(f"Unknown field '{section_name}.{unknown[0]}'")
+
+
+def _get_fields(section_name: str, section, fields):
+    if not isinstance(section, dict):
+        raise ValueError(f"'{section_name}' must be an object")
+    _check_keys(section_name, section, fields)
+    values = {}
+    for name, default in fields.items():
+        if name in section:
+            value = section[name]
+            if value is not None or default is not None:
+                expected_type = _FIELD_TYPES.get(
+                    name, bool if isinstance(default, bool) else float
+                )
+                _check_type(f"{section_name}.{name}", value, expected_type)
+            values[name] = value
+        elif default is _REQUIRED:
+            raise ValueError(f"Missing field '{section_name}.{name}'")
+        else:
+            values[name] = default
+    return values
+
+
+def _check_type(field_name: str, value, expected_type):
+    if expected_type is bool:
+        is_valid = isinstance(value, bool)
+        description = "true or false"
+    elif expected_type is str:
+        is_valid = isinstance(value, str)
+        description = "a string"
+    elif expected_type is int:
+        is_valid = isinstance(value, numbers.Integral) and not isinstance(value, bool)
+        description = "a whole number"
+    else:
+        is_valid = isinstance(value, numbers.Real) and not isinstance(value, bool)
+        description = "a number"
+    if not is_valid:
+        raise ValueError(f"Field '{field_name}' must be {description}, not {value!r}")
+
+
+def _get_optimizer(
+    should_optimize: bool,
+    initial_spending_guess: float = None,
+    initial_spending_bracket=None,
+):
+    inner_solver = solve.binary_solver
+    if initial_spending_bracket is not None:
+        inner_solver = solve.get_bracketed_solver(
+            inner_solver, *initial_spending_bracket
+        )
+    elif initial_spending_guess is not None:
+        inner_solver = solve.get_warm_started_solver(
+            inner_solver, initial_spending_guess
+        )
+    optimizer = solve.Optimizing_Solver(inner_solver, should_invert=True)
+    optimizer.is_optimization_disabled = not should_optimize
+    return optimizer
+
+
+def _build_dual_income_simulation(
+    sections, optimizer: solve.Optimizing_Solver, rule_cache: ruleset.Rule_Cache
+):
+    partner1 = sections["partner1"]
+    partner2 = sections["partner2"]
+    simulation_fields = sections["simulation"]
+    settings = sections["settings"]
+    unregistered_interest_rate = settings["unregistered_interest_rate"]
+    if unregistered_interest_rate is None:
+        unregistered_interest_rate = settings["interest_rate"]
+
+    simulation = sim.Dual_Income_Simulation()
+    for parameters, fields in [
+        (simulation.partner1_parameters, partner1),
+        (simulation.partner2_parameters, partner2),
+    ]:
+        for name in [
+            "age_at_retirement",
+            "year_of_birth",
+            "age_at_death",
+            "initial_salary",
+            "initial_savings_rrsp",
+            "initial_savings_tfsa",
+            "initial_savings_unregistered",
+            "initial_tfsa_limit",
+            "initial_rrsp_limit",
+            "rrsp_matching_cap_fraction",
+        ]:
+            setattr(parameters, name, fields[name])
+    simulation.initial_year = simulation_fields["initial_year"]
+    simulation.final_savings = simulation_fields["final_savings"]
+
+    simulation.set_solver(optimizer.solve)
+
+    partner_arguments = {}
+    for partner_name, parameters, fields in [
+        ("partner1", simulation.partner1_parameters, partner1),
+        ("partner2", simulation.partner2_parameters, partner2),
+    ]:
+        partner_arguments.update(
+            {
+                f"{partner_name}_salary_compound_rate": fields["salary_compound_rate"],
+                f"{partner_name}_salary_plateau": fields["salary_plateau"],
+                f"{partner_name}_year_of_retirement": parameters.year_of_retirement,
+                f"{partner_name}_rrsp_matching_cap_fraction": fields[
+                    "rrsp_matching_cap_fraction"
+                ],
+                f"{partner_name}_current_monthly_pension_at_60": fields[
+                    "current_monthly_pension_at_60"
+                ],
+                f"{partner_name}_projected_monthly_pension_at_60": fields[
+                    "projected_monthly_pension_at_60"
+                ],
+                f"{partner_name}_current_monthly_pension_at_65": fields[
+                    "current_monthly_pension_at_65"
+                ],
+                f"{partner_name}_projected_monthly_pension_at_65": fields[
+                    "projected_monthly_pension_at_65"
+                ],
+                f"{partner_name}_retirement_age": fields["age_at_retirement"],
+                f"{partner_name}_pension_start_age": fields["pension_start_age"],
+            }
+        )
+
+    simulation.set_ruleset(
+        couple_rulesets.charlie(
+            initial_year=simulation.initial_year,
+            increase_savings_weight=settings["increase_savings_weight"],
+            initial_non_rrsp_guess=settings["initial_non_rrsp"],
+            final_non_rrsp_guess=settings["final_non_rrsp"],
+            initial_equalize_income_weighting_guess=settings[
+                "initial_equalize_income_weighting"
+            ],
+            final_equalize_income_weighting_guess=settings[
+                "final_equalize_income_weighting"
+            ],
+            final_year=simulation.final_year,
+            rrsp_adjustment_guess=settings["rrsp_adjustment"],
+            rrsp_interest_rate=settings["interest_rate"],
+            tfsa_interest_rate=settings["interest_rate"],
+            unregistered_interest_rate=unregistered_interest_rate,
+            tfsa_yearly_increase=settings["tfsa_yearly_increase"],
+            rrsp_income_fraction=settings["rrsp_income_fraction"],
+            rrsp_annual_limit=settings["rrsp_annual_limit"],
+            optimize=optimizer,
+            mortgage_principal=settings["mortgage_principal"],
+            mortgage_amortization=settings["mortgage_amortization"],
+            mortgage_interest=settings["mortgage_interest"],
+            qpp_maximum_pensionable_earnings=settings[
+                "qpp_maximum_pensionable_earnings"
+            ],
+            qpp_pension_contribution=settings["qpp_pension_contribution"],
+            rule_cache=rule_cache,
+            **partner_arguments,
+        )
+    )
+    return Scenario(DUAL_INCOME_SIMULATION, simulation, optimizer)
+
+
+def _build_simulation(sections, optimizer: solve.Optimizing_Solver):
+    simulation_fields = sections["simulation"]
+    settings = sections["settings"]
+    ruleset_name = sections["ruleset"]
+    ruleset_arguments = sections["ruleset_arguments"]
+
+    simulation = sim.Simulation()
+    for name, value in simulation_fields.items():
+        setattr(simulation, name, value)
+
+    simulation.set_solver(optimizer.solve)
+
+    ruleset_function = _SIMULATION_RULESETS[ruleset_name]
+    simulation_arguments = {
+        "initial_year": simulation.initial_year,
+        "year_of_retirement": simulation.year_of_retirement,
+        "year_of_death": simulation.year_of_death,
+        "optimize": optimizer,
+    }
+    parameters = inspect.signature(ruleset_function).parameters
+    career_rules, retirement_rules = ruleset_function(
+        **ruleset_arguments,
+        **{
+            name: value
+            for name, value in simulation_arguments.items()
+            if name in parameters
+        },
+    )
+    simulation.set_rules(career_rules)
+    simulation.set_retirement_rules(retirement_rules)
+    return Scenario(SIMULATION, simulation, optimizer)
+
+
+def _get_presenter_values(presenter):
+    """Returns dicts of the scalar values and of the series exposed as public properties of a presenter."""
+    summary = {}
+    series = {}
+    for name, attribute in vars(type(presenter)).items():
+        if name.startswith("_") or not isinstance(attribute, property):
+            continue
+        try:
+            value = getattr(presenter, name)
+        except AttributeError:
+            # Not every presenter property applies to every simulation (eg a couple has no single year of retirement)
+            continue
+        if isinstance(value, present.Individual_Presenter):
+            series[name] = _get_presenter_values(value)[1]
+        elif isinstance(value, list):
+            series[name] = [_to_json_value(v) for v in value]
+        else:
+            summary[name] = _to_json_value(value)
+    return summary, series
+
+
+def _to_json_value(value):
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, numbers.Integral):
+        return int(value)
+    return float(value)
@@ -0,0 +1,236 @@
+"""
+Sensitivity ('tornado') analysis of the required initial spending of a scenario (see scenario.py), which shows which inputs matter most.
+
+Each input is perturbed down and up in turn, and the required initial spending is solved again for each perturbation. The solves run
+concurrently on a pool of worker processes, and are warm-started from the base scenario's solution: the solver first searches a narrow
+spending bracket around the base solution, and optimized variables start from the base scenario's optimum.
+"""
+
+import concurrent.futures
+import multiprocessing
+import scenario
+
+
+class Sensitivity_Input:
+    """
+    An input of a scenario to perturb, and the size of the perturbation.
+
+    :param section: The payload section containing the input, eg 'partner1'.
+    :param field: The field of the input, eg 'age_at_retirement'.
+    :param step: The size of the perturbation in each direction.
+    :param is_relative: If true, the step is a fraction of the input's value, otherwise it's an absolute amount.
+    :param lower_limit: Optional lowest allowed value of the input.
+    :param upper_limit: Optional highest allowed value of the input.
+    """
+
+    def __init__(
+        self,
+        section: str,
+        field: str,
+        step: float,
+        is_relative: bool = True,
+        lower_limit: float = None,
+        upper_limit: float = None,
+    ):
+        self._section = section
+        self._field = field
+        self._step = step
+        self._is_relative = is_relative
+        self._lower_limit = lower_limit
+        self._upper_limit = upper_limit
+
+    @property
+    def section(self):
+        return self._section
+
+    @property
+    def field(self):
+        return self._field
+
+    @property
+    def name(self):
+        return f"{self._section}.{self._field}"
+
+    def get_perturbed_values(self, value: float):
+        """Returns the (low, high) perturbed values of the input, given its base value."""
+        step = abs(value) * self._step if self._is_relative else self._step
+        low = value - step
+        high = value + step
+        if self._lower_limit is not None:
+            low = max(low, self._lower_limit)
+        if self._upper_limit is not None:
+            high = min(high, self._upper_limit)
+        return low, high
+
+
+# Default inputs of 'Dual_Income_Simulation' payloads
+DEFAULT_INPUTS = [
+    # Also changes the unregistered interest rate, unless it's set separately
+    Sensitivity_Input("settings", "interest_rate", 0.1),
+    Sensitivity_Input("partner1", "salary_plateau", 0.1),
+    Sensitivity_Input("partner2", "salary_plateau", 0.1),
+    Sensitivity_Input("partner1", "salary_compound_rate", 0.1),
+    Sensitivity_Input("partner2", "salary_compound_rate", 0.1),
+    Sensitivity_Input("partner1", "age_at_retirement", 1, is_relative=False),
+    Sensitivity_Input("partner2", "age_at_retirement", 1, is_relative=False),
+    Sensitivity_Input("settings", "qpp_maximum_pensionable_earnings", 0.1),
+    Sensitivity_Input("settings", "qpp_pension_contribution", 0.1),
+    Sensitivity_Input(
+        "partner1",
+        "pension_start_age",
+        1,
+        is_relative=False,
+        lower_limit=60,
+        upper_limit=70,
+    ),
+    Sensitivity_Input(
+        "partner2",
+        "pension_start_age",
+        1,
+        is_relative=False,
+        lower_limit=60,
+        upper_limit=70,
+    ),
+    Sensitivity_Input("settings", "mortgage_principal", 0.1),
+    Sensitivity_Input(
+        "settings", "mortgage_amortization", 1, is_relative=False, lower_limit=1
+    ),
+    Sensitivity_Input("settings", "mortgage_interest", 0.1),
+    Sensitivity_Input(
+        "settings",
+        "increase_savings_weight",
+        0.1,
+        is_relative=False,
+        lower_limit=0,
+        upper_limit=1,
+    ),
+]
+
+# Default inputs of 'Simulation' payloads. The ruleset arguments depend on the ruleset, so only the simulation's own inputs are perturbed.
+DEFAULT_SIMULATION_INPUTS = [
+    Sensitivity_Input("simulation", "initial_salary", 0.1),
+    Sensitivity_Input("simulation", "age_at_retirement", 1, is_relative=False),
+    Sensitivity_Input("simulation", "age_at_death", 1, is_relative=False),
+    Sensitivity_Input("simulation", "savings_at_death", 0.1),
+    Sensitivity_Input("simulation", "initial_savings_rrsp", 0.1),
+    Sensitivity_Input("simulation", "initial_savings_tfsa", 0.1),
+]
+
+
+def get_sensitivities(
+    payload,
+    inputs=None,
+    executor: concurrent.futures.Executor = None,
+    max_workers: int = None,
+    warm_start: bool = True,
+):
+    """
+    Solves the required initial spending of a scenario with each input perturbed down and up, and ranks the inputs by their effect.
+
+    :param payload: A scenario payload (see scenario.py).
+    :param inputs: The inputs to perturb, defaults to DEFAULT_INPUTS for 'Dual_Income_Simulation' payloads and
+        DEFAULT_SIMULATION_INPUTS for 'Simulation' payloads. Inputs whose perturbations don't change their value (eg a
+        relative perturbation of a mortgage principal of 0) are skipped.
+    :param executor: Optional executor to solve on. Defaults to a process pool with max_workers workers, which is shut down
+        afterwards.
+    :param max_workers: Number of worker processes, if no executor is supplied. Defaults to the number of CPUs.
+    :param warm_start: If true, perturbed solves start from the base scenario's solution.
+    :return: A JSON-compatible dict with the 'base' outcome, and the 'sensitivities' of each input, ranked by decreasing 'swing', the
+        absolute difference between the required initial spending at the low and high values of the input. Each outcome has the
+        'required_initial_spending', 'was_solution_found' and 'run_message' of its solve. The swing is None, and the input is
+        ranked last, if either solve failed.
+    """
+    spec = scenario.compile_spec(payload)
+    if inputs is None:
+        inputs = (
+            DEFAULT_INPUTS
+            if spec.type == scenario.DUAL_INCOME_SIMULATION
+            else DEFAULT_SIMULATION_INPUTS
+        )
+    if executor is None:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context("forkserver"),
+        ) as executor:
+            return get_sensitivities(payload, inputs, executor, warm_start=warm_start)
+
+    base = executor.submit(_solve, spec.to_payload(), None).result()
+
+    base_payload = spec.to_payload()
+    warm_start_changes = {}
+    initial_spending_guess = None
+    if warm_start and base["was_solution_found"]:
+        initial_spending_guess = base["required_initial_spending"]
+        # The optimized variables are named after the settings holding their initial guesses
+        warm_start_changes = {
+            name: value
+            for name, value in base["optimized_values"].items()
+            if name in base_payload["settings"]
+        }
+
+    perturbations = []
+    for sensitivity_input in inputs:
+        base_value = base_payload[sensitivity_input.section][sensitivity_input.field]
+        low, high = sensitivity_input.get_perturbed_values(base_value)
+        if low == base_value and high == base_value:
+            continue
+        futures = []
+        for value in (low, high):
+            changes = {sensitivity_input.section: {sensitivity_input.field: value}}
+            if len(warm_start_changes) > 0:
+                changes["settings"] = {
+                    **warm_start_changes,
+                    **changes.get("settings", {}),
+                }
+            variant = spec.variant(changes)
+            futures.append(
+                executor.submit(_solve, variant.to_payload(), initial_spending_guess)
+            )
+        perturbations.append((sensitivity_input, base_value, low, high, futures))
+
+    sensitivities = []
+    for (
+        sensitivity_input,
+        base_value,
+        low,
+        high,
+        (
+            low_future,
+            high_future,
+        ),
+    ) in perturbations:
+        low_outcome = {"value": low, **low_future.result()}
+        high_outcome = {"value": high, **high_future.result()}
+        del low_outcome["optimized_values"], high_outcome["optimized_values"]
+        swing = None
+        if low_outcome["was_solution_found"] and high_outcome["was_solution_found"]:
+            swing = abs(
+                high_outcome["required_initial_spending"]
+                - low_outcome["required_initial_spending"]
+            )
+        sensitivities.append(
+            {
+                "input": sensitivity_input.name,
+                "base_value": base_value,
+                "low": low_outcome,
+                "high": high_outcome,
+                "swing": swing,
+            }
+        )
+
+    sensitivities.sort(key=lambda s: (s["swing"] is None, -(s["swing"] or 0)))
+    del base["optimized_values"]
+    return {"base": base, "sensitivities": sensitivities}
+
+
+def _solve(payload, initial_spending_guess: float):
+    """Solves a scenario in a worker process, returning only the outcome of the solve rather than all of its results."""
+    results = scenario.compile_spec(payload).run(
+        initial_spending_guess=initial_spending_guess
+    )
+    return {
+        "required_initial_spending": results["required_initial_spending"],
+        "was_solution_found": results["was_solution_found"],
+        "run_message": results["run_message"],
+        "optimized_values": results["optimized_values"],
+    }
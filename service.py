@@ -0,0 +1,477 @@
+"""
+A local HTTP/JSON service which runs simulations described by scenario payloads (see scenario.py) on a pool of worker processes. It
+uses only the standard library, and doesn't need network access beyond the host it runs on.
+
+Endpoints:
+
+    POST /jobs                 Queues the scenario payload in the request body. Responds 202 with the job, 400 if the payload is
+                               invalid, or 503 if too many jobs are already waiting (retry later).
+    GET /jobs/<id>             The job's status, its latest progress and, once it has succeeded, its results.
+    GET /jobs/<id>/progress    Streams the job's progress as JSON lines, one per optimizer iteration, with the iteration and the best
+                               spending found so far. The last line is the job itself, once it has finished.
+    DELETE /jobs/<id>          Cancels the job. A running job stops at its next optimizer iteration, or at its next simulation run
+                               once a tenth of a second has passed since it last checked, whichever comes first.
+
+Run from the repository root with:
+    python -m service --port 8080
+"""
+
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import http
+import json
+import multiprocessing
+import os
+import time
+import uuid
+import scenario
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+MAX_REQUEST_BODY_SIZE = 1024 * 1024
+
+# The minimum time in seconds between checks for cancellation from a running job's simulation runs, since each check is a request to
+# the service's manager process
+_CANCELLATION_CHECK_INTERVAL = 0.1
+
+
+class Service_Busy(Exception):
+    """Raised when a job is submitted while the service already has as many jobs waiting as it will accept."""
+
+
+class Job_Cancelled(Exception):
+    """Raised in a worker process to abort a job which has been cancelled."""
+
+
+class Job:
+    """A scenario submitted to the service, and its outcome."""
+
+    def __init__(self, job_id: str, payload):
+        self._id = job_id
+        self._payload = payload
+        self._status = QUEUED
+        self._progress = []
+        self._result = None
+        self._error = None
+        self._version = 0
+        self._changed = asyncio.Event()
+
+    @property
+    def id(self):
+        return self._id
+
+    @property
+    def payload(self):
+        """The scenario payload."""
+        return self._payload
+
+    @property
+    def status(self):
+        """One of 'queued', 'running', 'succeeded', 'failed' or 'cancelled'."""
+        return self._status
+
+    @property
+    def progress(self):
+        """A list of the progress reported so far, as dicts with the optimizer 'iteration' and the 'best_spending' found so far."""
+        return self._progress
+
+    @property
+    def result(self):
+        """The results of the scenario (see scenario.get_results()), once the job has succeeded."""
+        return self._result
+
+    @property
+    def error(self):
+        """The reason the job failed, if it did."""
+        return self._error
+
+    @property
+    def is_finished(self):
+        return self._status in (SUCCEEDED, FAILED, CANCELLED)
+
+    def to_json(self):
+        return {
+            "id": self._id,
+            "status": self._status,
+            "progress": self._progress[-1] if len(self._progress) > 0 else None,
+            "result": self._result,
+            "error": self._error,
+        }
+
+    @property
+    def version(self):
+        """Incremented each time the job's status or progress changes."""
+        return self._version
+
+    async def wait_for_change(self, version: int):
+        """Waits until the job has changed since it had the given version."""
+        while self._version == version:
+            await self._changed.wait()
+
+    def _set_status(self, status: str, result=None, error: str = None):
+        self._status = status
+        self._result = result
+        self._error = error
+        self._notify()
+
+    def _add_progress(self, iteration: int, best_spending: float):
+        self._progress.append({"iteration": iteration, "best_spending": best_spending})
+        self._notify()
+
+    def _notify(self):
+        self._version += 1
+        changed = self._changed
+        self._changed = asyncio.Event()
+        changed.set()
+
+
+class Job_Service:
+    """
+    Queues jobs onto a pool of worker processes, running at most max_concurrent_jobs at once, and tracks their progress.
+
+    :param max_concurrent_jobs: The number of jobs run at once, defaults to the number of CPUs.
+    :param max_queued_jobs: The number of jobs which may wait for a free worker. Further submissions are refused with Service_Busy
+        until some jobs finish.
+    :param max_retained_jobs: The number of finished jobs kept so that their results can be retrieved. The oldest are discarded first.
+    :param executor: Optional executor to run jobs on, which must be able to run at least max_concurrent_jobs at once. Defaults to a
+        process pool, which is shut down when the service stops.
+    """
+
+    def __init__(
+        self,
+        max_concurrent_jobs: int = None,
+        max_queued_jobs: int = 16,
+        max_retained_jobs: int = 1000,
+        executor: concurrent.futures.Executor = None,
+    ):
+        self._max_concurrent_jobs = max_concurrent_jobs or os.cpu_count() or 1
+        self._max_queued_jobs = max_queued_jobs
+        self._max_retained_jobs = max_retained_jobs
+        self._executor = executor
+        self._owns_executor = executor is None
+
+        self._jobs = {}
+        self._finished_job_ids = collections.deque()
+        self._unfinished_job_count = 0
+        self._tasks = set()
+
+    @property
+    def max_concurrent_jobs(self):
+        return self._max_concurrent_jobs
+
+    @property
+    def max_queued_jobs(self):
+        return self._max_queued_jobs
+
+    async def start(self):
+        """Starts the worker processes. Must be called before jobs are submitted."""
+        context = multiprocessing.get_context("forkserver")
+        self._manager = context.Manager()
+        self._progress_queue = self._manager.Queue()
+        self._cancelled_job_ids = self._manager.dict()
+        if self._owns_executor:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self._max_concurrent_jobs, mp_context=context
+            )
+        self._semaphore = asyncio.Semaphore(self._max_concurrent_jobs)
+        self._progress_task = asyncio.create_task(self._receive_progress())
+
+    async def stop(self):
+        """Cancels all unfinished jobs, waits for them to stop, and stops the worker processes."""
+        for job in list(self._jobs.values()):
+            self.cancel(job.id)
+        if len(self._tasks) > 0:
+            await asyncio.wait(self._tasks)
+        if self._owns_executor:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self._executor.shutdown
+            )
+        self._progress_queue.put(None)
+        await self._progress_task
+        self._manager.shutdown()
+
+    def submit(self, payload) -> Job:
+        """
+        Queues a scenario payload to be run. Raises ValueError if the payload is invalid, and Service_Busy if too many jobs are already
+        waiting.
+        """
+        scenario.validate(payload)
+        if (
+            self._unfinished_job_count
+            >= self._max_concurrent_jobs + self._max_queued_jobs
+        ):
+            raise Service_Busy()
+
+        job = Job(uuid.uuid4().hex, payload)
+        self._jobs[job.id] = job
+        self._unfinished_job_count += 1
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    def get(self, job_id: str) -> Job:
+        """Returns the job with the given id, or None if there is none."""
+        return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Job:
+        """
+        Cancels the job with the given id, and returns it, or None if there is none. A queued job is cancelled immediately, while a
+        running job is cancelled once its worker next checks, at its next optimizer iteration or simulation run (see
+        _run_job()). Finished jobs are unaffected.
+        """
+        job = self._jobs.get(job_id)
+        if job is None or job.is_finished:
+            return job
+
+        if job.status == QUEUED:
+            self._finish(job, CANCELLED)
+        else:
+            self._cancelled_job_ids[job_id] = True
+        return job
+
+    async def _run(self, job: Job):
+        async with self._semaphore:
+            if job.is_finished:
+                # Cancelled while queued
+                return
+
+            job._set_status(RUNNING)
+            try:
+                result = await asyncio.get_running_loop().run_in_executor(
+                    self._executor,
+                    _run_job,
+                    job.id,
+                    job.payload,
+                    self._progress_queue,
+                    self._cancelled_job_ids,
+                )
+            except Job_Cancelled:
+                self._finish(job, CANCELLED)
+            except Exception as e:
+                self._finish(job, FAILED, error=f"{type(e).__name__}: {e}")
+            else:
+                self._finish(job, SUCCEEDED, result=result)
+            finally:
+                self._cancelled_job_ids.pop(job.id, None)
+
+    def _finish(self, job: Job, status: str, result=None, error: str = None):
+        job._set_status(status, result, error)
+        self._unfinished_job_count -= 1
+        self._finished_job_ids.append(job.id)
+        while len(self._finished_job_ids) > self._max_retained_jobs:
+            del self._jobs[self._finished_job_ids.popleft()]
+
+    async def _receive_progress(self):
+        loop = asyncio.get_running_loop()
+        while (
+            message := await loop.run_in_executor(None, self._progress_queue.get)
+        ) is not None:
+            job_id, iteration, best_spending = message
+            job = self._jobs.get(job_id)
+            if job is not None and not job.is_finished:
+                job._add_progress(iteration, best_spending)
+
+
+def _run_job(job_id: str, payload, progress_queue, cancelled_job_ids):
+    """
+    Runs a job in a worker process, reporting progress to the service and stopping if the job is cancelled. Cancellation is checked
+    at each optimizer iteration, and before each simulation run of the inner solver if _CANCELLATION_CHECK_INTERVAL has passed since
+    the last check, so that jobs which aren't optimized can also be cancelled while they run.
+    """
+    last_check_time = time.monotonic()
+
+    def check_cancelled():
+        nonlocal last_check_time
+        last_check_time = time.monotonic()
+        if job_id in cancelled_job_ids:
+            raise Job_Cancelled()
+
+    def report_progress(iteration: int, best_spending: float):
+        check_cancelled()
+        progress_queue.put((job_id, iteration, best_spending))
+
+    built = scenario.compile_spec(payload).build()
+    optimizer = built.optimizer
+    inner_solver = optimizer.inner_solver
+
+    def cancellable_solver(intermediate_fn, model_fn, *args):
+        def cancellable_model_fn(intermediate):
+            if time.monotonic() - last_check_time >= _CANCELLATION_CHECK_INTERVAL:
+                check_cancelled()
+            return model_fn(intermediate)
+
+        return inner_solver(intermediate_fn, cancellable_model_fn, *args)
+
+    optimizer.inner_solver = cancellable_solver
+    optimizer.progress_callback = report_progress
+    check_cancelled()
+    return built.run()
+
+
+async def serve(service: Job_Service, host: str, port: int):
+    """Starts serving the HTTP API for a started Job_Service, and returns the asyncio server."""
+    return await asyncio.start_server(
+        lambda reader, writer: _handle_connection(service, reader, writer), host, port
+    )
+
+
+async def _handle_connection(
+    service: Job_Service, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+):
+    """Handles a single request on a connection, which is closed afterwards."""
+    try:
+        try:
+            method, path, body = await _read_request(reader)
+        except (ValueError, asyncio.IncompleteReadError):
+            await _write_response(writer, 400, {"error": "Malformed request"})
+            return
+        await _handle_request(service, method, path, body, writer)
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    method, path, _ = (await reader.readline()).decode("latin-1").split()
+    headers = {}
+    while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length", 0))
+    if length < 0 or length > MAX_REQUEST_BODY_SIZE:
+        raise ValueError(f"Unsupported request body size {length}")
+    body = await reader.readexactly(length)
+    return method, path, body
+
+
+async def _handle_request(
+    service: Job_Service, method: str, path: str, body: bytes, writer
+):
+    parts = path.strip("/").split("/")
+
+    if parts == ["jobs"] and method == "POST":
+        try:
+            job = service.submit(json.loads(body))
+        except ValueError as e:
+            await _write_response(writer, 400, {"error": str(e)})
+        except Service_Busy:
+            await _write_response(
+                writer,
+                503,
+                {"error": "Too many jobs are waiting, retry later"},
+                {"Retry-After": "1"},
+            )
+        else:
+            await _write_response(writer, 202, job.to_json())
+        return
+
+    if len(parts) not in (2, 3) or parts[0] != "jobs":
+        await _write_response(writer, 404, {"error": f"Unknown path {path}"})
+        return
+
+    job = service.get(parts[1])
+    if job is None:
+        await _write_response(writer, 404, {"error": f"Unknown job {parts[1]}"})
+    elif len(parts) == 3 and parts[2] != "progress":
+        await _write_response(writer, 404, {"error": f"Unknown path {path}"})
+    elif len(parts) == 2 and method == "GET":
+        await _write_response(writer, 200, job.to_json())
+    elif len(parts) == 2 and method == "DELETE":
+        await _write_response(writer, 200, service.cancel(job.id).to_json())
+    elif len(parts) == 3 and method == "GET":
+        await _stream_progress(job, writer)
+    else:
+        await _write_response(writer, 405, {"error": f"{method} not allowed"})
+
+
+async def _stream_progress(job: Job, writer: asyncio.StreamWriter):
+    writer.write(
+        _get_headers(200, {"Content-Type": "application/x-ndjson"}).encode("latin-1")
+    )
+    sent = 0
+    while True:
+        version = job.version
+        progress = job.progress[sent:]
+        sent += len(progress)
+        for item in progress:
+            writer.write(_to_json_line(item))
+        if job.is_finished:
+            writer.write(_to_json_line(job.to_json()))
+            await writer.drain()
+            return
+        await writer.drain()
+        await job.wait_for_change(version)
+
+
+async def _write_response(
+    writer: asyncio.StreamWriter, status: int, body, headers=None
+):
+    content = json.dumps(body).encode("utf-8")
+    headers = {
+        "Content-Type": "application/json",
+        "Content-Length": str(len(content)),
+        **(headers or {}),
+    }
+    writer.write(_get_headers(status, headers).encode("latin-1") + content)
+    await writer.drain()
+
+
+def _get_headers(status: int, headers):
+    lines = [f"HTTP/1.1 {status} {http.HTTPStatus(status).phrase}"]
+    lines += [f"{name}: {value}" for name, value in headers.items()]
+    lines.append("Connection: close")
+    return "\r\n".join(lines) + "\r\n\r\n"
+
+
+def _to_json_line(value):
+    return (json.dumps(value) + "\n").encode("utf-8")
+
+
+async def _serve_forever(args):
+    service = Job_Service(args.max_concurrent_jobs, args.max_queued_jobs)
+    await service.start()
+    try:
+        server = await serve(service, args.host, args.port)
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--max-concurrent-jobs",
+        type=int,
+        default=None,
+        help="Number of jobs run at once (defaults to the number of CPUs)",
+    )
+    parser.add_argument(
+        "--max-queued-jobs",
+        type=int,
+        default=16,
+        help="Number of jobs which may wait for a free worker before submissions are refused",
+    )
+    try:
+        asyncio.run(_serve_forever(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import model
 import typing
 import natural_rules
+import rule_dependencies
+import rule_schedule
 
 
 class Simulation:
@@ -179,8 +181,12 @@ class Simulation:
         Runs the simulation and calculates the required savings rate.
         """
 
+        rule_dependencies.Rule_Dependency_Graph(self._rules).check_order()
+        rule_dependencies.Rule_Dependency_Graph(self._retirement_rules).check_order()
+        schedule = self._get_exogenous_schedule()
+
         def create_run(initial_spending: float):
-            return Simulation_Run(self, initial_spending)
+            return Simulation_Run(self, initial_spending, schedule)
 
         def run_model(simulation_run: Simulation_Run):
             simulation_run.run()
@@ -204,15 +210,78 @@ class Simulation:
         self._solution_run = solution_run
         self._was_solution_found = was_solution_found
 
+    def _get_rule_schedule(self):
+        """
+        Gets the list of rules to apply in each year of a run, starting from the initial year, excluding rules that aren't active in that
+        year. The schedule doesn't depend on the initial spending, so it's built once and shared by all runs.
+        """
+        return [
+            rule_schedule.get_active_rules(
+                self._rules if year < self.year_of_retirement else self._retirement_rules,
+                year + 1,
+            )
+            for year in range(self.initial_year, self.year_of_death)
+        ]
+
+    def _get_exogenous_schedule(self):
+        """
+        Gets the rule schedule with the outputs of exogenous rules (eg salary) precomputed, since they're the same for every run. For
+        each year, the schedule has a tuple of the precomputed deltas, and the remaining rules to apply to them. See
+        rule_schedule.get_exogenous_schedule().
+        """
+        return rule_schedule.get_exogenous_schedule(
+            self._get_rule_schedule(),
+            self._get_initial_deltas_state(initial_spending=0),
+            self._get_initial_funds_state(),
+            ["previous_deltas.spending"],
+        )
+
+    def _get_initial_funds_state(self):
+        return model.funds_state(
+            self.initial_savings_rrsp,
+            self.initial_savings_tfsa,
+            self.initial_year,
+            self.initial_savings_unregistered,
+            self.initial_tfsa_limit - self.initial_savings_tfsa,
+            self.initial_rrsp_limit - self.initial_savings_rrsp,
+        )
+
+    def _get_initial_deltas_state(self, initial_spending: float):
+        initial_deltas_state = model.deltas_state(
+            year=self.initial_year,
+            gross_salary=self.initial_salary,
+            contributions=0,
+            benefits=0,
+            tax=0,
+            rrsp=0,
+            tfsa=0,
+            spending=initial_spending,
+            rrsp_interest=0,
+            tfsa_interest=0,
+            unregistered=0,
+            unregistered_interest=0,
+            tax_refund=0,
+            tfsa_available_room=0,
+            rrsp_available_room=0,
+            debt_payments=0,
+        )
+
+        return natural_rules.apply_tax(initial_deltas_state, None, None)
+
 
 class Simulation_Run:
     """
     A single run of the simulation, at a given savings rate.
     """
 
-    def __init__(self, parent: Simulation, initial_spending):
+    def __init__(self, parent: Simulation, initial_spending, schedule=None):
+        """
+        :param schedule: The precomputed deltas and rules to apply in each year of the run, as returned by
+            Simulation._get_exogenous_schedule(). If it's not supplied, it's built when the run is run.
+        """
         self._parent = parent
         self._initial_spending = initial_spending
+        self._schedule = schedule
 
         self._all_funds = list()
         self._all_deltas = list()
@@ -241,47 +310,26 @@ class Simulation_Run:
         """
         Run the simulation and set final funds.
         """
-        initial_year = self._parent.initial_year
         year_of_retirement = self._parent.year_of_retirement
-        year_of_death = self._parent.year_of_death
-
-        initial_funds_state = model.funds_state(
-            self._parent.initial_savings_rrsp,
-            self._parent.initial_savings_tfsa,
-            initial_year,
-            self._parent.initial_savings_unregistered,
-            self._parent.initial_tfsa_limit - self._parent.initial_savings_tfsa,
-            self._parent.initial_rrsp_limit - self._parent.initial_savings_rrsp,
-        )
-        initial_deltas_state = model.deltas_state(
-            year=initial_year,
-            gross_salary=self._parent.initial_salary,
-            contributions=0,
-            benefits=0,
-            tax=0,
-            rrsp=0,
-            tfsa=0,
-            spending=self._initial_spending,
-            rrsp_interest=0,
-            tfsa_interest=0,
-            unregistered=0,
-            unregistered_interest=0,
-            tax_refund=0,
-            tfsa_available_room=0,
-            rrsp_available_room=0,
-            debt_payments=0,
-        )
 
+        initial_funds_state = self._parent._get_initial_funds_state()
+        initial_deltas_state = self._parent._get_initial_deltas_state(
+            self._initial_spending
+        )
 
-        initial_deltas_state = natural_rules.apply_tax(initial_deltas_state, None, None)
+        schedule = self._schedule
+        if schedule is None:
+            schedule = self._parent._get_exogenous_schedule()
+        career_length = year_of_retirement - self._parent.initial_year
 
         previous_deltas = initial_deltas_state
         previous_funds = initial_funds_state
         self.all_deltas.append(previous_deltas)
         self.all_funds.append(previous_funds)
-        for _ in range(initial_year, year_of_retirement):  # Work up until retirement
+        # Work up until retirement
+        for exogenous_deltas, rules in schedule[:career_length]:
             deltas = model.get_updated_deltas_from_rules(
-                previous_funds, previous_deltas, self._parent._rules
+                previous_funds, previous_deltas, rules, exogenous_deltas
             )
             funds = model.get_updated_funds_from_deltas(previous_funds, deltas)
             self.all_deltas.append(deltas)
@@ -293,11 +341,10 @@ class Simulation_Run:
 
         assert year_of_retirement == self._funds_at_retirement.year
 
-        for _ in range(
-            year_of_retirement, year_of_death
-        ):  # Live off of savings up until death
+        # Live off of savings up until death
+        for exogenous_deltas, rules in schedule[career_length:]:
             deltas = model.get_updated_deltas_from_rules(
-                previous_funds, previous_deltas, self._parent._retirement_rules
+                previous_funds, previous_deltas, rules, exogenous_deltas
             )
             funds = model.get_updated_funds_from_deltas(previous_funds, deltas)
             self.all_deltas.append(deltas)
@@ -533,8 +580,10 @@ class Dual_Income_Simulation:
         Runs the simulation and calculates the required savings rate.
         """
 
+        schedule = self._get_exogenous_schedule()
+
         def create_run(initial_spending: float):
-            return Dual_Income_Simulation_Run(self, initial_spending)
+            return Dual_Income_Simulation_Run(self, initial_spending, schedule)
 
         def run_model(simulation_run: Dual_Income_Simulation_Run):
             simulation_run.run()
@@ -558,44 +607,49 @@ class Dual_Income_Simulation:
         self._solution_run = solution_run
         self._was_solution_found = was_solution_found
 
+    def _get_rule_schedule(self):
+        """
+        Gets the list of rules to apply in each year of a run, starting from the initial year, excluding rules that aren't active in that
+        year. The schedule doesn't depend on the initial spending, so it's built once and shared by all runs.
 
-class Dual_Income_Simulation_Run:
-    """
-    A single run of a dual-income simulation, at a given savings rate.
-    """
-
-    def __init__(self, parent: Dual_Income_Simulation, initial_spending: float):
-        self._parent = parent
-        self._initial_spending = initial_spending
-
-        self._all_funds = list()
-        self._all_deltas = list()
-
-    @property
-    def final_funds(self):
-        """The funds at completion of the run."""
-        return self._final_funds
-
-    @property
-    def funds_at_retirement(self):
-        """The funds for the year of retirement."""
-        return self._funds_at_retirement
-
-    @property
-    def all_funds(self) -> typing.List[model.couple_funds_state]:
-        """A list of all funds_states for the run, in order of year."""
-        return self._all_funds
-
-    @property
-    def all_deltas(self) -> typing.List[model.couple_deltas_state]:
-        """A list of all deltas_states for the run, in order of year."""
-        return self._all_deltas
+        The declared dependencies of the rules are checked as the schedule is built. The ruleset generally only provides a handful of
+        distinct rule lists (eg before and after each partner retires), so each one is checked once, rather than every year of every run.
+        """
+        schedule = []
+        checked_rule_lists = set()
+        for year in range(self.initial_year, self.final_year):
+            rules = self._ruleset(
+                year,
+                self.partner1_parameters.is_retired(year),
+                self.partner2_parameters.is_retired(year),
+            )
+            # The rules provided for a year update the deltas of the following year
+            rules = rule_schedule.get_active_rules(rules, year + 1)
+            key = tuple(id(rule) for rule in rules)
+            if key not in checked_rule_lists:
+                checked_rule_lists.add(key)
+                rule_dependencies.Rule_Dependency_Graph(rules).check_order()
+            schedule.append(rules)
+        return schedule
+
+    def _get_exogenous_schedule(self):
+        """
+        Gets the rule schedule with the outputs of exogenous rules (eg salaries, pension contributions and mortgage payments)
+        precomputed, since they're the same for every run. For each year, the schedule has a tuple of the precomputed deltas, and the
+        remaining rules to apply to them. See rule_schedule.get_exogenous_schedule().
+        """
+        return rule_schedule.get_exogenous_schedule(
+            self._get_rule_schedule(),
+            self._get_initial_deltas_state(initial_spending=0),
+            self._get_initial_funds_state(),
+            ["previous_deltas.household_spending"],
+        )
 
-    def _get_initial_deltas_state_from_params(
+    def _get_initial_partner_deltas_state(
         self, partner_params: Individual_Parameters
     ):
         initial_deltas_state = model.deltas_state(
-            year=self._parent.initial_year,
+            year=self.initial_year,
             gross_salary=partner_params.initial_salary,
             contributions=0,
             benefits=0,
@@ -617,31 +671,83 @@ class Dual_Income_Simulation_Run:
 
         return initial_deltas_state
 
-    def _get_initial_funds_state_from_params(
+    def _get_initial_partner_funds_state(
         self, partner_params: Individual_Parameters
     ):
         return model.funds_state(
             partner_params.initial_savings_rrsp,
             partner_params.initial_savings_tfsa,
-            self._parent.initial_year,
+            self.initial_year,
             partner_params.initial_savings_unregistered,
             partner_params.initial_tfsa_limit - partner_params.initial_savings_tfsa,
             partner_params.initial_rrsp_limit - partner_params.initial_savings_rrsp,
         )
 
-    def run(self):
-        partner1_params = self._parent.partner1_parameters
-        partner2_params = self._parent.partner2_parameters
-        initial_funds_state = model.couple_funds_state(
-            self._get_initial_funds_state_from_params(partner1_params),
-            self._get_initial_funds_state_from_params(partner2_params),
+    def _get_initial_deltas_state(self, initial_spending: float):
+        return model.couple_deltas_state(
+            partner1_deltas=self._get_initial_partner_deltas_state(
+                self.partner1_parameters
+            ),
+            partner2_deltas=self._get_initial_partner_deltas_state(
+                self.partner2_parameters
+            ),
+            household_spending=initial_spending,
+            household_debt_payments=0,
         )
 
-        initial_deltas_state = model.couple_deltas_state(
-            partner1_deltas=self._get_initial_deltas_state_from_params(partner1_params),
-            partner2_deltas=self._get_initial_deltas_state_from_params(partner2_params),
-            household_spending=self._initial_spending,
-            household_debt_payments=0,
+    def _get_initial_funds_state(self):
+        return model.couple_funds_state(
+            self._get_initial_partner_funds_state(self.partner1_parameters),
+            self._get_initial_partner_funds_state(self.partner2_parameters),
+        )
+
+
+class Dual_Income_Simulation_Run:
+    """
+    A single run of a dual-income simulation, at a given savings rate.
+    """
+
+    def __init__(
+        self,
+        parent: Dual_Income_Simulation,
+        initial_spending: float,
+        schedule=None,
+    ):
+        """
+        :param schedule: The precomputed deltas and rules to apply in each year of the run, as returned by
+            Dual_Income_Simulation._get_exogenous_schedule(). If it's not supplied, it's built when the run is run.
+        """
+        self._parent = parent
+        self._initial_spending = initial_spending
+        self._schedule = schedule
+
+        self._all_funds = list()
+        self._all_deltas = list()
+
+    @property
+    def final_funds(self):
+        """The funds at completion of the run."""
+        return self._final_funds
+
+    @property
+    def funds_at_retirement(self):
+        """The funds for the year of retirement."""
+        return self._funds_at_retirement
+
+    @property
+    def all_funds(self) -> typing.List[model.couple_funds_state]:
+        """A list of all funds_states for the run, in order of year."""
+        return self._all_funds
+
+    @property
+    def all_deltas(self) -> typing.List[model.couple_deltas_state]:
+        """A list of all deltas_states for the run, in order of year."""
+        return self._all_deltas
+
+    def run(self):
+        initial_funds_state = self._parent._get_initial_funds_state()
+        initial_deltas_state = self._parent._get_initial_deltas_state(
+            self._initial_spending
         )
 
         previous_deltas = initial_deltas_state
@@ -649,12 +755,13 @@ class Dual_Income_Simulation_Run:
         self.all_deltas.append(previous_deltas)
         self.all_funds.append(previous_funds)
 
-        for year in range(self._parent.initial_year, self._parent.final_year):
-            rules = self._parent._ruleset(
-                year, partner1_params.is_retired(year), partner2_params.is_retired(year)
-            )
+        schedule = self._schedule
+        if schedule is None:
+            schedule = self._parent._get_exogenous_schedule()
+
+        for exogenous_deltas, rules in schedule:
             deltas = model.get_updated_couple_deltas_from_rules(
-                previous_funds, previous_deltas, rules
+                previous_funds, previous_deltas, rules, exogenous_deltas
             )
             funds = model.get_updated_couple_funds_from_deltas(previous_funds, deltas)
             self.all_deltas.append(deltas)
@@ -1,5 +1,5 @@
+import math
 from typing import Callable
-import scipy.optimize
 
 def binary_solver(intermediate_fn, model_fn, target_output : float, initial_lower_bound : float, initial_upper_bound : float, tolerance : float):
     """
@@ -18,7 +18,9 @@ def binary_solver(intermediate_fn, model_fn, target_output : float, initial_lowe
     :type tolerance: float
     :return: A tuple of (solution input, intermediate_fn(solution input), was_solution_found : bool, message : str)
 
-    If no solution is found, the last calculated guess and intermediate product will be returned, with was_solution_found=false
+    If no solution is found, the last calculated guess and intermediate product will be returned, with was_solution_found=false. If the 
+    target output lies outside the outputs of the bounds (by more than the tolerance), the solver returns at once with the bound 
+    nearest to it.
     """
     if initial_lower_bound == initial_upper_bound:
         return (None, None, False, f"Lower bound ({initial_lower_bound}) and upper bound ({initial_upper_bound}) are identical.")
@@ -31,6 +33,13 @@ def binary_solver(intermediate_fn, model_fn, target_output : float, initial_lowe
     if lower_bound_output == upper_bound_output:
         return (initial_lower_bound, lower_bound_intermediate, False, "Model outputs are equal for lower and upper input bounds. The model function should be a non-flat monotonic function. ")
 
+    if not is_in_range(target_output, lower_bound_output, upper_bound_output, tolerance):
+        # The target can't be reached, so return the bound nearest to it rather than bisecting towards it
+        msg = get_out_of_range_message(target_output, initial_lower_bound, lower_bound_output, initial_upper_bound, upper_bound_output)
+        if abs(lower_bound_output - target_output) <= abs(upper_bound_output - target_output):
+            return (initial_lower_bound, lower_bound_intermediate, False, msg)
+        return (initial_upper_bound, upper_bound_intermediate, False, msg)
+
     lower_guess = 0
     upper_guess = 0
 
@@ -62,6 +71,668 @@ def binary_solver(intermediate_fn, model_fn, target_output : float, initial_lowe
     # We got a valid solution
     return (guess, guess_intermediate, True, "Success")
 
+def is_in_range(target_output : float, lower_bound_output : float, upper_bound_output : float, tolerance : float):
+    """Returns true if the target output lies between the outputs of the bounds, within the tolerance."""
+    return min(lower_bound_output, upper_bound_output) - tolerance <= target_output <= max(lower_bound_output, upper_bound_output) + tolerance
+
+def get_out_of_range_message(target_output : float, lower_bound : float, lower_bound_output : float, upper_bound : float, upper_bound_output : float):
+    """Returns the message of a solver whose target output lies outside the outputs of its bounds (see is_in_range())."""
+    direction = "above" if target_output > max(lower_bound_output, upper_bound_output) else "below"
+    return (f"Target output ({target_output:.2f}) is {direction} the model outputs at both input bounds ({lower_bound:.2f} and "
+        f"{upper_bound:.2f}), so no solution can be found.")
+
+def get_k_section_solver(interior_point_count : int = 3, evaluate_inputs = None):
+    """
+    Returns a solver which, rather than probing one midpoint per iteration like binary_solver, evaluates several evenly-spaced interior 
+    points of the bracket per iteration, which shrinks the bracket by a factor of interior_point_count + 1 per iteration. When the 
+    interior points are evaluated together (eg concurrently, or as lanes of a batched run), this needs fewer rounds of evaluations 
+    than binary_solver, roughly by a factor of log2(interior_point_count + 1). With a single interior point, it's the same as 
+    binary_solver.
+
+    :param interior_point_count: The number of interior points evaluated per iteration, defaults to 3
+    :type interior_point_count: int, optional
+    :param evaluate_inputs: Optional function which evaluates the outputs of several inputs at once, eg on a worker pool, or as lanes of 
+        a batched run (see charlie_kernel.Charlie_Kernel.get_k_section_solver()). It's called as evaluate_inputs(intermediate_fn, 
+        model_fn, inputs), and returns a list of the model outputs of the inputs. Since the intermediates are then made elsewhere, 
+        the intermediate of the returned input is made and run again at the end. By default, the inputs are evaluated one at a time
+        by intermediate_fn and model_fn, ie serially: this needs more evaluations than binary_solver, and so brings no speed-up.
+    :return: A solver with the same signature as binary_solver.
+    """
+    if interior_point_count < 1:
+        raise ValueError("interior_point_count must be at least 1")
+
+    def solver(intermediate_fn, model_fn, target_output : float, initial_lower_bound : float, initial_upper_bound : float, tolerance : float):
+        intermediates = {}
+        def evaluate(inputs):
+            if evaluate_inputs is not None:
+                return list(evaluate_inputs(intermediate_fn, model_fn, inputs))
+            outputs = []
+            for x in inputs:
+                intermediates[x] = intermediate_fn(x)
+                outputs.append(model_fn(intermediates[x]))
+            return outputs
+        def get_intermediate(x : float):
+            if x not in intermediates:
+                intermediates[x] = intermediate_fn(x)
+                model_fn(intermediates[x])
+            return intermediates[x]
+
+        if initial_lower_bound == initial_upper_bound:
+            return (None, None, False, f"Lower bound ({initial_lower_bound}) and upper bound ({initial_upper_bound}) are identical.")
+
+        lower_bound_output, upper_bound_output = evaluate([initial_lower_bound, initial_upper_bound])
+
+        if lower_bound_output == upper_bound_output:
+            return (initial_lower_bound, get_intermediate(initial_lower_bound), False, "Model outputs are equal for lower and upper input bounds. The model function should be a non-flat monotonic function. ")
+
+        if not is_in_range(target_output, lower_bound_output, upper_bound_output, tolerance):
+            msg = get_out_of_range_message(target_output, initial_lower_bound, lower_bound_output, initial_upper_bound, upper_bound_output)
+            if abs(lower_bound_output - target_output) <= abs(upper_bound_output - target_output):
+                return (initial_lower_bound, get_intermediate(initial_lower_bound), False, msg)
+            return (initial_upper_bound, get_intermediate(initial_upper_bound), False, msg)
+
+        if upper_bound_output > lower_bound_output:
+            lower_guess = initial_lower_bound
+            upper_guess = initial_upper_bound
+        else:
+            lower_guess = initial_upper_bound
+            upper_guess = initial_lower_bound
+
+        eps = tolerance * 1e-5
+
+        while True:
+            section_count = interior_point_count + 1
+            guesses = [(lower_guess * (section_count - i) + upper_guess * i) / section_count for i in range(1, section_count)]
+            guess_outputs = evaluate(guesses)
+            # The output nearest the target is returned, whether or not it's a solution
+            nearest = min(range(interior_point_count), key=lambda i: abs(guess_outputs[i] - target_output))
+            guess = guesses[nearest]
+            if abs(lower_guess - upper_guess) < eps:
+                # No solution found, return the nearest thing we got
+                return (guess, get_intermediate(guess), False, "Exhausted value range and no solution found")
+            if abs(guess_outputs[nearest] - target_output) <= tolerance:
+                # We got a valid solution
+                return (guess, get_intermediate(guess), True, "Success")
+            # The outputs increase from lower_guess to upper_guess, so the target lies before the first output above it
+            above = next((i for i in range(interior_point_count) if guess_outputs[i] > target_output), interior_point_count)
+            if above < interior_point_count:
+                upper_guess = guesses[above]
+            if above > 0:
+                lower_guess = guesses[above - 1]
+            intermediates.clear()
+
+    return solver
+
+def get_warm_started_solver(inner_solver, initial_guess : float, relative_width : float = 0.05):
+    """
+    Returns a solver which first tries to find the solution within a narrow bracket around an initial guess (eg the solution of a
+    similar problem), which needs fewer iterations than searching the full input range. If the target output isn't within the 
+    bracket, it falls back to searching the full range.
+
+    :param inner_solver: The solver used to search each range, eg binary_solver.
+    :param initial_guess: The guessed solution input. If it's None or outside the allowed input range, the full range is searched.
+    :type initial_guess: float
+    :param relative_width: The half-width of the bracket, relative to the magnitude of the initial guess, defaults to 0.05
+    :type relative_width: float, optional
+    :return: A solver with the same signature as binary_solver.
+    """
+    if initial_guess is None:
+        return get_bracketed_solver(inner_solver, None, None)
+    half_width = abs(initial_guess) * relative_width
+    return get_bracketed_solver(inner_solver, initial_guess - half_width, initial_guess + half_width, initial_guess)
+
+def get_bracketed_solver(inner_solver, lower_bound : float, upper_bound : float, initial_guess : float = None):
+    """
+    Returns a solver which first tries to find the solution within a known bracket (eg between the solutions of two neighbouring 
+    problems), which needs fewer iterations than searching the full input range. If the target output isn't within the bracket, it 
+    falls back to searching the full range.
+
+    :param inner_solver: The solver used to search each range, eg binary_solver.
+    :param lower_bound: The lower bound of the bracket. If it's None, the full range is searched.
+    :type lower_bound: float
+    :param upper_bound: The upper bound of the bracket. If it's None, the full range is searched.
+    :type upper_bound: float
+    :param initial_guess: Optional input which the bracket must surround. If it's outside the allowed input range, the full range is 
+        searched.
+    :type initial_guess: float, optional
+    :return: A solver with the same signature as binary_solver.
+    """
+    def solver(intermediate_fn, model_fn, target_output : float, initial_lower_bound : float, initial_upper_bound : float, tolerance : float):
+        lower_range_bound = min(initial_lower_bound, initial_upper_bound)
+        upper_range_bound = max(initial_lower_bound, initial_upper_bound)
+        if lower_bound is None or upper_bound is None or upper_bound < lower_range_bound or lower_bound > upper_range_bound:
+            return inner_solver(intermediate_fn, model_fn, target_output, initial_lower_bound, initial_upper_bound, tolerance)
+        if initial_guess is not None and not lower_range_bound <= initial_guess <= upper_range_bound:
+            return inner_solver(intermediate_fn, model_fn, target_output, initial_lower_bound, initial_upper_bound, tolerance)
+
+        bracket_lower_bound = max(lower_range_bound, lower_bound)
+        bracket_upper_bound = min(upper_range_bound, upper_bound)
+
+        # The inner solver evaluates the bracket bounds again, so remember their outputs rather than recalculating them
+        outputs = {}
+        cached_intermediate_fn, cached_model_fn = _get_cached_fns(intermediate_fn, model_fn, outputs)
+
+        for x in (bracket_lower_bound, bracket_upper_bound):
+            intermediate = intermediate_fn(x)
+            outputs[x] = (intermediate, model_fn(intermediate))
+        lower_output = outputs[bracket_lower_bound][1]
+        upper_output = outputs[bracket_upper_bound][1]
+        if bracket_lower_bound < bracket_upper_bound and min(lower_output, upper_output) <= target_output <= max(lower_output, upper_output):
+            return inner_solver(cached_intermediate_fn, cached_model_fn, target_output, bracket_lower_bound, bracket_upper_bound, tolerance)
+
+        return inner_solver(intermediate_fn, model_fn, target_output, initial_lower_bound, initial_upper_bound, tolerance)
+
+    return solver
+
+def get_expanding_solver(inner_solver, growth_factor : float = 2, max_expansion_count : int = 10):
+    """
+    Returns a solver which, if the target output lies outside the outputs of the input bounds, expands the range geometrically beyond 
+    the bound nearest to the target until it surrounds the target (eg if the solution lies outside [0, initial salary]). Only the last
+    step of the expansion, which surrounds the target, is then searched by the inner solver.
+
+    :param inner_solver: The solver used to search the range, eg binary_solver.
+    :param growth_factor: The factor by which the width of the range grows with each expansion, defaults to 2
+    :type growth_factor: float, optional
+    :param max_expansion_count: The maximum number of expansions, defaults to 10. If the target output still lies outside the expanded 
+        range, the inner solver searches the whole expanded range, and reports that there's no solution.
+    :type max_expansion_count: int, optional
+    :return: A solver with the same signature as binary_solver.
+    """
+    def solver(intermediate_fn, model_fn, target_output : float, initial_lower_bound : float, initial_upper_bound : float, tolerance : float):
+        if initial_lower_bound == initial_upper_bound:
+            return inner_solver(intermediate_fn, model_fn, target_output, initial_lower_bound, initial_upper_bound, tolerance)
+
+        # The inner solver evaluates the bounds of its range again, so remember their outputs rather than recalculating them
+        outputs = {}
+        cached_intermediate_fn, cached_model_fn = _get_cached_fns(intermediate_fn, model_fn, outputs)
+        def evaluate(x : float):
+            intermediate = intermediate_fn(x)
+            outputs[x] = (intermediate, model_fn(intermediate))
+            return outputs[x][1]
+
+        lower_bound_output = evaluate(initial_lower_bound)
+        upper_bound_output = evaluate(initial_upper_bound)
+        if lower_bound_output == upper_bound_output or is_in_range(target_output, lower_bound_output, upper_bound_output, tolerance):
+            return inner_solver(cached_intermediate_fn, cached_model_fn, target_output, initial_lower_bound, initial_upper_bound, tolerance)
+
+        # The range grows beyond the bound nearest to the target, away from the other bound
+        anchor, anchor_output, bound, bound_output = initial_lower_bound, lower_bound_output, initial_upper_bound, upper_bound_output
+        if abs(lower_bound_output - target_output) < abs(upper_bound_output - target_output):
+            anchor, anchor_output, bound, bound_output = initial_upper_bound, upper_bound_output, initial_lower_bound, lower_bound_output
+        for _ in range(max_expansion_count):
+            previous_bound, previous_output = bound, bound_output
+            bound = anchor + (bound - anchor) * growth_factor
+            bound_output = evaluate(bound)
+            if is_in_range(target_output, previous_output, bound_output, tolerance):
+                return inner_solver(cached_intermediate_fn, cached_model_fn, target_output, min(previous_bound, bound), max(previous_bound, bound), tolerance)
+
+        return inner_solver(cached_intermediate_fn, cached_model_fn, target_output, min(anchor, bound), max(anchor, bound), tolerance)
+
+    return solver
+
+def _get_cached_fns(intermediate_fn, model_fn, outputs):
+    """
+    Returns versions of intermediate_fn and model_fn which return the remembered (intermediate, output) pairs of inputs in outputs,
+    keyed by input, rather than recalculating them.
+    """
+    def cached_intermediate_fn(x : float):
+        if x in outputs:
+            return outputs[x][0]
+        return intermediate_fn(x)
+    def cached_model_fn(intermediate):
+        for cached_intermediate, output in outputs.values():
+            if cached_intermediate is intermediate:
+                return output
+        return model_fn(intermediate)
+    return cached_intermediate_fn, cached_model_fn
+
+class Solution_Memory:
+    """
+    Remembers the last solution found by an Optimizing_Solver, so that the next solve of a slightly changed problem (eg after changing
+    one input in the notebook) can start from it rather than from scratch.
+
+    A warm-started solve searches a narrow bracket around the remembered solution input first (see get_warm_started_solver()), and 
+    optimizes again starting from the remembered optimized values rather than the initial guesses. If should_reuse_optimized_values 
+    is set, the remembered optimized values are instead reused as they are without optimizing, which takes a single inner solve 
+    rather than hundreds, at the cost of a possibly less optimal solution. Call clear() to force the next solve to start from scratch.
+    """
+
+    def __init__(self, should_reuse_optimized_values : bool = False, relative_width : float = 0.05):
+        """
+        :param should_reuse_optimized_values: If true, warm-started solves reuse the remembered optimized values without optimizing 
+            again, defaults to False
+        :type should_reuse_optimized_values: bool, optional
+        :param relative_width: The relative half-width of the bracket searched around the remembered solution, defaults to 0.05
+        :type relative_width: float, optional
+        """
+        self.should_reuse_optimized_values = should_reuse_optimized_values
+        self.relative_width = relative_width
+        self.clear()
+
+    def clear(self):
+        """Forgets the remembered solution, so that the next solve starts from scratch."""
+        self._solution_input = None
+        self._optimized_values = {}
+        self._evaluation_count = None
+        self._cold_evaluation_count = None
+        self._was_warm_started = False
+
+    @property
+    def solution_input(self):
+        """The input of the last solution found, or None if none has been found."""
+        return self._solution_input
+
+    @property
+    def optimized_values(self):
+        """Dict of the optimized values of the last solution found, by variable name."""
+        return dict(self._optimized_values)
+
+    @property
+    def evaluation_count(self):
+        """The number of model evaluations made by the last solve, or None if there hasn't been one."""
+        return self._evaluation_count
+
+    @property
+    def was_warm_started(self):
+        """True if the last solve started from a remembered solution."""
+        return self._was_warm_started
+
+    @property
+    def evaluations_saved(self):
+        """
+        The number of model evaluations saved by the last solve, compared to the last solve which started from scratch, or None if the
+        last solve wasn't warm-started.
+        """
+        if not self._was_warm_started or self._cold_evaluation_count is None:
+            return None
+        return self._cold_evaluation_count - self._evaluation_count
+
+    def _record(self, output, optimized_values, evaluation_count : int, was_warm_started : bool):
+        self._evaluation_count = evaluation_count
+        self._was_warm_started = was_warm_started
+        if not was_warm_started:
+            self._cold_evaluation_count = evaluation_count
+        if output[2]:
+            self._solution_input = output[0]
+            self._optimized_values = dict(optimized_values)
+
+class Adaptive_Tolerance:
+    """
+    A schedule of tolerances for the inner solves of an Optimizing_Solver, which saves inner solver iterations while the optimizer is
+    still far from the optimum.
+
+    The optimizer is run in stages. The first stage solves with a coarse tolerance, and each following stage tightens it by a constant
+    factor, resuming from the simplex which the previous stage contracted to, until a final stage which polishes the solution at full
+    precision. Each stage's tolerance is also used as the optimizer's own tolerance, as it is when the tolerance is fixed.
+    """
+
+    def __init__(self, initial_factor : float = 1000, contraction : float = 10, relative_tolerance : float = None):
+        """
+        :param initial_factor: The tolerance of the first stage, relative to the full tolerance, defaults to 1000
+        :type initial_factor: float, optional
+        :param contraction: The factor by which the tolerance is tightened at each stage, defaults to 10
+        :type contraction: float, optional
+        :param relative_tolerance: Optional full tolerance relative to the magnitude of the target output, which is used instead of the
+            solver's tolerance if it's looser (eg for large targets, where a tolerance of a fraction of a dollar takes needless
+            iterations), defaults to None
+        :type relative_tolerance: float, optional
+        """
+        if initial_factor < 1 or contraction <= 1:
+            raise ValueError("initial_factor must be at least 1, and contraction must be greater than 1")
+        self.initial_factor = initial_factor
+        self.contraction = contraction
+        self.relative_tolerance = relative_tolerance
+
+    def get_full_tolerance(self, tolerance : float, target_output : float):
+        """Returns the tolerance of the final stage, given the tolerance requested of the solver, and the target output."""
+        if self.relative_tolerance is None:
+            return tolerance
+        return max(tolerance, self.relative_tolerance * abs(target_output))
+
+    def get_stage_tolerances(self, tolerance : float, target_output : float):
+        """Returns the list of the tolerances of each stage, ending with the full tolerance."""
+        full_tolerance = self.get_full_tolerance(tolerance, target_output)
+        stage_tolerances = []
+        stage_tolerance = full_tolerance * self.initial_factor
+        # Stages within a small fraction of the full tolerance are merged into the final stage
+        while stage_tolerance > full_tolerance * (1 + 1e-9):
+            stage_tolerances.append(stage_tolerance)
+            stage_tolerance /= self.contraction
+        stage_tolerances.append(full_tolerance)
+        return stage_tolerances
+
+class Coarse_Search:
+    """
+    A coarse search for good starting points for an Optimizing_Solver, which saves the optimizer from crawling towards the optimum
+    from a poor initial guess at full precision.
+
+    Before optimizing, the inner solver is run at a loose tolerance for a low-discrepancy (Sobol) sample of points spanning the box
+    bounded by the optimized scalars, as well as for the initial guesses. The best points then form the optimizer's initial simplex.
+    Scalars which aren't bounded on both sides are held at their initial guess.
+    """
+
+    def __init__(self, sample_count : int = 32, tolerance_factor : float = 1000, seed : int = 0, evaluate_points = None):
+        """
+        :param sample_count: The number of points sampled, defaults to 32. Powers of 2 spread the points most evenly.
+        :type sample_count: int, optional
+        :param tolerance_factor: The tolerance of the inner solves of sampled points, relative to the full tolerance, defaults to 1000
+        :type tolerance_factor: float, optional
+        :param seed: Seed of the scrambling of the sample, defaults to 0
+        :type seed: int, optional
+        :param evaluate_points: Optional function which solves for all the points at once, eg concurrently (see
+            scenario.get_parallel_coarse_search()). It's called as evaluate_points(variable_names, points, tolerance), and returns a list
+            of (solution input, was_solution_found) pairs. By default, points are solved one at a time by the optimizer's own inner solver.
+        """
+        self.sample_count = sample_count
+        self.tolerance_factor = tolerance_factor
+        self.seed = seed
+        self.evaluate_points = evaluate_points
+
+    def get_points(self, x0, bounds):
+        """Returns the points to evaluate, given the initial guesses and the (lower, upper) bounds of each optimized scalar."""
+        # Imported here rather than at module level, since it's slow to import and isn't needed unless optimizing
+        import numpy
+
+        x0 = numpy.array(x0, dtype=float)
+        sampled = [i for i, (lower, upper) in enumerate(bounds) if lower is not None and upper is not None]
+        points = numpy.tile(x0, (self.sample_count + 1, 1))
+        if len(sampled) > 0:
+            lower_bounds = numpy.array([bounds[i][0] for i in sampled], dtype=float)
+            upper_bounds = numpy.array([bounds[i][1] for i in sampled], dtype=float)
+            sample = _get_sobol_sample(len(sampled), self.sample_count, self.seed)
+            points[1:, sampled] = lower_bounds + sample * (upper_bounds - lower_bounds)
+        return points
+
+    def get_initial_simplex(self, points, objectives):
+        """
+        Returns the initial simplex of the optimizer, formed of the points with the lowest objectives, or None if those points are
+        degenerate (eg if some scalars aren't sampled), in which case the optimizer should start from the best point.
+        """
+        import numpy
+
+        best_points = numpy.array(points)[numpy.argsort(objectives, kind='stable')]
+        simplex = best_points[:best_points.shape[1] + 1]
+        if len(simplex) < simplex.shape[1] + 1 or numpy.linalg.matrix_rank(simplex[1:] - simplex[0]) < simplex.shape[1]:
+            return None
+        return simplex
+
+class Surrogate_Search:
+    """
+    A surrogate-assisted search for the optimum of an Optimizing_Solver, which needs far fewer inner solves than Nelder-Mead.
+
+    The inner solver is first run for a low-discrepancy (Sobol) sample of points spanning the box bounded by the optimized scalars,
+    as well as for the initial guesses. Then, at each step, a radial basis function surface is fitted to the objectives of all the
+    points solved so far, and used to pick one candidate out of many random perturbations of the best point and the surface's own
+    minimum. Only that candidate is confirmed by an inner solve. Candidates are picked by a weighted score of their predicted
+    objective and their distance from the points already solved, cycling between exploring and exploiting (as in Regis & Shoemaker's
+    stochastic RBF method). The perturbations narrow after repeated failures to improve on the best point, and the search stops once
+    they're narrower than minimum_step. Scalars which aren't bounded on both sides are held at their initial guess.
+
+    After each search, the number of inner solves, and the accuracy of the surface's predictions, are reported. The inner solves 
+    avoided can be compared to those of another search (eg Nelder-Mead) with get_avoided_fraction().
+    """
+
+    _WEIGHTS = (0.3, 0.5, 0.8, 0.95)
+
+    def __init__(self, sample_count : int = 32, max_evaluations : int = 200, initial_step : float = 0.2, minimum_step : float = 0.001, candidate_count : int = 500, kernel : str = 'thin_plate_spline', seed : int = 0):
+        """
+        :param sample_count: The number of points sampled before fitting the surface, defaults to 32
+        :type sample_count: int, optional
+        :param max_evaluations: The maximum number of inner solves, including the sample, defaults to 200
+        :type max_evaluations: int, optional
+        :param initial_step: The standard deviation of the perturbations of the best point, relative to the width of each scalar's
+            bounds, defaults to 0.2
+        :type initial_step: float, optional
+        :param minimum_step: The relative standard deviation of the perturbations below which the search stops, defaults to 0.001
+        :type minimum_step: float, optional
+        :param candidate_count: The number of perturbations of the best point considered at each step, defaults to 500
+        :type candidate_count: int, optional
+        :param kernel: The kernel of the surface, see scipy.interpolate.RBFInterpolator, defaults to 'thin_plate_spline'
+        :type kernel: str, optional
+        :param seed: Seed of the sample, and of the candidate points from which the surface's minimum is searched, defaults to 0
+        :type seed: int, optional
+        """
+        self.sample_count = sample_count
+        self.max_evaluations = max_evaluations
+        self.initial_step = initial_step
+        self.minimum_step = minimum_step
+        self.candidate_count = candidate_count
+        self.kernel = kernel
+        self.seed = seed
+        self._evaluation_count = 0
+        self._surrogate_evaluation_count = 0
+        self._prediction_errors = []
+
+    @property
+    def evaluation_count(self):
+        """The number of inner solves of the last search."""
+        return self._evaluation_count
+
+    @property
+    def surrogate_evaluation_count(self):
+        """
+        The number of evaluations of the fitted surface in the last search, including every candidate scored and every step of the 
+        searches for the surface's minimum. These are cheap, and aren't comparable to inner solves.
+        """
+        return self._surrogate_evaluation_count
+
+    def get_avoided_fraction(self, baseline_evaluation_count : int):
+        """
+        Returns the fraction of inner solves avoided by the last search, compared to another search of the same problem which made 
+        baseline_evaluation_count inner solves (eg an Optimizing_Solver without a surrogate search). It's negative if the last search 
+        made more inner solves.
+        """
+        return 1 - self._evaluation_count / baseline_evaluation_count
+
+    @property
+    def mean_prediction_error(self):
+        """
+        The mean absolute difference between the objective predicted by the surface at each candidate of the last search, and its
+        objective confirmed by an inner solve, or None if no candidate was confirmed.
+        """
+        if len(self._prediction_errors) == 0:
+            return None
+        return sum(self._prediction_errors) / len(self._prediction_errors)
+
+    def minimize(self, objective_fn, x0, bounds, tolerance : float, invalid_objective : float, callback = None):
+        """
+        Searches for the minimum of an objective.
+
+        :param objective_fn: The objective, which is evaluated by an inner solve.
+        :param x0: The initial guesses.
+        :param bounds: The (lower, upper) bounds of each scalar.
+        :param tolerance: The improvement of the best objective below which a step counts as a failure to improve on it.
+        :type tolerance: float
+        :param invalid_objective: Objectives at least as high as this are invalid points, which the surface isn't fitted to.
+        :type invalid_objective: float
+        :param callback: Optional function which is called with the best point after each step.
+        :return: A tuple of (best point, best objective, was_converged : bool), where was_converged is false if the search was
+            stopped by max_evaluations.
+        """
+        # Imported here rather than at module level, since they're slow to import and aren't needed unless optimizing
+        import numpy
+        import scipy.interpolate
+        import scipy.optimize
+
+        self._evaluation_count = 0
+        self._surrogate_evaluation_count = 0
+        self._prediction_errors = []
+
+        x0 = numpy.array(x0, dtype=float)
+        sampled = [i for i, (lower, upper) in enumerate(bounds) if lower is not None and upper is not None]
+        lower_bounds = numpy.array([bounds[i][0] for i in sampled], dtype=float)
+        widths = numpy.array([bounds[i][1] for i in sampled], dtype=float) - lower_bounds
+        dimension_count = len(sampled)
+
+        # The surface is fitted in the unit box, so that all the scalars have the same scale
+        def get_point(unit_point):
+            point = x0.copy()
+            point[sampled] = lower_bounds + unit_point * widths
+            return point
+
+        unit_points = []
+        objectives = []
+        def evaluate(unit_point):
+            unit_points.append(unit_point)
+            objectives.append(objective_fn(get_point(unit_point)))
+            self._evaluation_count += 1
+            if callback is not None:
+                callback(get_point(unit_points[int(numpy.argmin(objectives))]))
+            return objectives[-1]
+
+        evaluate(numpy.clip((x0[sampled] - lower_bounds) / widths, 0, 1))
+        if dimension_count == 0:
+            return x0, objectives[0], True
+        for unit_point in _get_sobol_sample(dimension_count, self.sample_count, self.seed):
+            evaluate(unit_point)
+
+        random = numpy.random.default_rng(self.seed)
+        step = self.initial_step
+        success_count = 0
+        failure_count = 0
+        was_converged = False
+        while self._evaluation_count < self.max_evaluations:
+            valid = numpy.array(objectives) < invalid_objective
+            best_objective = min(objectives)
+            best_unit_point = unit_points[int(numpy.argmin(objectives))]
+            # Candidates are perturbations of the best point, each scalar being perturbed with a probability which decreases as the
+            # search progresses, as well as the minimum of the surface
+            probability = min(1.0, 20.0 / dimension_count) * (1 - numpy.log(self._evaluation_count) / numpy.log(self.max_evaluations))
+            mask = random.random((self.candidate_count, dimension_count)) < max(probability, 1.0 / dimension_count)
+            mask[numpy.arange(self.candidate_count), random.integers(dimension_count, size=self.candidate_count)] = True
+            candidates = numpy.clip(best_unit_point + mask * random.normal(0, step, (self.candidate_count, dimension_count)), 0, 1)
+            has_surface = numpy.count_nonzero(valid) > dimension_count + 1
+            if has_surface:
+                surface = scipy.interpolate.RBFInterpolator(numpy.array(unit_points)[valid], numpy.array(objectives)[valid], kernel=self.kernel, smoothing=1e-9)
+                def surface_fn(unit_point):
+                    self._surrogate_evaluation_count += 1
+                    return surface(unit_point[numpy.newaxis])[0]
+                result = scipy.optimize.minimize(surface_fn, best_unit_point, method='L-BFGS-B', bounds=[(0, 1)] * dimension_count)
+                candidates = numpy.vstack([candidates, result.x])
+                predictions = surface(candidates)
+                self._surrogate_evaluation_count += len(candidates)
+            else:
+                # Too few valid points to fit the surface to, so only the distance from solved points is considered
+                predictions = numpy.zeros(len(candidates))
+
+            # Candidates are scored by a weighted sum of their predicted objective and their closeness to solved points, cycling from
+            # exploring to exploiting
+            distances = numpy.min(numpy.linalg.norm(candidates[:, numpy.newaxis] - numpy.array(unit_points)[numpy.newaxis], axis=2), axis=1)
+            weight = self._WEIGHTS[(self._evaluation_count - self.sample_count - 1) % len(self._WEIGHTS)]
+            scores = weight * _get_unit_scores(predictions) + (1 - weight) * (1 - _get_unit_scores(distances))
+            scores[distances < 1e-9] = numpy.inf
+            candidate = int(numpy.argmin(scores))
+
+            objective = evaluate(candidates[candidate])
+            if has_surface and objective < invalid_objective:
+                self._prediction_errors.append(abs(predictions[candidate] - objective))
+
+            # The perturbations are narrowed after repeated failures to improve on the best point, and widened after repeated successes
+            if objective < best_objective - tolerance:
+                success_count += 1
+                failure_count = 0
+            else:
+                success_count = 0
+                failure_count += 1
+            if success_count >= 3:
+                step = min(2 * step, self.initial_step)
+                success_count = 0
+            elif failure_count >= max(dimension_count, 4):
+                step /= 2
+                failure_count = 0
+                if step < self.minimum_step:
+                    was_converged = True
+                    break
+
+        best = int(numpy.argmin(objectives))
+        return get_point(unit_points[best]), objectives[best], was_converged
+
+class Multi_Start:
+    """
+    Runs the optimizer of an Optimizing_Solver from several diverse starting points, since Nelder-Mead may converge to a different
+    local optimum from each. The best optimum is returned, and all of them are reported (see Optimizing_Solver.local_optima), which
+    shows how multimodal the problem is.
+
+    The first start is from the initial guesses, and the others are from a low-discrepancy (Sobol) sample of the box bounded by the
+    optimized scalars. A start whose best output falls behind the best output of all the starts by more than a margin, after a
+    grace period, is pruned.
+    """
+
+    def __init__(self, start_count : int = 8, prune_margin : float = 0.001, grace_iterations : int = 50, seed : int = 0, run_starts = None,
+        start_points = None, first_start_index : int = 0, best_outputs = None):
+        """
+        :param start_count: The number of starts, defaults to 8
+        :type start_count: int, optional
+        :param prune_margin: The shortfall of a start's best output from the best output of all starts, relative to the latter, beyond
+            which the start is pruned, defaults to 0.001
+        :type prune_margin: float, optional
+        :param grace_iterations: The number of iterations a start runs before it can be pruned, defaults to 50
+        :type grace_iterations: int, optional
+        :param seed: Seed of the sample of starting points, defaults to 0
+        :type seed: int, optional
+        :param run_starts: Optional function which runs all the starts at once, eg concurrently (see
+            scenario.get_parallel_multi_start()). It's called as run_starts(variable_names, start_points, tolerance), and returns the
+            local optimum of each start, as described by Optimizing_Solver.local_optima. By default, starts are run one at a time.
+        :param start_points: Optional starting points, in place of the initial guesses and sample, eg for a worker running some of the
+            starts of a parallel multi-start.
+        :param first_start_index: The index of the first start, among all the starts of a parallel multi-start, defaults to 0
+        :type first_start_index: int, optional
+        :param best_outputs: Optional mapping in which each start records its best output under its index, which is shared by the
+            workers of a parallel multi-start so that starts can be pruned. Defaults to a new dict for each solve.
+        """
+        self.start_count = start_count
+        self.prune_margin = prune_margin
+        self.grace_iterations = grace_iterations
+        self.seed = seed
+        self.run_starts = run_starts
+        self.start_points = start_points
+        self.first_start_index = first_start_index
+        self.best_outputs = best_outputs
+
+    def get_start_points(self, x0, bounds):
+        """Returns the starting points, given the initial guesses and the (lower, upper) bounds of each optimized scalar."""
+        if self.start_points is not None:
+            return self.start_points
+        return Coarse_Search(self.start_count - 1, seed=self.seed).get_points(x0, bounds)
+
+    def should_prune(self, start_best_output : float, best_output : float, iteration : int, should_invert : bool):
+        """
+        Returns true if a start should be pruned, given its best output and the best output of all the starts (either of which may be
+        None if no valid solution has been found), and the number of iterations it has run.
+        """
+        if iteration < self.grace_iterations or best_output is None:
+            return False
+        if start_best_output is None:
+            return True
+        shortfall = best_output - start_best_output if should_invert else start_best_output - best_output
+        return shortfall > self.prune_margin * abs(best_output)
+
+class _Pruned_Start(Exception):
+    pass
+
+class _Failed_Run(Exception):
+    pass
+
+def _get_sobol_sample(dimension_count : int, sample_count : int, seed : int):
+    """Returns a scrambled Sobol sample of points in the unit box."""
+    import numpy
+    import scipy.stats.qmc
+
+    if sample_count == 0:
+        return numpy.zeros((0, dimension_count))
+    # Sobol samples are balanced when their size is a power of 2, so a prefix of a sample of the next power of 2 is taken
+    sample = scipy.stats.qmc.Sobol(dimension_count, seed=seed).random_base2(math.ceil(math.log2(sample_count)))
+    return sample[:sample_count]
+
+def _get_unit_scores(values):
+    """Scales values to the range [0, 1]."""
+    import numpy
+
+    spread = values.max() - values.min()
+    if spread == 0:
+        return numpy.ones(len(values))
+    return (values - values.min()) / spread
+
 class Optimizing_Solver:
     """
     Wraps a simulation solver and allows any number of variables to be optimized (for minimum initial input).
@@ -81,6 +752,21 @@ class Optimizing_Solver:
         self._optimize_values = 0
         self._is_optimization_disabled = False
         self._output = ()
+        self._progress_callback = None
+        self._memory = None
+        self._did_fail = False
+        self._fail_message = ""
+        self._is_fail_fast = False
+        self._is_failing_fast = False
+        self._aborted_solve_count = 0
+        self._tolerance_schedule = None
+        self._coarse_search = None
+        self._surrogate_search = None
+        self._multi_start = None
+        self._local_optima = []
+        self._bound_transform = None
+        self._penalized_evaluation_count = 0
+        self._achieved_precision = None
 
     def subscribe_optimized_scalar(self, variable_name : str, lower_bound : float = None, upper_bound : float = None, initial_guess : float = None) -> Callable[[], float]:
         """
@@ -105,6 +791,18 @@ class Optimizing_Solver:
         self._optimize_values +=1
         return lambda: self._x[i]
     
+    def set_initial_guess(self, variable_name : str, value : float):
+        """
+        Changes the initial guess for the named variable, eg to evaluate the model at given values while optimization is disabled.
+        
+        :param variable_name: Variable name
+        :type variable_name: str
+        :param value: New initial guess
+        :type value: float
+        """
+        i = self._variable_names.index(variable_name)
+        self._x0[i] = value
+
     def get_optimized_value(self, variable_name : str):
         """
         Gets the optimum value found for the named variable.
@@ -124,6 +822,14 @@ class Optimizing_Solver:
 
         return ((self._variable_names[i], self._x_sol[i]) for i in range(0, self._optimize_values))
     
+    def get_all_current_values(self):
+        """
+        Returns a sequence of (variable_name, value) pairs for all optimized variables, at the point which the inner solver is currently
+        solving (eg for inner solvers which run the model elsewhere, and must run it at the same point)
+        """
+
+        return ((self._variable_names[i], self._x[i]) for i in range(0, self._optimize_values))
+    
     def set_failed(self, msg : str):
         """
         When called by an optimizable routine, indicates that the routine has reached an invalid state that shouldn't be counted as a solution.
@@ -131,6 +837,9 @@ class Optimizing_Solver:
         self._did_fail = True
         if self._fail_message == "":
             self._fail_message = msg
+        if self._is_failing_fast:
+            # The run will be penalized anyway, so abort it, and the inner solve, rather than running it to the end
+            raise _Failed_Run(msg)
 
     @property
     def initial_output(self):
@@ -152,45 +861,284 @@ class Optimizing_Solver:
     def is_optimization_disabled(self, value):
         self._is_optimization_disabled = value
 
+    @property
+    def inner_solver(self):
+        """The solver which finds the solution input for each point of the optimized scalars, eg binary_solver."""
+        return self._inner_solver
+    @inner_solver.setter
+    def inner_solver(self, value):
+        self._inner_solver = value
+
+    @property
+    def is_fail_fast(self):
+        """
+        If this is true, the first call to set_failed() during an optimized solve aborts the current run and its inner solve, and the 
+        optimizer is given the penalty for the point at once. Otherwise (the default) the run and the inner solve are completed as usual. 
+        Solves which aren't optimized are always completed.
+        """
+        return self._is_fail_fast
+    @is_fail_fast.setter
+    def is_fail_fast(self, value):
+        self._is_fail_fast = value
+
     
+    @property
+    def progress_callback(self):
+        """
+        Optional function which is called after each iteration of the optimizer, as progress_callback(iteration : int, best_output : float), 
+        where best_output is the best valid inner solver output found so far (None if none has been found yet). If optimization is disabled, 
+        it's called once with the inner solver's output. An exception raised by the callback aborts the solve.
+        """
+        return self._progress_callback
+    @progress_callback.setter
+    def progress_callback(self, value):
+        self._progress_callback = value
+
+    @property
+    def memory(self):
+        """
+        Optional Solution_Memory which remembers the solution of each solve, and from which the next solve is warm-started. The same
+        memory can be shared by the optimizers of successive simulations, eg each time a notebook is re-run.
+        """
+        return self._memory
+    @memory.setter
+    def memory(self, value):
+        self._memory = value
+
+    @property
+    def tolerance_schedule(self):
+        """
+        Optional Adaptive_Tolerance, which schedules the tolerance of the inner solves while optimizing. By default, every inner solve
+        uses the tolerance passed to solve().
+        """
+        return self._tolerance_schedule
+    @tolerance_schedule.setter
+    def tolerance_schedule(self, value):
+        self._tolerance_schedule = value
+
+    @property
+    def coarse_search(self):
+        """
+        Optional Coarse_Search, which samples the bounded scalars at a loose tolerance to find good starting points before optimizing.
+        By default, the optimizer starts from the initial guesses.
+        """
+        return self._coarse_search
+    @coarse_search.setter
+    def coarse_search(self, value):
+        self._coarse_search = value
+
+    @property
+    def surrogate_search(self):
+        """
+        Optional Surrogate_Search, which is used to optimize in place of Nelder-Mead, saving most of the inner solves. If it's set, the
+        tolerance_schedule and coarse_search aren't used.
+        """
+        return self._surrogate_search
+    @surrogate_search.setter
+    def surrogate_search(self, value):
+        self._surrogate_search = value
+
+    @property
+    def multi_start(self):
+        """
+        Optional Multi_Start, which runs the optimizer from several starting points, returning the best optimum found. If it's set,
+        the tolerance_schedule, coarse_search and surrogate_search aren't used.
+        """
+        return self._multi_start
+    @multi_start.setter
+    def multi_start(self, value):
+        self._multi_start = value
+
+    @property
+    def local_optima(self):
+        """
+        The optimum reached from each start of the last multi-start solve, best first. Each is a dict with the 'optimized_values' by
+        name, the best 'output' of the inner solver (None if no valid solution was found), 'was_solution_found', 'was_pruned',
+        'was_converged', the optimizer's 'message', and the 'iteration_count'.
+        """
+        return self._local_optima
+
+    BOUND_TRANSFORMS = ('sine', 'logistic')
+
+    @property
+    def bound_transform(self):
+        """
+        Optional transform of the variables which are bounded on both sides, either 'sine' or 'logistic'. The optimizer then searches
+        an unbounded space, which the transform maps smoothly onto the bounds, so that it never evaluates a point outside them. By
+        default, points outside the bounds are penalized instead, which wastes their inner solves (see penalized_evaluation_count).
+        'sine' can reach the bounds themselves, whereas 'logistic' only approaches them.
+        """
+        return self._bound_transform
+    @bound_transform.setter
+    def bound_transform(self, value):
+        if value is not None and value not in self.BOUND_TRANSFORMS:
+            raise ValueError(f"Unknown bound transform {value!r}, expected one of {self.BOUND_TRANSFORMS}")
+        self._bound_transform = value
+
+    @property
+    def penalized_evaluation_count(self):
+        """The number of inner solves of the last solve whose point was outside the bounds, and was penalized."""
+        return self._penalized_evaluation_count
+
+    @property
+    def aborted_solve_count(self):
+        """The number of inner solves of the last solve which were aborted by a call to set_failed(), if is_fail_fast is true."""
+        return self._aborted_solve_count
+
+    @property
+    def achieved_precision(self):
+        """
+        The absolute deviation from the target output of the model output of the last solution found, or None if the last solve didn't
+        find a solution.
+        """
+        return self._achieved_precision
+
     def solve(self, intermediate_fn, model_fn, target_output : float, initial_lower_bound : float, initial_upper_bound : float, tolerance : float):
+        # The last few model outputs are recorded, to report the precision achieved by the solution (which is usually the last input
+        # evaluated, but may be a bracket bound evaluated just before, whose output was reused)
+        recent_evaluations = []
+        def recording_model_fn(intermediate):
+            output = model_fn(intermediate)
+            recent_evaluations.append((intermediate, output))
+            if len(recent_evaluations) > 3:
+                del recent_evaluations[0]
+            return output
+
+        output = self._solve_from_memory(intermediate_fn, recording_model_fn, target_output, initial_lower_bound, initial_upper_bound, tolerance)
+
+        self._achieved_precision = None
+        if output[2]:
+            for intermediate, model_output in recent_evaluations:
+                if intermediate is output[1]:
+                    self._achieved_precision = abs(model_output - target_output)
+        return output
+
+    def _solve_from_memory(self, intermediate_fn, model_fn, target_output : float, initial_lower_bound : float, initial_upper_bound : float, tolerance : float):
+        memory = self._memory
+        if memory is None:
+            return self._solve(self._inner_solver, self._x0, False, intermediate_fn, model_fn, target_output, initial_lower_bound, initial_upper_bound, tolerance)
+
+        evaluation_count = 0
+        def counting_model_fn(intermediate):
+            nonlocal evaluation_count
+            evaluation_count += 1
+            return model_fn(intermediate)
+
+        inner_solver = self._inner_solver
+        x0 = self._x0
+        is_warm_started = memory.solution_input is not None
+        should_reuse_x0 = False
+        if is_warm_started:
+            inner_solver = get_warm_started_solver(inner_solver, memory.solution_input, memory.relative_width)
+            remembered_values = memory.optimized_values
+            x0 = [remembered_values.get(name, x) for name, x in zip(self._variable_names, self._x0)]
+            should_reuse_x0 = memory.should_reuse_optimized_values and all(name in remembered_values for name in self._variable_names)
+
+        output = self._solve(inner_solver, x0, should_reuse_x0, intermediate_fn, counting_model_fn, target_output, initial_lower_bound, initial_upper_bound, tolerance)
+
+        optimized_values = ()
+        if self._optimize_values > 0 and not self.is_optimization_disabled:
+            optimized_values = self.get_all_optimized_values()
+        memory._record(output, optimized_values, evaluation_count, is_warm_started)
+        return output
+
+    def _solve(self, inner_solver, x0, should_reuse_x0 : bool, intermediate_fn, model_fn, target_output : float, initial_lower_bound : float, initial_upper_bound : float, tolerance : float):
+        stage_tolerances = [tolerance]
+        if self._tolerance_schedule is not None:
+            stage_tolerances = self._tolerance_schedule.get_stage_tolerances(tolerance, target_output)
+        # Solves which aren't optimized only need the full tolerance
+        tolerance = stage_tolerances[-1]
+        self._aborted_solve_count = 0
+
         if (self._optimize_values == 0):
             # In the trivial case that no optimized values have been requested, just return the result of the inner solver
-            return self._inner_solver(intermediate_fn, model_fn, target_output, initial_lower_bound, initial_upper_bound, tolerance)
+            return self._report_unoptimized(inner_solver(intermediate_fn, model_fn, target_output, initial_lower_bound, initial_upper_bound, tolerance))
 
-        if self.is_optimization_disabled:
-            # Use initial guesses and return without optimizing
-            self._x = self._x0 
-            return self._inner_solver(intermediate_fn, model_fn, target_output, initial_lower_bound, initial_upper_bound, tolerance)
+        if self.is_optimization_disabled or should_reuse_x0:
+            # Use initial guesses (or remembered optimized values) and return without optimizing
+            self._x = x0
+            self._x_sol = x0
+            return self._report_unoptimized(inner_solver(intermediate_fn, model_fn, target_output, initial_lower_bound, initial_upper_bound, tolerance))
 
         self._has_initial_solution = False
+        self._best_output = None
+        self._iteration = 0
+        self._penalized_evaluation_count = 0
+        stage_tolerance = stage_tolerances[0]
+        is_final_solve = False
         
-        def minimize_func(x):
+        def minimize_func(x, tolerance : float = None):
             self._x = x
+            if self._apply_soft_bounds(0, x) != 0:
+                self._penalized_evaluation_count += 1
             self._did_fail = False
             self._fail_message = ""
-            self._output = self._inner_solver(intermediate_fn, model_fn, target_output, initial_lower_bound, initial_upper_bound, tolerance)
-            f = self._output[0]
-            f = self._apply_soft_bounds(f, x)
-            if (not self._output[2] or self._did_fail):
-                # Penalize invalid solution, so that optimizer doesn't try to use it
-                penalty = -self.PENALTY_BASE if self._should_invert else self.PENALTY_BASE
-                f += penalty
-            elif not self._has_initial_solution:
+            inner_tolerance = stage_tolerance if tolerance is None else tolerance
+            self._is_failing_fast = self._is_fail_fast and not is_final_solve
+            try:
+                self._output = inner_solver(intermediate_fn, model_fn, target_output, initial_lower_bound, initial_upper_bound, inner_tolerance)
+            except _Failed_Run:
+                self._aborted_solve_count += 1
+                self._output = (None, None, False, self._fail_message)
+            finally:
+                self._is_failing_fast = False
+            is_valid = self._output[2] and not self._did_fail
+            if is_valid and not self._has_initial_solution:
                 #
                 self._has_initial_solution = True
 
                 self._output_initial = self._output
                 self._x_initial = x
+
+            if self._output[2] and not self._did_fail and self._apply_soft_bounds(0, x) == 0:
+                # A valid solution within bounds
+                output = self._output[0]
+                if self._best_output is None or (output > self._best_output if self._should_invert else output < self._best_output):
+                    self._best_output = output
             
-            return -f if self._should_invert else f
+            return self._get_objective(self._output[0], is_valid, x)
+
+        def report_progress(xk):
+            self._iteration += 1
+            if self._progress_callback is not None:
+                self._progress_callback(self._iteration, self._best_output)
         
-        opt_result = scipy.optimize.minimize(minimize_func, self._x0, method='Nelder-Mead', tol = tolerance) 
+        # Imported here rather than at module level, since it's slow to import and isn't needed unless optimizing
+        import scipy.optimize
+
         # Nelder-Mead is robust to non-smooth functions, which is important because the output of the inner solver tends to be 'staircase-like' 
         # unless the tolerance is very precise, resulting in the initial guess being returned as answer
         # See eg https://stackoverflow.com/questions/36110998/why-does-scipy-optimize-minimize-default-report-success-without-moving-with-sk
+        if self._multi_start is not None:
+            x_sol, success, optimizer_message = self._solve_multi_start(minimize_func, x0, tolerance)
+            # Solve the best point again, so that its solution is returned
+            minimize_func(x_sol, tolerance)
+        elif self._surrogate_search is not None:
+            x_sol, _, success = self._surrogate_search.minimize(lambda x: minimize_func(x, tolerance), x0, self._bounds, tolerance, self.PENALTY_BASE / 2, report_progress)
+            optimizer_message = "Surrogate search reached the maximum number of evaluations"
+            # Solve the best point again, so that its solution is returned
+            minimize_func(x_sol, tolerance)
+        else:
+            options = {}
+            if self._coarse_search is not None:
+                x0, options = self._get_coarse_start(minimize_func, x0, tolerance * self._coarse_search.tolerance_factor)
+            options = self._get_transformed_options(x0, options)
+            z0 = self._to_unbounded(x0)
+            for stage_tolerance in stage_tolerances:
+                # Each stage resumes from the simplex of the previous stage, which is evaluated again at the new tolerance
+                opt_result = scipy.optimize.minimize(lambda z: minimize_func(self._to_bounded(z)), z0, method='Nelder-Mead', tol = stage_tolerance, callback = report_progress, options = options)
+                z0 = opt_result.x
+                options = {'initial_simplex': opt_result.final_simplex[0]}
+            x_sol = self._to_bounded(opt_result.x)
+            success = opt_result.success
+            optimizer_message = opt_result.message
 
-        self._x_sol = opt_result.x
+        self._x_sol = x_sol
+
+        if self._output[1] is None and self._did_fail:
+            # The last inner solve was aborted, so it's solved again in full, in order for its run to be returned
+            is_final_solve = True
+            minimize_func(self._x, tolerance)
 
         output = self._output
         msg = ""
@@ -198,12 +1146,175 @@ class Optimizing_Solver:
             msg = output[3] # Use inner solver's failure message
         elif self._did_fail:
             msg = self._fail_message # Use failure message from set_fail() call
-        elif not opt_result.success:
-            msg = opt_result.message # Use failure message from minimizer
+        elif not success:
+            msg = optimizer_message # Use failure message from minimizer
         else:
             msg = output[3] # Use inner solver's success message
-        return (output[0], output[1], output[2] and opt_result.success and not self._did_fail, msg)
+        return (output[0], output[1], output[2] and success and not self._did_fail, msg)
     
+    def _solve_multi_start(self, minimize_func, x0, tolerance : float):
+        """Runs the optimizer from each start of the multi-start, and returns the best point, whether it converged, and its message."""
+        multi_start = self._multi_start
+        start_points = multi_start.get_start_points(x0, self._bounds)
+        if multi_start.run_starts is not None:
+            local_optima = multi_start.run_starts(list(self._variable_names), start_points, tolerance)
+        else:
+            best_outputs = multi_start.best_outputs if multi_start.best_outputs is not None else {}
+            local_optima = [
+                self._run_start(minimize_func, x, tolerance, multi_start.first_start_index + i, best_outputs)
+                for i, x in enumerate(start_points)
+            ]
+
+        sign = -1 if self._should_invert else 1
+        self._local_optima = sorted(local_optima, key = lambda optimum: (not optimum['was_solution_found'], sign * (optimum['output'] or 0)))
+        best = self._local_optima[0]
+        x_sol = [best['optimized_values'][name] for name in self._variable_names]
+        return x_sol, best['was_converged'], best['message']
+
+    def _run_start(self, minimize_func, x0, tolerance : float, start_index : int, best_outputs):
+        """Runs the optimizer from one start of the multi-start, and returns its local optimum."""
+        import scipy.optimize
+
+        best_x = x0
+        best_objective = None
+        start_best_output = None
+        def start_func(z):
+            nonlocal best_x, best_objective, start_best_output
+            x = self._to_bounded(z)
+            objective = minimize_func(x)
+            if best_objective is None or objective < best_objective:
+                best_x = list(x)
+                best_objective = objective
+                if objective < self.PENALTY_BASE / 2:
+                    start_best_output = -objective if self._should_invert else objective
+                    best_outputs[start_index] = start_best_output
+            return objective
+
+        iteration_count = 0
+        def callback(xk):
+            nonlocal iteration_count
+            iteration_count += 1
+            self._iteration += 1
+            overall_best_output = self._get_best_output(best_outputs.values())
+            if self._progress_callback is not None:
+                self._progress_callback(self._iteration, overall_best_output)
+            if self._multi_start.should_prune(start_best_output, overall_best_output, iteration_count, self._should_invert):
+                raise _Pruned_Start()
+
+        was_pruned = False
+        was_converged = False
+        message = "Start was pruned"
+        try:
+            opt_result = scipy.optimize.minimize(start_func, self._to_unbounded(x0), method='Nelder-Mead', tol = tolerance, callback = callback,
+                options = self._get_transformed_options(x0, {}))
+            was_converged = opt_result.success
+            message = opt_result.message
+        except _Pruned_Start:
+            was_pruned = True
+
+        return {
+            'optimized_values': {name: float(x) for name, x in zip(self._variable_names, best_x)},
+            'output': start_best_output,
+            'was_solution_found': start_best_output is not None,
+            'was_pruned': was_pruned,
+            'was_converged': was_converged,
+            'message': message,
+            'iteration_count': iteration_count,
+        }
+
+    def _get_best_output(self, outputs):
+        """Returns the best of a sequence of outputs, or None if it's empty."""
+        outputs = list(outputs)
+        if len(outputs) == 0:
+            return None
+        return max(outputs) if self._should_invert else min(outputs)
+
+    def _to_bounded(self, z):
+        """Maps a point searched by the optimizer to the values of the variables, through the bound transform if there is one."""
+        if self._bound_transform is None:
+            return z
+        x = list(z)
+        for i, (lower_bound, upper_bound) in enumerate(self._bounds):
+            if lower_bound is None or upper_bound is None:
+                continue
+            if self._bound_transform == 'sine':
+                fraction = (math.sin(z[i]) + 1) / 2
+            else:
+                fraction = 1 / (1 + math.exp(-min(max(z[i], -700), 700)))
+            x[i] = lower_bound + (upper_bound - lower_bound) * fraction
+        return x
+
+    def _to_unbounded(self, x):
+        """Maps the values of the variables to the point searched by the optimizer, the inverse of _to_bounded()."""
+        if self._bound_transform is None:
+            return x
+        z = list(x)
+        for i, (lower_bound, upper_bound) in enumerate(self._bounds):
+            if lower_bound is None or upper_bound is None:
+                continue
+            fraction = min(max((x[i] - lower_bound) / (upper_bound - lower_bound), 0), 1)
+            if self._bound_transform == 'sine':
+                z[i] = math.asin(2 * fraction - 1)
+            else:
+                # The bounds themselves are infinitely far away, so points on them are moved just inside
+                fraction = min(max(fraction, 1e-9), 1 - 1e-9)
+                z[i] = math.log(fraction / (1 - fraction))
+        return z
+
+    def _get_transformed_options(self, x0, options):
+        """
+        Returns the optimizer's options for the transformed space. Nelder-Mead's default initial simplex, which perturbs each
+        variable by 5%, is built from the values of the variables rather than their transforms, some of which are close to 0.
+        """
+        if self._bound_transform is None:
+            return options
+        if 'initial_simplex' in options:
+            simplex = options['initial_simplex']
+        else:
+            simplex = [list(x0)]
+            for i in range(len(x0)):
+                point = list(x0)
+                step = x0[i] * 0.05 if x0[i] != 0 else 0.00025
+                lower_bound, upper_bound = self._bounds[i]
+                lower_bound = -math.inf if lower_bound is None else lower_bound
+                upper_bound = math.inf if upper_bound is None else upper_bound
+                # Variables on either bound are perturbed inwards, since their transforms can't go beyond it
+                value = min(max(x0[i], lower_bound), upper_bound)
+                point[i] = min(max(value + step, lower_bound), upper_bound)
+                if point[i] == value:
+                    point[i] = min(max(value - step, lower_bound), upper_bound)
+                simplex.append(point)
+        return {**options, 'initial_simplex': [self._to_unbounded(point) for point in simplex]}
+
+    def _get_coarse_start(self, minimize_func, x0, coarse_tolerance : float):
+        """Evaluates the points of the coarse search, and returns the optimizer's starting point and options."""
+        coarse_search = self._coarse_search
+        points = coarse_search.get_points(x0, self._bounds)
+        if coarse_search.evaluate_points is None:
+            objectives = [minimize_func(x, coarse_tolerance) for x in points]
+        else:
+            outputs = coarse_search.evaluate_points(list(self._variable_names), points, coarse_tolerance)
+            objectives = [self._get_objective(solution, found, x) for x, (solution, found) in zip(points, outputs)]
+
+        simplex = coarse_search.get_initial_simplex(points, objectives)
+        if simplex is None:
+            return points[min(range(len(points)), key = lambda i: objectives[i])], {}
+        return simplex[0], {'initial_simplex': simplex}
+
+    def _get_objective(self, output : float, is_valid : bool, x):
+        """Returns the value minimized by the optimizer, for the inner solver output at x."""
+        f = self._apply_soft_bounds(output if output is not None else 0, x)
+        if not is_valid:
+            # Penalize invalid solution, so that optimizer doesn't try to use it
+            penalty = -self.PENALTY_BASE if self._should_invert else self.PENALTY_BASE
+            f += penalty
+        return -f if self._should_invert else f
+
+    def _report_unoptimized(self, output):
+        if self._progress_callback is not None:
+            self._progress_callback(0, output[0] if output[2] else None)
+        return output
+
     def _apply_soft_bounds(self, f : float, x):
         """
         Apply 'soft' bounds to the objective function, since the Nelder-Mead method doesn't support true bounds.
@@ -3,6 +3,7 @@ Rules describing the trajectory of spending over time.
 """
 
 import model
+from rule_dependencies import declares
 
 def get_luxury_over_basic(base_spending: float, luxury_compound_rate: float):
     """
@@ -11,6 +12,7 @@ def get_luxury_over_basic(base_spending: float, luxury_compound_rate: float):
     sp[y] = b + (1 + c)sp[y-1], where sp = spending, b = base_spending, c = luxury_compound_rate
     """
 
+    @declares(reads=["previous_deltas.spending"], writes=["deltas.spending"])
     def luxury_over_basic(deltas: model.deltas_state, previous_funds: model.funds_state, previous_deltas: model.deltas_state):
         previous_luxury = previous_deltas.spending - base_spending
         if (previous_luxury < 0):
@@ -31,6 +33,7 @@ def get_luxury_over_basic_capped(base_spending: float, luxury_compound_rate: flo
     sp[y] = min(b + (1 + c)sp[y-1], f * i), where sp = spending, b = base_spending, c = luxury_compound_rate, f = cap_fractional, i = deltas.total_net_income
     """
 
+    @declares(reads=["previous_deltas.spending", "deltas.total_net_income"], writes=["deltas.spending"])
     def luxury_over_basic_capped(deltas: model.deltas_state, previous_funds: model.funds_state, previous_deltas: model.deltas_state):
         previous_luxury = previous_deltas.spending - base_spending
         if (previous_luxury < 0):
@@ -75,6 +78,15 @@ def get_increasing_savings_increasing_spending(initial_year : float, increase_sa
 
     actual_increase_savings_weight = increase_savings_weight
 
+    @declares(
+        reads=[
+            "previous_deltas.year",
+            "previous_deltas.spending",
+            "previous_deltas.total_net_income",
+            "deltas.total_net_income",
+        ],
+        writes=["deltas.spending"],
+    )
     def increasing_savings_increasing_spending(deltas: model.deltas_state, previous_funds: model.funds_state, previous_deltas: model.deltas_state):
         nonlocal actual_increase_savings_weight
         if previous_deltas.year == initial_year:
@@ -1,6 +1,9 @@
 from enum import Enum
 from typing import List
+import bisect
 import datetime
+import functools
+import math
 
 
 class _TaxBracket:
@@ -100,9 +103,214 @@ def get_income_tax(taxable_income: float):
 
     assert datetime.datetime.now().year == 2026 # Marginal tax brackets should be kept up to date.
 
+    return _get_remembered_income_tax(taxable_income)
+
+
+# A simulation is run many times while solving, and most incomes (eg the pre-RRSP income of each year of a career) are the same in
+# every run, so recently taxed incomes are remembered rather than taxed again.
+@functools.lru_cache(maxsize=1024)
+def _get_remembered_income_tax(taxable_income: float):
     caTax = get_income_tax_from_brackets(taxable_income, _qcAbatement, _caBrackets)
     caTax -= get_enhanced_bpa_credit(taxable_income, _qcAbatement)
     caTax = max(caTax, 0)
     qcTax = get_income_tax_from_brackets(taxable_income, 0, _qcBrackets)
     total = caTax + qcTax
     return total
+
+
+def get_income_taxes(taxable_incomes):
+    """
+    Vectorized get_income_tax(), which takes and returns a numpy array (or anything convertible to one) of incomes.
+
+    Tax is calculated from the piecewise-linear after-tax income (see _get_net_income_table()), so it matches get_income_tax() up to
+    floating-point rounding.
+    """
+
+    import numpy # Imported here since it's not otherwise needed by the simulation
+
+    gross_points, net_points, top_net_rate = _get_net_income_table()
+
+    taxable_incomes = numpy.asarray(taxable_incomes, dtype=float)
+    net_incomes = numpy.interp(taxable_incomes, gross_points, net_points)
+    net_incomes = numpy.where(taxable_incomes > gross_points[-1], net_points[-1] + (taxable_incomes - gross_points[-1]) * top_net_rate, net_incomes)
+    # No tax is owed on incomes below the first breakpoint (including negative incomes)
+    return numpy.where(taxable_incomes < gross_points[0], 0.0, taxable_incomes - net_incomes)
+
+
+def get_gross_income(net_income: float):
+    """
+    Returns the taxable income which leaves the nominated after-tax income, ie the inverse of income - get_income_tax(income).
+
+    After-tax income is piecewise linear in taxable income, so this is exact, and takes a single table lookup rather than a numeric
+    search. See get_gross_incomes() for a vectorized equivalent.
+    """
+
+    gross_points, net_points, top_net_rate = _get_net_income_table()
+
+    if net_income <= net_points[0]:
+        # No tax is owed below the first breakpoint
+        return gross_points[0] + (net_income - net_points[0])
+
+    i = bisect.bisect_right(net_points, net_income) - 1
+    if i >= len(net_points) - 1:
+        return gross_points[-1] + (net_income - net_points[-1]) / top_net_rate
+
+    fraction = (net_income - net_points[i]) / (net_points[i + 1] - net_points[i])
+    return gross_points[i] + fraction * (gross_points[i + 1] - gross_points[i])
+
+
+def get_gross_incomes(net_incomes):
+    """
+    Vectorized get_gross_income(), which takes and returns a numpy array (or anything convertible to one) of incomes.
+    """
+
+    import numpy # Imported here since it's not otherwise needed by the simulation
+
+    gross_points, net_points, top_net_rate = _get_net_income_table()
+
+    net_incomes = numpy.asarray(net_incomes, dtype=float)
+    gross_incomes = numpy.interp(net_incomes, net_points, gross_points)
+    gross_incomes = numpy.where(net_incomes < net_points[0], gross_points[0] + (net_incomes - net_points[0]), gross_incomes)
+    return numpy.where(net_incomes > net_points[-1], gross_points[-1] + (net_incomes - net_points[-1]) / top_net_rate, gross_incomes)
+
+
+
+def get_marginal_tax_rate(taxable_income: float):
+    """
+    Returns the marginal tax rate (as a fraction) at the nominated taxable income, ie the tax owed on each extra dollar of income.
+    """
+
+    return _get_tax_rate_details(taxable_income)[0]
+
+
+def get_average_tax_rate(taxable_income: float):
+    """
+    Returns the average (effective) tax rate (as a fraction) at the nominated taxable income, ie get_income_tax() / taxable_income.
+    """
+
+    return _get_tax_rate_details(taxable_income)[1]
+
+
+def get_distance_to_next_bracket(taxable_income: float):
+    """
+    Returns how much more taxable income can be earned before the marginal tax rate changes, or math.inf in the top bracket.
+    """
+
+    return _get_tax_rate_details(taxable_income)[2]
+
+
+def get_tax_rates(taxable_incomes):
+    """
+    Batched form of get_marginal_tax_rate(), get_average_tax_rate() and get_distance_to_next_bracket(), which takes a numpy array (or
+    anything convertible to one) of taxable incomes, and returns a tuple of arrays of (marginal rates, average rates, distances to the
+    next bracket).
+    """
+
+    import numpy # Imported here since it's not otherwise needed by the simulation
+
+    gross_points, net_points, top_net_rate = _get_net_income_table()
+    boundaries, marginal_rates = _get_marginal_tax_rate_table()
+
+    taxable_incomes = numpy.asarray(taxable_incomes, dtype=float)
+    # Index of the boundary at or below each income, which is -1 below the first boundary
+    i = numpy.searchsorted(boundaries, taxable_incomes, side='right') - 1
+    marginal = numpy.array([0] + marginal_rates)[i + 1]
+    distance = numpy.array(boundaries + [numpy.inf])[i + 1] - taxable_incomes
+
+    net_incomes = numpy.interp(taxable_incomes, gross_points, net_points)
+    net_incomes = numpy.where(taxable_incomes > gross_points[-1], net_points[-1] + (taxable_incomes - gross_points[-1]) * top_net_rate, net_incomes)
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        average = numpy.where(taxable_incomes > 0, (taxable_incomes - net_incomes) / taxable_incomes, 0.0)
+
+    return marginal, average, distance
+
+
+def _get_tax_rate_details(taxable_income: float):
+    """Returns a tuple of (marginal rate, average rate, distance to next bracket) at the nominated taxable income."""
+
+    boundaries, marginal_rates = _get_marginal_tax_rate_table()
+
+    i = bisect.bisect_right(boundaries, taxable_income) - 1
+    if i < 0:
+        # No tax is owed below the first boundary
+        return 0, 0, boundaries[0] - taxable_income
+    marginal = marginal_rates[i]
+    distance = boundaries[i + 1] - taxable_income if i < len(boundaries) - 1 else math.inf
+
+    if taxable_income <= 0:
+        return marginal, 0, distance
+
+    gross_points, net_points, top_net_rate = _get_net_income_table()
+    j = bisect.bisect_right(gross_points, taxable_income) - 1
+    if j >= len(gross_points) - 1:
+        net_income = net_points[-1] + (taxable_income - gross_points[-1]) * top_net_rate
+    else:
+        net_income = net_points[j] + (taxable_income - gross_points[j]) * (net_points[j + 1] - net_points[j]) / (gross_points[j + 1] - gross_points[j])
+    return marginal, (taxable_income - net_income) / taxable_income, distance
+
+
+@functools.lru_cache(maxsize=None)
+def _get_marginal_tax_rate_table():
+    """
+    Compiles the marginal tax rate table from _get_net_income_table(), as a tuple of (boundaries, marginal rates), where each rate
+    applies from its boundary up to the next one, and the last rate applies above the last boundary. Consecutive segments of the net
+    income table with the same rate are merged, and the 1-cent gaps between the bounds of consecutive brackets belong to the lower
+    bracket.
+    """
+
+    gross_points, net_points, top_net_rate = _get_net_income_table()
+
+    boundaries = [gross_points[0]]
+    marginal_rates = [1 - (net_points[1] - net_points[0]) / (gross_points[1] - gross_points[0])]
+    for i in range(1, len(gross_points)):
+        if i < len(gross_points) - 1:
+            width = gross_points[i + 1] - gross_points[i]
+            if width < 1:
+                # Skip the gap between the top of one bracket and the bottom of the next
+                continue
+            rate = 1 - (net_points[i + 1] - net_points[i]) / width
+        else:
+            rate = 1 - top_net_rate
+        if not math.isclose(rate, marginal_rates[-1], abs_tol=1e-9):
+            boundaries.append(gross_points[i])
+            marginal_rates.append(rate)
+    return boundaries, marginal_rates
+
+
+@functools.lru_cache(maxsize=None)
+def _get_net_income_table():
+    """
+    Compiles the table of breakpoints of the piecewise-linear after-tax income, as a tuple of (taxable incomes, after-tax incomes,
+    after-tax fraction of income above the last breakpoint).
+
+    The breakpoints are the bracket bounds of both tax schedules, the bounds of the federal enhanced BPA phase-out, and the income at
+    which the federal tax less the enhanced BPA credit stops being clamped to 0. It's compiled on first use rather than on import, since
+    it's calculated with get_income_tax().
+    """
+
+    breakpoints = {0, _caBrackets[4].min, _caBrackets[4].max}
+    for bracket in _caBrackets + _qcBrackets:
+        breakpoints.add(bracket.min)
+        if bracket.max > 0:
+            breakpoints.add(bracket.max)
+    breakpoints = sorted(breakpoints)
+
+    def get_unclamped_federal_tax(taxable_income: float):
+        return get_income_tax_from_brackets(taxable_income, _qcAbatement, _caBrackets) - get_enhanced_bpa_credit(taxable_income, _qcAbatement)
+
+    # The unclamped federal tax is increasing, and linear between breakpoints, so it crosses 0 once
+    for lower, upper in zip(breakpoints, breakpoints[1:]):
+        lower_tax = get_unclamped_federal_tax(lower)
+        upper_tax = get_unclamped_federal_tax(upper)
+        if lower_tax < 0 < upper_tax:
+            breakpoints.append(lower + (upper - lower) * -lower_tax / (upper_tax - lower_tax))
+            breakpoints.sort()
+            break
+
+    net_points = [income - get_income_tax(income) for income in breakpoints]
+    assert all(lower < upper for lower, upper in zip(net_points, net_points[1:])) # After-tax income should increase with income
+
+    top_income = breakpoints[-1]
+    top_net_rate = ((top_income + 1000) - get_income_tax(top_income + 1000) - net_points[-1]) / 1000
+
+    return breakpoints, net_points, top_net_rate
@@ -0,0 +1,110 @@
+import concurrent.futures
+import io
+import json
+import time
+import batch
+import scenario
+from tests.test_scenario import _get_dual_income_payload
+from tests.test_scenario import _get_simulation_payload
+
+
+def _read_json_lines(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_batch_writes_results_and_failures(tmp_path):
+    household = _get_dual_income_payload()
+    del household["type"]
+    input_path = tmp_path / "scenarios.jsonl"
+    input_path.write_text(
+        "\n".join(
+            [
+                json.dumps(household),
+                json.dumps(_get_simulation_payload()),
+                "",
+                '{"partner1": {}}',
+            ]
+        )
+    )
+    output_path = tmp_path / "results.jsonl"
+    failure_path = tmp_path / "failures.jsonl"
+
+    exit_code = batch.main(
+        [
+            str(input_path),
+            str(output_path),
+            "--failures",
+            str(failure_path),
+            "--workers",
+            "2",
+        ]
+    )
+
+    assert exit_code == 1
+    results = {r["line"]: r for r in _read_json_lines(output_path)}
+    assert set(results) == {1, 2}
+    expected = scenario.run(_get_dual_income_payload())
+    assert results[1] == {"line": 1, **expected}
+
+    failures = {f["line"]: f for f in _read_json_lines(failure_path)}
+    assert "partner1" in failures[4]["error"]
+    # The single-income scenario has no solution
+    assert not results[2]["was_solution_found"]
+    assert failures[2] == {"line": 2, "run_message": results[2]["run_message"]}
+    assert set(failures) == {2, 4}
+
+
+def test_batch_bounds_scenarios_in_flight():
+    output_file = io.StringIO()
+    lines_read_ahead = []
+
+    def read_lines():
+        for _ in range(6):
+            written = output_file.getvalue().count("\n")
+            lines_read_ahead.append(len(lines_read_ahead) - written)
+            yield json.dumps(_get_simulation_payload())
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        scenario_count, failure_count = batch.run_batch(
+            read_lines(), output_file, None, executor, max_in_flight=2
+        )
+
+    assert scenario_count == 6
+    assert failure_count == 6
+    assert len(output_file.getvalue().splitlines()) == 6
+    # No more lines are read than can be submitted, plus the one waiting to be submitted
+    assert max(lines_read_ahead) <= 2
+
+
+class _Flushed_Output(io.StringIO):
+    """Output which only shows what has been flushed."""
+
+    def __init__(self):
+        super().__init__()
+        self.flushed = ""
+
+    def flush(self):
+        super().flush()
+        self.flushed = self.getvalue()
+
+
+def test_batch_streams_results_as_they_complete():
+    output_file = _Flushed_Output()
+
+    def read_lines():
+        yield json.dumps(_get_simulation_payload())
+        # The first result is written before the batch needs a free slot, or reaches the end of the input
+        deadline = time.monotonic() + 60
+        while output_file.flushed == "" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert output_file.flushed != ""
+        yield json.dumps(_get_simulation_payload())
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        scenario_count, _ = batch.run_batch(
+            read_lines(), output_file, None, executor, max_in_flight=4
+        )
+
+    assert scenario_count == 2
+    assert len(output_file.flushed.splitlines()) == 2
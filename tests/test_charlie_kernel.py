@@ -0,0 +1,256 @@
+import numpy
+import pytest
+from pytest import approx
+import charlie_kernel
+import scenario
+import sim
+from tests.test_scenario import _get_dual_income_payload
+from tests.test_scenario import _get_simulation_payload
+
+
+def _get_payloads():
+    payload = _get_dual_income_payload()
+    spec = scenario.compile_spec(payload)
+    return [
+        payload,
+        # No mortgage
+        spec.variant(
+            {"settings": {"mortgage_principal": 0, "mortgage_amortization": 0}}
+        ).to_payload(),
+        # Retirements far apart, with employer RRSP matching
+        spec.variant(
+            {
+                "partner1": {
+                    "age_at_retirement": 70,
+                    "rrsp_matching_cap_fraction": 0.03,
+                },
+                "partner2": {
+                    "age_at_retirement": 58,
+                    "rrsp_matching_cap_fraction": 0.05,
+                },
+            }
+        ).to_payload(),
+        # A longer run, with unregistered interest and a different savings split
+        spec.variant(
+            {
+                "partner1": {"age_at_death": 95},
+                "settings": {
+                    "unregistered_interest_rate": 0.02,
+                    "initial_non_rrsp": 0.2,
+                    "final_non_rrsp": 0.9,
+                    "increase_savings_weight": 0.9,
+                    "rrsp_adjustment": -0.2,
+                },
+            }
+        ).to_payload(),
+    ]
+
+
+def _get_simulation(payload):
+    simulation = scenario.compile_spec(payload).build().simulation
+    # Solving sets the optimized variables to their initial guesses, so that the simulation can then be run at any spending
+    simulation.run()
+    return simulation
+
+
+def _assert_history_matches(history, i, run: sim.Dual_Income_Simulation_Run):
+    for year, (deltas, funds) in enumerate(zip(run.all_deltas, run.all_funds)):
+        for partner, (partner_deltas, partner_funds) in enumerate(
+            [
+                (deltas.partner1_deltas, funds.partner1_funds),
+                (deltas.partner2_deltas, funds.partner2_funds),
+            ]
+        ):
+            for name in charlie_kernel._PARTNER_DELTAS_FIELDS:
+                assert history[f"deltas.{name}"][year, i, partner] == approx(
+                    getattr(partner_deltas, name), rel=1e-9, abs=1e-6
+                ), f"deltas.{name} of partner {partner + 1} in {deltas.year}"
+            for name in charlie_kernel._PARTNER_FUNDS_FIELDS:
+                assert history[f"funds.{name}"][year, i, partner] == approx(
+                    getattr(partner_funds, name), rel=1e-9, abs=1e-6
+                ), f"funds.{name} of partner {partner + 1} in {deltas.year}"
+        for name in charlie_kernel._HOUSEHOLD_DELTAS_FIELDS:
+            assert history[f"deltas.{name}"][year, i] == approx(
+                getattr(deltas, name), rel=1e-9, abs=1e-6
+            ), f"deltas.{name} in {deltas.year}"
+
+
+@pytest.mark.parametrize("initial_spending", [15000, 40000, 60000, 90000])
+def test_kernel_matches_simulation_runs(initial_spending):
+    payloads = _get_payloads()
+    kernel = charlie_kernel.compile_kernel(payloads)
+
+    history = kernel.get_history(initial_spending)
+    final_savings = kernel.run(initial_spending)
+
+    for i, payload in enumerate(payloads):
+        run = sim.Dual_Income_Simulation_Run(_get_simulation(payload), initial_spending)
+        run.run()
+        assert final_savings[i] == approx(run.final_funds.total_savings, rel=1e-9)
+        _assert_history_matches(history, i, run)
+
+        # The runs of different lengths keep their final values
+        final_year = len(run.all_funds) - 1
+        for name, values in history.items():
+            assert numpy.all(values[final_year:, i] == values[final_year, i])
+
+
+def test_kernel_runs_spending_candidates_of_one_scenario():
+    payload = _get_dual_income_payload()
+    simulation = _get_simulation(payload)
+    kernel = charlie_kernel.compile_kernel([scenario.compile_spec(payload)])
+    initial_spendings = numpy.array(
+        [0, 20000, simulation.required_initial_spending, 80000]
+    )
+
+    final_savings = kernel.run(initial_spendings)
+
+    assert final_savings.shape == (4,)
+    for initial_spending, savings in zip(initial_spendings, final_savings):
+        run = sim.Dual_Income_Simulation_Run(simulation, initial_spending)
+        run.run()
+        assert savings == approx(run.final_funds.total_savings, rel=1e-9)
+    assert final_savings[2] == approx(
+        simulation.final_savings, abs=simulation.final_savings * 1e-3
+    )
+
+
+def test_compile_kernel_rejects_single_income_scenarios():
+    with pytest.raises(ValueError):
+        charlie_kernel.compile_kernel([_get_simulation_payload()])
+
+
+def test_solve_matches_simulation_solves():
+    spec = scenario.compile_spec(_get_dual_income_payload())
+    specs = [
+        spec,
+        spec.variant({"partner1": {"age_at_retirement": 57}}),
+        spec.variant({"partner2": {"age_at_retirement": 68, "age_at_death": 90}}),
+        # Not attainable
+        spec.variant({"simulation": {"final_savings": 1e12}}),
+    ]
+
+    outcomes = charlie_kernel.compile_kernel(specs).solve()
+
+    for spec, outcome in zip(specs, outcomes):
+        results = spec.run()
+        assert outcome["was_solution_found"] == results["was_solution_found"]
+        assert outcome["run_message"] == results["run_message"]
+        assert outcome["required_initial_spending"] == approx(
+            results["required_initial_spending"], rel=1e-9
+        )
+    assert [outcome["was_solution_found"] for outcome in outcomes] == [
+        True,
+        True,
+        True,
+        False,
+    ]
+
+
+def test_solve_within_brackets_matches_simulation_solves():
+    spec = scenario.compile_spec(_get_dual_income_payload())
+    solution = spec.run()["required_initial_spending"]
+    specs = [
+        spec,
+        spec,
+        spec,
+        spec,
+        spec.variant({"partner1": {"age_at_retirement": 57}}),
+    ]
+    brackets = [
+        (solution * 0.99, solution * 1.01),
+        # Doesn't hold the solution, so the full range is searched
+        (solution * 0.5, solution * 0.6),
+        # Outside the full range
+        (-20000, -10000),
+        None,
+        (solution * 0.9, solution * 1.1),
+    ]
+
+    outcomes = charlie_kernel.compile_kernel(specs).solve(brackets=brackets)
+
+    for spec, bracket, outcome in zip(specs, brackets, outcomes):
+        results = spec.run(initial_spending_bracket=bracket)
+        assert outcome["was_solution_found"] == results["was_solution_found"]
+        assert outcome["run_message"] == results["run_message"]
+        assert outcome["required_initial_spending"] == approx(
+            results["required_initial_spending"], rel=1e-9
+        )
+    assert all(outcome["was_solution_found"] for outcome in outcomes)
+
+
+def test_k_section_solver_matches_simulation_solve():
+    payload = _get_dual_income_payload()
+    expected = scenario.compile_spec(payload).run()
+    spec = scenario.compile_spec(payload)
+    built = spec.build()
+    built.optimizer.inner_solver = charlie_kernel.compile_kernel(
+        [spec]
+    ).get_k_section_solver(built.optimizer)
+
+    results = built.run()
+
+    assert results["was_solution_found"]
+    assert results["run_message"] == "Success"
+    assert results["required_initial_spending"] == approx(
+        expected["required_initial_spending"], abs=1e-3
+    )
+
+
+def test_k_section_solver_runs_at_the_optimizers_values():
+    values = {
+        "initial_non_rrsp": 0.9,
+        "final_non_rrsp": 0.2,
+        "initial_equalize_income_weighting": 0.3,
+        "final_equalize_income_weighting": 0.8,
+        "rrsp_adjustment": -0.2,
+    }
+    spec = scenario.compile_spec(_get_dual_income_payload())
+    expected = spec.variant({"settings": values}).run()
+    # The optimizer moves the optimized variables away from the settings the kernel was compiled with
+    built = spec.build()
+    for name, value in values.items():
+        built.optimizer.set_initial_guess(name, value)
+    built.optimizer.inner_solver = charlie_kernel.compile_kernel(
+        [spec]
+    ).get_k_section_solver(built.optimizer)
+
+    results = built.run()
+
+    assert results["was_solution_found"]
+    assert results["required_initial_spending"] == approx(
+        expected["required_initial_spending"], abs=1e-3
+    )
+    assert results["required_initial_spending"] != approx(
+        spec.run()["required_initial_spending"], abs=1
+    )
+
+
+def test_run_with_optimized_values():
+    payload = _get_dual_income_payload()
+    spec = scenario.compile_spec(payload)
+    variant = spec.variant({"settings": {"final_non_rrsp": 0.1}})
+    kernel = charlie_kernel.compile_kernel([spec])
+
+    outputs = kernel.run(
+        numpy.array([40000.0, 40000.0]),
+        optimized_values={"final_non_rrsp": numpy.array([0.5, 0.1])},
+    )
+
+    assert outputs == approx(
+        [
+            kernel.run(40000.0)[0],
+            charlie_kernel.compile_kernel([variant]).run(40000.0)[0],
+        ],
+        rel=1e-12,
+    )
+    with pytest.raises(ValueError):
+        kernel.run(40000.0, optimized_values={"interest_rate": 0.1})
+
+
+def test_k_section_solver_needs_a_single_scenario():
+    spec = scenario.compile_spec(_get_dual_income_payload())
+    with pytest.raises(ValueError):
+        charlie_kernel.compile_kernel([spec, spec]).get_k_section_solver(
+            spec.build().optimizer
+        )
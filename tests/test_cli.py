@@ -0,0 +1,97 @@
+import csv
+import json
+import os
+import subprocess
+import sys
+import cli
+import scenario
+from tests.test_scenario import _get_dual_income_payload
+
+
+def _write_scenario(tmp_path, payload):
+    path = tmp_path / "scenario.json"
+    path.write_text(json.dumps(payload))
+    return str(path)
+
+
+def test_json_output(tmp_path):
+    output_path = tmp_path / "results.json"
+
+    exit_code = cli.main(
+        [_write_scenario(tmp_path, _get_dual_income_payload()), "-o", str(output_path)]
+    )
+
+    results = json.loads(output_path.read_text())
+    assert exit_code == (0 if results["was_solution_found"] else 1)
+    assert results == scenario.run(_get_dual_income_payload())
+
+
+def test_csv_output(tmp_path):
+    output_path = tmp_path / "results.csv"
+
+    cli.main(
+        [
+            _write_scenario(tmp_path, _get_dual_income_payload()),
+            "--format",
+            "csv",
+            "-o",
+            str(output_path),
+        ]
+    )
+
+    with open(output_path, newline="") as f:
+        rows = list(csv.reader(f))
+    results = scenario.run(_get_dual_income_payload())
+    header = rows[0]
+    assert len(rows) == len(results["series"]["years_series"]) + 1
+    assert "partner1.salary_series" in header
+    # Career-only series don't have a value for every year
+    assert "career_years_series" not in header
+    spending = [float(row[header.index("spending_series")]) for row in rows[1:]]
+    assert spending == results["series"]["spending_series"]
+
+
+def test_invalid_scenario(tmp_path):
+    payload = _get_dual_income_payload()
+    del payload["partner1"]
+
+    assert cli.main([_write_scenario(tmp_path, payload)]) == 2
+
+
+def test_mistyped_scenario(tmp_path, capsys):
+    payload = _get_dual_income_payload()
+    payload["partner1"]["age_at_retirement"] = "sixty"
+
+    assert cli.main([_write_scenario(tmp_path, payload)]) == 2
+    error = capsys.readouterr().err
+    assert "Invalid scenario" in error
+    assert "partner1.age_at_retirement" in error
+    assert len(error.splitlines()) == 1
+
+
+def test_unreadable_scenario(tmp_path, capsys):
+    assert cli.main([str(tmp_path / "missing.json")]) == 2
+    assert "Can't read scenario" in capsys.readouterr().err
+
+    path = tmp_path / "broken.json"
+    path.write_text("{")
+    assert cli.main([str(path)]) == 2
+    error = capsys.readouterr().err
+    assert "isn't valid JSON" in error
+    assert len(error.splitlines()) == 1
+
+
+def test_startup_does_not_import_slow_modules():
+    output = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, cli; print([m for m in ['IPython', 'matplotlib', 'scipy'] if m in sys.modules])",
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+        cwd=os.path.dirname(cli.__file__),
+    ).stdout
+
+    assert output.strip() == "[]"
@@ -1,3 +1,4 @@
+import math
 import model
 import couple_savings_rules
 
@@ -143,3 +144,26 @@ def test_get_max_allowable_rrsp_contribution_with_withdrawal():
     # New room should still be 5000
     assert new_funds.rrsp_available_room == 5000
     assert new_funds.rrsp_savings == 8000
+
+
+def test_adjust_values_to_produce_sum_near_ties():
+    # Rooms differing only by floating-point noise previously took one increment per distinct room.
+    values_and_limits = [(1000.0 + i * 1e-9, 5000.0) for i in range(4)]
+    target_sum = 12000
+    values_and_limits = couple_savings_rules._adjust_values_to_produce_sum(
+        values_and_limits, target_sum
+    )
+    assert math.isclose(target_sum, sum(x[0] for x in values_and_limits))
+    for value, limit in values_and_limits:
+        assert math.isclose(3000, value)
+        assert value <= limit
+
+
+def test_adjust_values_to_produce_sum_above_limit():
+    # Values above their limit are brought back down to it, and the others make up the difference
+    values_and_limits = [(5, 4), (0, 10), (1, 3)]
+    target_sum = 12
+    values_and_limits = couple_savings_rules._adjust_values_to_produce_sum(
+        values_and_limits, target_sum
+    )
+    assert values_and_limits == [(4, 4), (5, 10), (3, 3)]
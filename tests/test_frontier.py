@@ -0,0 +1,90 @@
+import concurrent.futures
+import math
+import frontier
+import scenario
+from tests.test_scenario import _get_dual_income_payload
+from tests.test_scenario import _get_simulation_payload
+
+
+def _get_expected(payload, sections, age):
+    spec = scenario.compile_spec(payload)
+    return spec.variant(
+        {section: {"age_at_retirement": age} for section in sections}
+    ).run()
+
+
+def test_frontier_matches_individual_solves():
+    payload = _get_dual_income_payload()
+    # Ages beyond 61 have several solutions in this household, since final savings isn't monotonic in initial spending
+    ages = range(55, 62)
+
+    points = frontier.get_retirement_age_frontier(payload, ages)
+
+    assert [p["age_at_retirement"] for p in points] == list(ages)
+    for point in points:
+        expected = _get_expected(
+            payload, ("partner1", "partner2"), point["age_at_retirement"]
+        )
+        assert point["was_solution_found"] == expected["was_solution_found"]
+        assert math.isclose(
+            point["required_initial_spending"],
+            expected["required_initial_spending"],
+            rel_tol=1e-6,
+        )
+
+
+def test_frontier_single_income_on_executor():
+    payload = _get_simulation_payload()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        points = frontier.get_retirement_age_frontier(
+            payload, [61, 55, 58], executor=executor
+        )
+
+    assert [p["age_at_retirement"] for p in points] == [55, 58, 61]
+    for point in points:
+        expected = _get_expected(payload, ("simulation",), point["age_at_retirement"])
+        assert point["was_solution_found"] == expected["was_solution_found"]
+        assert point["run_message"] == expected["run_message"]
+
+
+def test_frontier_solves_levels_together_on_kernel(monkeypatch):
+    payload = _get_dual_income_payload()
+    solve_level = frontier._solve_level
+    levels = []
+
+    def recording_solve_level(variants, level, executor, is_kernel_solved):
+        assert is_kernel_solved
+        levels.append([i for i, _ in level])
+        return solve_level(variants, level, executor, is_kernel_solved)
+
+    monkeypatch.setattr(frontier, "_solve_level", recording_solve_level)
+
+    points = frontier.get_retirement_age_frontier(payload, range(55, 62))
+
+    # Quarters of the range, then the ages between them
+    assert levels == [[0, 1, 3, 4, 6], [2, 5]]
+    for point in points:
+        expected = _get_expected(
+            payload, ("partner1", "partner2"), point["age_at_retirement"]
+        )
+        assert point["was_solution_found"] == expected["was_solution_found"]
+        assert math.isclose(
+            point["required_initial_spending"],
+            expected["required_initial_spending"],
+            rel_tol=1e-6,
+        )
+
+
+def test_frontier_level_splits():
+    assert frontier._get_splits(0, 6, 2) == [3]
+    assert frontier._get_splits(0, 15, 4) == [3, 7, 11]
+    assert frontier._get_splits(0, 2, 4) == [1]
+    assert frontier._get_splits(0, 1, 4) == []
+    assert frontier._get_intervals(0, [3, 7, 11], 15) == [
+        (0, 3),
+        (3, 7),
+        (7, 11),
+        (11, 15),
+    ]
+    assert frontier._get_intervals(0, [1], 2) == []
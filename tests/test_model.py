@@ -131,3 +131,42 @@ def test_couple_rule_from_single_rule():
 
     assert deltas.partner1_deltas.gross_salary == 34
     assert deltas.partner2_deltas.gross_salary == 25
+
+
+def test_couple_rule_from_partner_rules():
+    def add_salary(amount):
+        def rule(
+            deltas: model.deltas_state,
+            previous_funds: model.funds_state,
+            previous_deltas: model.deltas_state,
+        ):
+            return deltas.update_gross_salary(deltas.gross_salary + amount)
+
+        return rule
+
+    def double_salary_from_previous_rrsp(
+        deltas: model.deltas_state,
+        previous_funds: model.funds_state,
+        previous_deltas: model.deltas_state,
+    ):
+        return deltas.update_gross_salary(
+            2 * deltas.gross_salary + previous_funds.rrsp_savings
+        )
+
+    previous_deltas = model.couple_deltas_state.from_year(1980)
+    previous_funds = model.couple_funds_state.from_savings(
+        5, 0, 0.0, 0.0, 0.0, 3, 0, 0.0, 0.0, 0.0, 1980
+    )
+
+    rule = model.get_couple_rule_from_partner_rules(
+        [add_salary(20), double_salary_from_previous_rrsp],
+        [add_salary(18), add_salary(1), double_salary_from_previous_rrsp],
+    )
+
+    deltas = model.get_updated_couple_deltas_from_rules(
+        previous_funds, previous_deltas, [rule]
+    )
+
+    assert deltas.year == 1981
+    assert deltas.partner1_deltas.gross_salary == 45
+    assert deltas.partner2_deltas.gross_salary == 41
@@ -0,0 +1,271 @@
+import pytest
+import model
+import natural_rules
+import ruleset
+import salary_rules
+import spending_rules
+import savings_rules
+import couple_savings_rules
+import couple_spending_rules
+from rule_dependencies import declares
+from rule_dependencies import get_exogenous_rules
+from rule_dependencies import is_declared
+from rule_dependencies import Rule_Dependency_Graph
+
+
+def _get_rule(reads=(), writes=(), provisional_reads=()):
+    @declares(reads=reads, writes=writes, provisional_reads=provisional_reads)
+    def rule(
+        deltas: model.deltas_state,
+        previous_funds: model.funds_state,
+        previous_deltas: model.deltas_state,
+    ):
+        return deltas
+
+    return rule
+
+
+def _undeclared_rule(
+    deltas: model.deltas_state,
+    previous_funds: model.funds_state,
+    previous_deltas: model.deltas_state,
+):
+    return deltas
+
+
+def test_derived_fields_are_expanded():
+    rule = _get_rule(
+        reads=["deltas.total_net_income", "previous_deltas.taxable_income"]
+    )
+    assert rule.reads == {
+        "deltas.gross_salary",
+        "deltas.benefits",
+        "deltas.tax_refund",
+        "deltas.tax",
+        "previous_deltas.gross_salary",
+        "previous_deltas.benefits",
+        "previous_deltas.unregistered_interest",
+        "previous_deltas.rrsp",
+    }
+
+    household_rule = _get_rule(reads=["deltas.household_undifferentiated_savings"])
+    assert "deltas.partner1.gross_salary" in household_rule.reads
+    assert "deltas.partner2.contributions" in household_rule.reads
+    assert "deltas.household_spending" in household_rule.reads
+    assert "deltas.household_debt_payments" in household_rule.reads
+
+
+def test_check_order():
+    salary_rule = salary_rules.get_compound_plateau(0.05, 100000)
+    spending_rule = spending_rules.get_luxury_over_basic_capped(20000, 0.02, 0.9)
+
+    Rule_Dependency_Graph(
+        [salary_rule, natural_rules.apply_tax, spending_rule]
+    ).check_order()
+
+    with pytest.raises(ValueError):
+        Rule_Dependency_Graph(
+            [salary_rule, spending_rule, natural_rules.apply_tax]
+        ).check_order()
+
+    # Undeclared rules are opaque, and never cause violations
+    Rule_Dependency_Graph(
+        [_undeclared_rule, spending_rule, _undeclared_rule]
+    ).check_order()
+
+
+def test_provisional_reads_are_not_violations():
+    add_benefits = _get_rule(writes=["deltas.benefits"])
+    graph = Rule_Dependency_Graph(
+        [
+            salary_rules.get_compound_plateau(0.05, 100000),
+            natural_rules.apply_tax,
+            add_benefits,
+        ]
+    )
+    assert graph.get_ordering_violations() == []
+
+    graph = Rule_Dependency_Graph([_get_rule(reads=["deltas.benefits"]), add_benefits])
+    assert len(graph.get_ordering_violations()) == 1
+
+
+def test_get_edges():
+    salary_rule = salary_rules.get_compound_plateau(0.05, 100000)
+    graph = Rule_Dependency_Graph(
+        [natural_rules.apply_tax_refund, salary_rule, natural_rules.apply_tax]
+    )
+    assert graph.get_edges() == [(1, 2, "deltas.gross_salary")]
+
+
+def test_get_unused_rules():
+    unused_rule = _get_rule(reads=["deltas.gross_salary"], writes=["deltas.spending"])
+    rules = [
+        salary_rules.get_compound_plateau(0.05, 100000),
+        unused_rule,
+        natural_rules.apply_tax,
+    ]
+    # Nothing reads the tax either, since there's no tax refund or savings rule
+    assert Rule_Dependency_Graph(rules).get_unused_rules() == [
+        unused_rule,
+        natural_rules.apply_tax,
+    ]
+
+    # Spending is used by the following year's spending rule
+    rules[1] = spending_rules.get_luxury_over_basic(20000, 0.02)
+    assert Rule_Dependency_Graph(rules).get_unused_rules() == [natural_rules.apply_tax]
+
+    # An opaque rule might use anything
+    rules[1] = unused_rule
+    rules.append(_undeclared_rule)
+    assert Rule_Dependency_Graph(rules).get_unused_rules() == []
+
+
+def test_get_independent_groups():
+    salary_rule = salary_rules.get_compound_plateau(0.05, 100000)
+    interest_rule = natural_rules.get_calculate_investment_interest(0.05, 0.05, 0.05)
+    tfsa_limit_rule = natural_rules.increase_tfsa_limit(6000)
+    rules = [
+        natural_rules.apply_tax_refund,
+        interest_rule,
+        tfsa_limit_rule,
+        salary_rule,
+        natural_rules.apply_tax,
+        _undeclared_rule,
+        spending_rules.get_luxury_over_basic(20000, 0.02),
+    ]
+
+    groups = Rule_Dependency_Graph(rules).get_independent_groups()
+
+    assert groups == [
+        [natural_rules.apply_tax_refund, interest_rule, tfsa_limit_rule, salary_rule],
+        [natural_rules.apply_tax],
+        [_undeclared_rule],
+        [rules[-1]],
+    ]
+
+
+def test_couple_rules_are_qualified_by_partner():
+    salary_rule = salary_rules.get_compound_plateau(0.05, 100000)
+
+    couple_rule = model.get_couple_rule_from_single_rule(salary_rule, 2)
+    assert couple_rule.reads == {"previous_deltas.partner2.gross_salary"}
+    assert couple_rule.writes == {"deltas.partner2.gross_salary"}
+
+    couple_rule = model.get_couple_rule_from_partner_rules(
+        [salary_rule, natural_rules.apply_tax], [natural_rules.apply_tax]
+    )
+    assert "deltas.partner1.gross_salary" in couple_rule.writes
+    assert "deltas.partner2.gross_salary" not in couple_rule.writes
+    assert couple_rule.writes >= {"deltas.partner1.tax", "deltas.partner2.tax"}
+    assert "deltas.partner2.benefits" in couple_rule.provisional_reads
+
+    assert not is_declared(
+        model.get_couple_rule_from_partner_rules([salary_rule], [_undeclared_rule])
+    )
+
+    with pytest.raises(ValueError):
+        model.get_couple_rule_from_partner_rules(
+            [natural_rules.apply_tax, salary_rule], []
+        )
+
+
+@pytest.mark.parametrize("is_partner1_retired", [False, True])
+@pytest.mark.parametrize("is_partner2_retired", [False, True])
+def test_couple_ruleset_is_correctly_ordered(is_partner1_retired, is_partner2_retired):
+    rules = ruleset.get_couple_ruleset(
+        partner1_salary_rule=salary_rules.get_compound_plateau(0.05, 100000),
+        partner2_salary_rule=salary_rules.get_compound_plateau(0.04, 90000),
+        spending_rule=couple_spending_rules.get_increasing_savings_increasing_spending(
+            2020, 0.5
+        ),
+        savings_rule=couple_savings_rules.get_split_by_investment_then_partner_with_limits(
+            lambda: 0.5,
+            lambda: 0.5,
+            lambda: 0.5,
+            lambda: 0.5,
+            2050,
+            2052,
+            2020,
+            2080,
+            lambda: 0.05,
+        ),
+        rrsp_interest_rate=0.05,
+        tfsa_interest_rate=0.05,
+        unregistered_interest_rate=0.03,
+        tfsa_yearly_increase=6000,
+        rrsp_income_fraction=0.18,
+        rrsp_annual_limit=30000,
+        partner1_pretax_rules=[],
+        partner2_pretax_rules=[],
+        partner1_post_savings_rules=[salary_rules.get_rrsp_matching(0.03)],
+        partner2_post_savings_rules=[salary_rules.get_rrsp_matching(0.05)],
+        mortgage_payment_rule=natural_rules.get_couple_mortgage_payment(
+            300000, 25, 0.04, 2020
+        ),
+    )(2030, is_partner1_retired, is_partner2_retired)
+    graph = Rule_Dependency_Graph(rules)
+
+    assert all(is_declared(rule) for rule in graph.rules)
+    assert graph.get_ordering_violations() == []
+    assert graph.get_unused_rules() == []
+
+
+def test_single_rules_are_correctly_ordered():
+    career_rules = ruleset.get_career_rules(
+        salary_rules.get_compound_plateau(0.05, 100000),
+        spending_rules.get_luxury_over_basic_capped(20000, 0.02, 0.9),
+        savings_rules.get_simple_linear(0.5, 0.5, 2020, 30),
+        0.05,
+        0.05,
+        0.03,
+    )
+    retirement_rules = ruleset.get_retirement_rules(
+        40000,
+        savings_rules.get_simple_retirement_deduction(2050, 2080),
+        0.05,
+        0.05,
+        0.03,
+    )
+
+    for rules in [career_rules, retirement_rules]:
+        graph = Rule_Dependency_Graph(rules)
+        assert all(is_declared(rule) for rule in graph.rules)
+        assert graph.get_ordering_violations() == []
+
+
+def test_get_exogenous_rules():
+    salary_rule = salary_rules.get_compound_plateau(0.05, 100000)
+    spending_rule = spending_rules.get_luxury_over_basic(20000, 0.02)
+    savings_rule = savings_rules.get_simple_retirement_deduction(2050, 2080)
+    career_rules = ruleset.get_career_rules(
+        salary_rule,
+        spending_rule,
+        savings_rules.get_simple_linear(0.5, 0.5, 2020, 30),
+        0.05,
+        0.05,
+        0.03,
+    )
+    retirement_rules = ruleset.get_retirement_rules(
+        40000, savings_rule, 0.05, 0.05, 0.03
+    )
+
+    exogenous_rules = get_exogenous_rules(
+        [career_rules, retirement_rules], ["previous_deltas.spending"]
+    )
+
+    # Salary and retirement spending don't depend on the run. Spending before retirement depends on the initial spending, and tax
+    # depends on interest on savings.
+    assert exogenous_rules == {salary_rule, retirement_rules[0]}
+
+    # Without an undeclared rule, anything might depend on anything
+    assert get_exogenous_rules([career_rules + [_undeclared_rule]]) == set()
+
+
+def test_exogenous_rules_are_not_moved_past_other_writers():
+    set_salary = _get_rule(writes=["deltas.gross_salary"])
+    add_to_salary = _get_rule(
+        reads=["previous_funds.rrsp_savings"], writes=["deltas.gross_salary"]
+    )
+
+    assert get_exogenous_rules([[set_salary, add_to_salary]]) == {set_salary}
+    assert get_exogenous_rules([[add_to_salary, set_salary]]) == set()
@@ -0,0 +1,176 @@
+import pytest
+import model
+import natural_rules
+import ruleset
+import salary_rules
+import sim
+import couple_savings_rules
+import couple_spending_rules
+from rule_schedule import active_during
+from rule_schedule import is_active
+from rule_schedule import get_active_rules
+
+
+def _rule(
+    deltas: model.deltas_state,
+    previous_funds: model.funds_state,
+    previous_deltas: model.deltas_state,
+):
+    return deltas
+
+
+def test_is_active():
+    rule = active_during([(None, 2030), (2040, 2045)])(lambda *args: None)
+
+    assert is_active(rule, 1900)
+    assert is_active(rule, 2029)
+    assert not is_active(rule, 2030)
+    assert not is_active(rule, 2039)
+    assert is_active(rule, 2040)
+    assert is_active(rule, 2044)
+    assert not is_active(rule, 2045)
+
+    # Rules without windows are always active
+    assert is_active(_rule, 2030)
+    assert get_active_rules([_rule, rule], 2035) == [_rule]
+
+
+@pytest.mark.parametrize("retirement_age", [55, 62, 70])
+@pytest.mark.parametrize("pension_start_age", [60, 65, 70])
+def test_quebec_pension_plan_is_only_active_when_it_applies(
+    retirement_age, pension_start_age
+):
+    qpp_rule = natural_rules.get_quebec_pension_plan(
+        68400, 0.07, 320, 930, 415, 1510, 2025, 35, retirement_age, pension_start_age
+    )
+
+    for year in range(2026, 2080):
+        deltas = model.deltas_state.from_year(year)
+        output = qpp_rule(deltas, None, None)
+        is_changed = output.contributions != 0 or output.benefits != 0
+        assert is_changed == is_active(qpp_rule, year)
+
+
+def test_mortgage_payment_is_only_active_when_it_applies():
+    mortgage_rule = natural_rules.get_mortgage_payment(300000, 25, 0.04, 2025)
+
+    for year in range(2026, 2080):
+        deltas = model.deltas_state.from_year(year)
+        output = mortgage_rule(deltas, None, None)
+        assert (output.debt_payments != 0) == is_active(mortgage_rule, year)
+
+
+def _get_simulation(mortgage_rule):
+    simulation = sim.Dual_Income_Simulation()
+    for parameters in [simulation.partner1_parameters, simulation.partner2_parameters]:
+        parameters.age_at_retirement = 60
+        parameters.year_of_birth = 1990
+        parameters.age_at_death = 80
+        parameters.initial_salary = 40000
+        parameters.initial_savings_rrsp = 10000
+        parameters.initial_savings_tfsa = 5000
+        parameters.initial_savings_unregistered = 0
+        parameters.initial_tfsa_limit = 20000
+        parameters.initial_rrsp_limit = 30000
+    simulation.partner2_parameters.year_of_birth = 1993
+    simulation.initial_year = 2025
+    simulation.final_savings = 0
+    simulation.set_ruleset(
+        ruleset.get_couple_ruleset(
+            partner1_salary_rule=salary_rules.get_compound_plateau(0.05, 80000),
+            partner2_salary_rule=salary_rules.get_compound_plateau(0.04, 90000),
+            spending_rule=couple_spending_rules.get_increasing_savings_increasing_spending(
+                2025, 0.5
+            ),
+            savings_rule=couple_savings_rules.get_split_by_investment_then_partner_with_limits(
+                lambda: 0.5,
+                lambda: 0.5,
+                lambda: 0.5,
+                lambda: 0.5,
+                2050,
+                2053,
+                2025,
+                2073,
+                lambda: 0.05,
+            ),
+            rrsp_interest_rate=0.05,
+            tfsa_interest_rate=0.05,
+            unregistered_interest_rate=0.03,
+            tfsa_yearly_increase=6000,
+            rrsp_income_fraction=0.18,
+            rrsp_annual_limit=30000,
+            partner1_pretax_rules=[
+                natural_rules.get_quebec_pension_plan(
+                    68400, 0.07, 320, 930, 415, 1510, 2025, 35, 60, 62
+                )
+            ],
+            partner2_pretax_rules=[
+                natural_rules.get_quebec_pension_plan(
+                    68400, 0.07, 320, 930, 415, 1510, 2025, 32, 60, 65
+                )
+            ],
+            partner1_post_savings_rules=[salary_rules.get_rrsp_matching(0.03)],
+            partner2_post_savings_rules=[salary_rules.get_rrsp_matching(0.05)],
+            mortgage_payment_rule=mortgage_rule,
+        )
+    )
+    return simulation
+
+
+def test_inactive_rules_are_excluded_from_schedule():
+    mortgage_rule = natural_rules.get_couple_mortgage_payment(300000, 25, 0.04, 2025)
+    simulation = _get_simulation(mortgage_rule)
+
+    schedule = simulation._get_rule_schedule()
+
+    assert len(schedule) == simulation.final_year - simulation.initial_year
+    # Payments are made in each of the 25 years following the initial year
+    assert all(mortgage_rule in rules for rules in schedule[:25])
+    assert all(mortgage_rule not in rules for rules in schedule[25:])
+
+
+def test_exogenous_schedule():
+    mortgage_rule = natural_rules.get_couple_mortgage_payment(300000, 25, 0.04, 2025)
+    simulation = _get_simulation(mortgage_rule)
+
+    schedule = simulation._get_rule_schedule()
+    exogenous_schedule = simulation._get_exogenous_schedule()
+
+    assert len(exogenous_schedule) == len(schedule)
+    for year, (exogenous_deltas, remaining_rules) in enumerate(
+        exogenous_schedule, simulation.initial_year + 1
+    ):
+        assert exogenous_deltas.year == year
+        # The mortgage and each partner's salary, pension and contribution limits are precomputed, leaving the rest of the pretax
+        # rules, spending, savings and RRSP matching
+        assert len(remaining_rules) == 4
+        assert mortgage_rule not in remaining_rules
+
+    # Runs using the precomputed schedule match runs applying every rule
+    unprecomputed_schedule = [
+        (None, rules) for rules in simulation._get_rule_schedule()
+    ]
+    for initial_spending in [20000, 50000]:
+        run = sim.Dual_Income_Simulation_Run(
+            simulation, initial_spending, exogenous_schedule
+        )
+        run.run()
+        unprecomputed_run = sim.Dual_Income_Simulation_Run(
+            simulation, initial_spending, unprecomputed_schedule
+        )
+        unprecomputed_run.run()
+
+        for deltas, unprecomputed_deltas in zip(
+            run.all_deltas, unprecomputed_run.all_deltas
+        ):
+            assert vars(deltas.partner1_deltas) == vars(
+                unprecomputed_deltas.partner1_deltas
+            )
+            assert vars(deltas.partner2_deltas) == vars(
+                unprecomputed_deltas.partner2_deltas
+            )
+            assert deltas.household_spending == unprecomputed_deltas.household_spending
+            assert (
+                deltas.household_debt_payments
+                == unprecomputed_deltas.household_debt_payments
+            )
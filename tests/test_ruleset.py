@@ -0,0 +1,26 @@
+import ruleset
+
+
+def test_rule_cache_reuses_rules():
+    cache = ruleset.Rule_Cache()
+
+    rule = cache.get(lambda rate: [rate], 0.05)
+
+    assert cache.get(list, (1, 2)) is cache.get(list, (1, 2))
+    assert cache.get(list, (1, 2)) is not cache.get(list, (1, 3))
+    assert len(cache) == 3
+    assert rule == [0.05]
+
+
+def test_rule_cache_forgets_least_recently_used_rules():
+    cache = ruleset.Rule_Cache(max_size=2)
+    first = cache.get(list, (1,))
+    second = cache.get(list, (2,))
+
+    # Using the first rule makes the second the least recently used
+    assert cache.get(list, (1,)) is first
+    cache.get(list, (3,))
+
+    assert len(cache) == 2
+    assert cache.get(list, (1,)) is first
+    assert cache.get(list, (2,)) is not second
@@ -0,0 +1,419 @@
+import concurrent.futures
+import copy
+import json
+import sys
+import pytest
+import couple_rulesets
+import scenario
+import sim
+import solve
+
+
+def _get_partner(year_of_birth, age_at_retirement, age_at_death, initial_salary):
+    return {
+        "year_of_birth": year_of_birth,
+        "age_at_retirement": age_at_retirement,
+        "age_at_death": age_at_death,
+        "initial_salary": initial_salary,
+        "initial_savings_rrsp": 5000,
+        "initial_savings_tfsa": 600,
+        "initial_savings_unregistered": 1000,
+        "initial_rrsp_limit": 20000,
+        "initial_tfsa_limit": 10000,
+        "salary_plateau": 80000,
+        "salary_compound_rate": 0.05,
+        "current_monthly_pension_at_60": 320,
+        "projected_monthly_pension_at_60": 930,
+        "current_monthly_pension_at_65": 415,
+        "projected_monthly_pension_at_65": 1510,
+        "pension_start_age": 65,
+    }
+
+
+def _get_dual_income_payload():
+    return {
+        "type": "Dual_Income_Simulation",
+        "partner1": _get_partner(1990, 60, 80, 40000),
+        "partner2": _get_partner(1989, 64, 75, 60000),
+        "simulation": {"initial_year": 2025, "final_savings": 10000},
+        "settings": {
+            "tfsa_yearly_increase": 6000,
+            "rrsp_annual_limit": 30000,
+            "qpp_maximum_pensionable_earnings": 68400,
+            "qpp_pension_contribution": 0.07,
+            "mortgage_principal": 300000,
+            "mortgage_amortization": 25,
+            "mortgage_interest": 0.04,
+        },
+    }
+
+
+def _get_simulation_payload():
+    return {
+        "type": "Simulation",
+        "simulation": {
+            "age_at_retirement": 60,
+            "year_of_birth": 1990,
+            "initial_year": 2025,
+            "age_at_death": 80,
+            "savings_at_death": 10000,
+            "initial_salary": 40000,
+            "initial_savings_rrsp": 5000,
+            "initial_savings_tfsa": 600,
+            "initial_tfsa_limit": 0,
+            "initial_rrsp_limit": 0,
+        },
+        "ruleset": "curie",
+        "ruleset_arguments": {
+            "salary_compound_rate": 0.05,
+            "salary_plateau": 70000,
+            "base_spending": 30000,
+            "spending_luxury_compound_rate": 0.04,
+            "cap_fractional": 0.9,
+            "retirement_income": 50000,
+            "rrsp_interest_rate": 0.05,
+            "tfsa_interest_rate": 0.05,
+        },
+    }
+
+
+def test_dual_income_payload_matches_notebook_configuration():
+    results = scenario.run(_get_dual_income_payload())
+
+    simulation = sim.Dual_Income_Simulation()
+    for parameters, partner in [
+        (simulation.partner1_parameters, _get_partner(1990, 60, 80, 40000)),
+        (simulation.partner2_parameters, _get_partner(1989, 64, 75, 60000)),
+    ]:
+        for name in [
+            "year_of_birth",
+            "age_at_retirement",
+            "age_at_death",
+            "initial_salary",
+            "initial_savings_rrsp",
+            "initial_savings_tfsa",
+            "initial_savings_unregistered",
+            "initial_rrsp_limit",
+            "initial_tfsa_limit",
+        ]:
+            setattr(parameters, name, partner[name])
+    simulation.initial_year = 2025
+    simulation.final_savings = 10000
+    optimize = solve.Optimizing_Solver(solve.binary_solver, should_invert=True)
+    optimize.is_optimization_disabled = True
+    simulation.set_solver(optimize.solve)
+    p1 = simulation.partner1_parameters
+    p2 = simulation.partner2_parameters
+    simulation.set_ruleset(
+        couple_rulesets.charlie(
+            0.05, 80000, 0.05, 80000, 2025, 0.5, 0.5, 0.5, 0.5, 0.5,
+            p1.year_of_retirement, p2.year_of_retirement, simulation.final_year,
+            0.05, 0.05, 0.05, 0.05, 6000, 0.18, 30000, 0.0, 0.0, optimize,
+            300000, 25, 0.04, 68400, 0.07,
+            320, 930, 415, 1510, 60, 65,
+            320, 930, 415, 1510, 64, 65,
+        )
+    )  # fmt: skip
+    simulation.run()
+
+    assert results["was_solution_found"] == simulation.was_solution_found
+    assert results["run_message"] == simulation.run_message
+    assert results["required_initial_spending"] == simulation.required_initial_spending
+    assert results["series"]["spending_series"] == [
+        d.household_spending for d in simulation.all_deltas
+    ]
+    assert results["series"]["partner2"]["rrsp_series"] == [
+        d.partner2_deltas.rrsp for d in simulation.all_deltas
+    ]
+    assert results["series"]["years_series"][0] == 2025
+
+
+def test_simulation_payload_fills_in_simulation_arguments():
+    results = scenario.run(_get_simulation_payload())
+
+    assert results["type"] == "Simulation"
+    assert len(results["series"]["years_series"]) == 46
+    assert results["series"]["years_series"][0] == 2025
+    assert results["summary"]["year_of_retirement"] == 2050
+
+
+@pytest.mark.parametrize(
+    "payload_builder", [_get_dual_income_payload, _get_simulation_payload]
+)
+def test_results_are_json_serializable(payload_builder):
+    results = scenario.run(payload_builder())
+
+    assert json.loads(json.dumps(results)) == results
+
+
+def test_progress_is_reported():
+    progress = []
+
+    results = scenario.run(
+        _get_simulation_payload(),
+        progress_callback=lambda iteration, best: progress.append((iteration, best)),
+    )
+
+    best_spending = (
+        results["required_initial_spending"] if results["was_solution_found"] else None
+    )
+    assert progress == [(0, best_spending)]
+
+
+@pytest.mark.parametrize(
+    "change, message",
+    [
+        (lambda p: p.update(type="Notebook"), "Scenario type"),
+        (lambda p: p["partner1"].pop("year_of_birth"), "partner1.year_of_birth"),
+        (lambda p: p["settings"].update(interest=0.05), "settings.interest"),
+        (lambda p: p.update(settings=[]), "'settings' must be an object"),
+        (
+            lambda p: p["partner1"].update(age_at_retirement="sixty"),
+            "'partner1.age_at_retirement' must be a number, not 'sixty'",
+        ),
+        (
+            lambda p: p["partner2"].update(initial_salary=True),
+            "'partner2.initial_salary' must be a number",
+        ),
+        (
+            lambda p: p["simulation"].update(initial_year=2025.5),
+            "'simulation.initial_year' must be a whole number",
+        ),
+        (
+            lambda p: p["settings"].update(should_optimize="no"),
+            "'settings.should_optimize' must be true or false",
+        ),
+        (
+            lambda p: p["settings"].update(interest_rate=None),
+            "'settings.interest_rate' must be a number, not None",
+        ),
+        (lambda p: p["partner1"].update(name=1), "'partner1.name' must be a string"),
+    ],
+)
+def test_invalid_dual_income_payloads_are_rejected(change, message):
+    payload = copy.deepcopy(_get_dual_income_payload())
+    change(payload)
+
+    with pytest.raises(ValueError, match=message):
+        scenario.validate(payload)
+
+
+@pytest.mark.parametrize(
+    "change, message",
+    [
+        (lambda p: p.update(ruleset="charlie"), "Unknown ruleset"),
+        (
+            lambda p: p["ruleset_arguments"].pop("base_spending"),
+            "ruleset_arguments.base_spending",
+        ),
+        (
+            lambda p: p["ruleset_arguments"].update(initial_year=2025),
+            "ruleset_arguments.initial_year",
+        ),
+        (
+            lambda p: p["simulation"].update(age_at_death="80"),
+            "'simulation.age_at_death' must be a whole number",
+        ),
+        (
+            lambda p: p["ruleset_arguments"].update(base_spending=[30000]),
+            "'ruleset_arguments.base_spending' must be a number",
+        ),
+    ],
+)
+def test_invalid_simulation_payloads_are_rejected(change, message):
+    payload = _get_simulation_payload()
+    change(payload)
+
+    with pytest.raises(ValueError, match=message):
+        scenario.validate(payload)
+
+
+def test_optional_fields_can_be_null():
+    payload = _get_dual_income_payload()
+    payload["partner1"]["name"] = None
+    payload["settings"]["unregistered_interest_rate"] = None
+
+    scenario.validate(payload)
+
+
+def test_variants_match_payloads():
+    spec = scenario.compile_spec(_get_dual_income_payload())
+    changes = {
+        "partner1": {"age_at_retirement": 62},
+        "settings": {"mortgage_principal": 200000},
+    }
+
+    variant = spec.variant(changes)
+
+    payload = _get_dual_income_payload()
+    payload["partner1"]["age_at_retirement"] = 62
+    payload["settings"]["mortgage_principal"] = 200000
+    assert variant.to_payload() == scenario.compile_spec(payload).to_payload()
+    assert variant.run() == scenario.run(payload)
+    # The original spec is unchanged
+    assert spec.to_payload()["partner1"]["age_at_retirement"] == 60
+
+
+def test_variants_share_unchanged_rules():
+    spec = scenario.compile_spec(_get_dual_income_payload())
+    simulation = spec.build().simulation
+    variant_simulation = (
+        spec.variant({"settings": {"increase_savings_weight": 0.7}}).build().simulation
+    )
+
+    rules = set(simulation._ruleset(2030, False, False))
+    variant_rules = set(variant_simulation._ruleset(2030, False, False))
+
+    # Only the spending and savings rules, which are stateful or depend on the optimizer, are built for each variant
+    assert len(rules - variant_rules) == 2
+    assert len(rules & variant_rules) == len(rules) - 2
+
+
+@pytest.mark.parametrize(
+    "changes, message",
+    [
+        ({"partner3": {}}, "scenario.partner3"),
+        ({"partner1": {"age": 62}}, "partner1.age"),
+        ({"settings": 0.5}, "'settings' must be an object"),
+        (
+            {"partner1": {"age_at_retirement": "62"}},
+            "'partner1.age_at_retirement' must be a number",
+        ),
+    ],
+)
+def test_invalid_variants_are_rejected(changes, message):
+    spec = scenario.compile_spec(_get_dual_income_payload())
+
+    with pytest.raises(ValueError, match=message):
+        spec.variant(changes)
+
+
+def test_simulation_variants_check_ruleset_arguments():
+    spec = scenario.compile_spec(_get_simulation_payload())
+
+    with pytest.raises(ValueError, match="ruleset_arguments.cap_fractional"):
+        spec.variant({"ruleset": "ampere"})
+
+    variant = spec.variant({"ruleset_arguments": {"base_spending": 25000}})
+    assert variant.to_payload()["ruleset_arguments"]["salary_plateau"] == 70000
+
+
+def test_parallel_coarse_search_solves_points():
+    payload = _get_dual_income_payload()
+    spec = scenario.compile_spec(payload)
+    names = ["initial_non_rrsp", "rrsp_adjustment"]
+    points = [[0.5, 0.05], [0.8, -0.2]]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        coarse_search = scenario.get_parallel_coarse_search(payload, executor)
+        outputs = coarse_search.evaluate_points(names, points, 1.0)
+
+    for point, (solution, was_solution_found) in zip(points, outputs):
+        results = spec.variant({"settings": dict(zip(names, point))}).run()
+        assert was_solution_found
+        assert solution == pytest.approx(results["required_initial_spending"], rel=1e-4)
+    assert outputs[0][0] != pytest.approx(outputs[1][0], rel=1e-4)
+
+
+def test_parallel_multi_start_finds_optimum():
+    payload = _get_simulation_payload()
+    payload["settings"] = {"should_optimize": True}
+    payload["ruleset_arguments"]["base_spending"] = 10000
+    built = scenario.build(payload)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+        built.optimizer.multi_start = scenario.get_parallel_multi_start(
+            payload, executor, 3, grace_iterations=5
+        )
+        results = built.run()
+
+    # Optimizing from the initial guesses alone fails, since it reaches an invalid savings split
+    assert not scenario.run(payload)["was_solution_found"]
+    assert results["was_solution_found"]
+    local_optima = built.optimizer.local_optima
+    assert len(local_optima) == 3
+    assert local_optima[0]["output"] == pytest.approx(
+        results["required_initial_spending"]
+    )
+    assert local_optima[0]["optimized_values"] == pytest.approx(
+        results["optimized_values"]
+    )
+
+
+def test_parallel_k_section_solver_runs_points_like_serial_runs():
+    payload = _get_dual_income_payload()
+    optimized_values = (("initial_non_rrsp", 0.9), ("rrsp_adjustment", -0.2))
+    built = scenario.build(payload)
+    for name, value in optimized_values:
+        built.optimizer.set_initial_guess(name, value)
+    simulation = built.simulation
+    # Solving sets the optimized variables to their initial guesses, so that the simulation can then be run at any spending
+    simulation.run()
+    initial_spendings = [10000.0 + 2000 * i for i in range(40)]
+    expected = []
+    for initial_spending in initial_spendings:
+        run = sim.Dual_Income_Simulation_Run(simulation, initial_spending)
+        run.run()
+        expected.append(run.final_funds.total_savings)
+
+    # Switch threads often, so that runs on different threads interleave
+    switch_interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=6) as executor:
+            outputs = [
+                executor.submit(
+                    scenario._evaluate_initial_spending,
+                    scenario.compile_spec(payload).to_payload(),
+                    optimized_values,
+                    initial_spending,
+                )
+                for initial_spending in initial_spendings
+            ]
+            outputs = [future.result() for future in outputs]
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+    assert outputs == pytest.approx(expected, rel=1e-12)
+
+
+def test_parallel_k_section_solver_matches_solve():
+    payload = _get_dual_income_payload()
+    expected = scenario.run(payload)
+    built = scenario.build(payload)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+        built.optimizer.inner_solver = scenario.get_parallel_k_section_solver(
+            payload, built.optimizer, executor
+        )
+        results = built.run()
+
+    assert results["was_solution_found"]
+    assert results["run_message"] == "Success"
+    assert results["required_initial_spending"] == pytest.approx(
+        expected["required_initial_spending"], abs=1e-3
+    )
+
+
+def test_parallel_k_section_solver_runs_at_the_optimizers_values():
+    payload = _get_dual_income_payload()
+    values = {"final_non_rrsp": 0.1, "final_equalize_income_weighting": 0.9}
+    spec = scenario.compile_spec(payload)
+    expected = spec.variant({"settings": values}).run()
+    built = spec.build()
+    for name, value in values.items():
+        built.optimizer.set_initial_guess(name, value)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
+        built.optimizer.inner_solver = scenario.get_parallel_k_section_solver(
+            payload, built.optimizer, executor
+        )
+        results = built.run()
+
+    assert results["was_solution_found"]
+    assert results["required_initial_spending"] == pytest.approx(
+        expected["required_initial_spending"], abs=1e-3
+    )
+    assert results["required_initial_spending"] != pytest.approx(
+        spec.run()["required_initial_spending"], abs=1
+    )
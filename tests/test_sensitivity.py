@@ -0,0 +1,89 @@
+import concurrent.futures
+import math
+from pytest import approx
+import scenario
+import sensitivity
+from tests.test_scenario import _get_dual_income_payload
+from tests.test_scenario import _get_simulation_payload
+
+_INPUTS = [
+    sensitivity.Sensitivity_Input("settings", "interest_rate", 0.1),
+    sensitivity.Sensitivity_Input(
+        "partner1", "age_at_retirement", 1, is_relative=False
+    ),
+    # Skipped, since a relative perturbation of 0 doesn't change it
+    sensitivity.Sensitivity_Input("settings", "qpp_pension_contribution", 0.1),
+]
+
+
+def test_sensitivities_match_cold_solves():
+    payload = _get_dual_income_payload()
+    payload["settings"]["qpp_pension_contribution"] = 0
+
+    results = sensitivity.get_sensitivities(payload, _INPUTS, max_workers=2)
+
+    base = scenario.run(payload)
+    assert results["base"]["required_initial_spending"] == approx(
+        base["required_initial_spending"]
+    )
+    sensitivities = results["sensitivities"]
+    assert {s["input"] for s in sensitivities} == {
+        "settings.interest_rate",
+        "partner1.age_at_retirement",
+    }
+    swings = [s["swing"] for s in sensitivities]
+    assert swings == sorted(swings, reverse=True)
+    for s in sensitivities:
+        section, field = s["input"].split(".")
+        for side in ("low", "high"):
+            spec = scenario.compile_spec(payload).variant(
+                {section: {field: s[side]["value"]}}
+            )
+            cold = spec.run()
+            assert s[side]["was_solution_found"] == cold["was_solution_found"]
+            assert math.isclose(
+                s[side]["required_initial_spending"],
+                cold["required_initial_spending"],
+                rel_tol=1e-3,
+            )
+
+
+def test_sensitivities_of_simulation_payload_use_its_default_inputs():
+    payload = _get_simulation_payload()
+    payload["ruleset_arguments"]["base_spending"] = 45000
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        results = sensitivity.get_sensitivities(payload, executor=executor)
+
+    assert results["base"]["was_solution_found"]
+    assert {s["input"] for s in results["sensitivities"]} == {
+        i.name for i in sensitivity.DEFAULT_SIMULATION_INPUTS
+    }
+    for s in results["sensitivities"]:
+        section, field = s["input"].split(".")
+        cold = (
+            scenario.compile_spec(payload)
+            .variant({section: {field: s["high"]["value"]}})
+            .run()
+        )
+        assert s["high"]["was_solution_found"] == cold["was_solution_found"]
+        assert math.isclose(
+            s["high"]["required_initial_spending"],
+            cold["required_initial_spending"],
+            rel_tol=1e-3,
+        )
+
+
+def test_perturbed_values():
+    relative = sensitivity.Sensitivity_Input("settings", "interest_rate", 0.1)
+    bounded = sensitivity.Sensitivity_Input(
+        "settings",
+        "increase_savings_weight",
+        0.1,
+        is_relative=False,
+        lower_limit=0,
+        upper_limit=1,
+    )
+
+    assert relative.get_perturbed_values(0.05) == approx((0.045, 0.055))
+    assert bounded.get_perturbed_values(0.95) == (0.85, 1)
@@ -0,0 +1,172 @@
+import asyncio
+import json
+import pytest
+import queue
+import scenario
+import service
+from tests.test_scenario import _get_dual_income_payload
+from tests.test_scenario import _get_simulation_payload
+
+
+def _get_optimizing_payload():
+    payload = _get_dual_income_payload()
+    payload["settings"]["should_optimize"] = True
+    return payload
+
+
+async def _request(port: int, method: str, path: str, body=None):
+    """Makes a request to the service, and returns the status and the JSON-decoded lines of the response body."""
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    content = b"" if body is None else json.dumps(body).encode("utf-8")
+    writer.write(
+        f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(content)}\r\n\r\n".encode(
+            "latin-1"
+        )
+        + content
+    )
+    response = await reader.read()
+    writer.close()
+    await writer.wait_closed()
+
+    headers, _, body = response.partition(b"\r\n\r\n")
+    status = int(headers.split(b" ")[1])
+    return status, [json.loads(line) for line in body.splitlines()]
+
+
+def _run_with_service(test, **kwargs):
+    async def run():
+        job_service = service.Job_Service(**kwargs)
+        await job_service.start()
+        server = await service.serve(job_service, "127.0.0.1", 0)
+        try:
+            await test(job_service, server.sockets[0].getsockname()[1])
+        finally:
+            server.close()
+            await job_service.stop()
+
+    asyncio.run(asyncio.wait_for(run(), 120))
+
+
+def test_job_runs_and_returns_results():
+    async def test(job_service, port):
+        status, [job] = await _request(port, "POST", "/jobs", _get_simulation_payload())
+        assert status == 202
+        assert job["status"] in (service.QUEUED, service.RUNNING)
+
+        status, lines = await _request(port, "GET", f"/jobs/{job['id']}/progress")
+        assert status == 200
+        assert lines[-1]["status"] == service.SUCCEEDED
+
+        status, [job] = await _request(port, "GET", f"/jobs/{job['id']}")
+        assert status == 200
+        assert job["result"] == scenario.run(_get_simulation_payload())
+
+    _run_with_service(test, max_concurrent_jobs=1)
+
+
+def test_invalid_requests_are_rejected():
+    async def test(job_service, port):
+        payload = _get_simulation_payload()
+        del payload["ruleset"]
+        status, [response] = await _request(port, "POST", "/jobs", payload)
+        assert status == 400
+        assert "ruleset" in response["error"]
+
+        payload = _get_dual_income_payload()
+        payload["partner1"]["age_at_retirement"] = "sixty"
+        status, [response] = await _request(port, "POST", "/jobs", payload)
+        assert status == 400
+        assert "partner1.age_at_retirement" in response["error"]
+
+        status, _ = await _request(port, "GET", "/jobs/unknown")
+        assert status == 404
+
+    _run_with_service(test, max_concurrent_jobs=1)
+
+
+def test_unsupported_job_requests_are_rejected():
+    async def test(job_service, port):
+        job = job_service.submit(_get_simulation_payload())
+
+        for method in ("PUT", "POST"):
+            status, [response] = await _request(port, method, f"/jobs/{job.id}")
+            assert status == 405
+            assert method in response["error"]
+
+        status, _ = await _request(port, "DELETE", f"/jobs/{job.id}/progress")
+        assert status == 405
+
+        status, _ = await _request(port, "GET", f"/jobs/{job.id}/foo")
+        assert status == 404
+
+    _run_with_service(test, max_concurrent_jobs=1)
+
+
+def test_running_job_streams_progress_and_can_be_cancelled():
+    async def test(job_service, port):
+        job = job_service.submit(_get_optimizing_payload())
+        while len(job.progress) == 0:
+            await job.wait_for_change(job.version)
+
+        iteration = job.progress[0]
+        assert iteration["iteration"] == 1
+        assert iteration["best_spending"] > 0
+
+        status, [response] = await _request(port, "DELETE", f"/jobs/{job.id}")
+        assert status == 200
+        status, lines = await _request(port, "GET", f"/jobs/{job.id}/progress")
+        assert lines[0] == iteration
+        assert lines[-1]["status"] == service.CANCELLED
+        assert lines[-1]["result"] is None
+
+    _run_with_service(test, max_concurrent_jobs=1)
+
+
+class _Cancelled_After_Checks:
+    """Stands in for the service's cancelled job ids, with every job cancelled after a number of checks."""
+
+    def __init__(self, check_count: int):
+        self.check_count = check_count
+
+    def __contains__(self, job_id):
+        self.check_count -= 1
+        return self.check_count < 0
+
+
+def test_running_job_is_cancelled_without_optimizing(monkeypatch):
+    monkeypatch.setattr(service, "_CANCELLATION_CHECK_INTERVAL", 0)
+    progress_queue = queue.Queue()
+
+    # Cancelled during the solve, which reports no progress until it's finished
+    with pytest.raises(service.Job_Cancelled):
+        service._run_job(
+            "job",
+            _get_dual_income_payload(),
+            progress_queue,
+            _Cancelled_After_Checks(3),
+        )
+    assert progress_queue.empty()
+
+    assert service._run_job(
+        "job", _get_dual_income_payload(), progress_queue, {}
+    ) == scenario.run(_get_dual_income_payload())
+
+
+def test_submissions_beyond_queue_are_refused():
+    async def test(job_service, port):
+        running_job = job_service.submit(_get_optimizing_payload())
+        queued_job = job_service.submit(_get_simulation_payload())
+
+        status, [response] = await _request(
+            port, "POST", "/jobs", _get_simulation_payload()
+        )
+        assert status == 503
+        with pytest.raises(service.Service_Busy):
+            job_service.submit(_get_simulation_payload())
+
+        # A queued job is cancelled without running, freeing its place in the queue
+        assert job_service.cancel(queued_job.id).status == service.CANCELLED
+        assert running_job.status != service.CANCELLED
+        job_service.submit(_get_simulation_payload())
+
+    _run_with_service(test, max_concurrent_jobs=1, max_queued_jobs=1)
@@ -1,5 +1,6 @@
 import solve
 import math
+import pytest
 
 class My_Intermediate:
     @property
@@ -41,6 +42,56 @@ def test_binary_solver_negative_slope():
     assert s_t
     assert "Success" == msg
 
+def test_binary_solver_target_out_of_range():
+    evaluations = []
+    def model_fn(intermediate : My_Intermediate):
+        evaluations.append(intermediate.my_float)
+        return 2 * intermediate.my_float - 7
+
+    x_t, i_t, s_t, msg = solve.binary_solver(transform, model_fn, 500, -100, 100, 0.00001)
+
+    assert x_t == 100
+    assert i_t.my_float == 100
+    assert not s_t
+    assert "above the model outputs at both input bounds" in msg
+    assert len(evaluations) == 2
+
+    x_t, _, s_t, msg = solve.get_k_section_solver(3)(transform, model_fn, -500, -100, 100, 0.00001)
+
+    assert x_t == -100
+    assert not s_t
+    assert "below the model outputs at both input bounds" in msg
+
+def test_expanding_solver():
+    evaluations = []
+    def model_fn(intermediate : My_Intermediate):
+        evaluations.append(intermediate.my_float)
+        return -3.6 * intermediate.my_float + 19.2
+
+    solver = solve.get_expanding_solver(solve.binary_solver)
+    for target, expected in [(-700, 199.777777778), (1000, -272.444444444), (12, 2)]:
+        evaluations.clear()
+        x_t, i_t, s_t, msg = solver(transform, model_fn, target, 0, 10, 0.00001)
+
+        assert x_t == i_t.my_float
+        assert math.isclose(expected, x_t, rel_tol=0.0001)
+        assert s_t
+        assert "Success" == msg
+        # Bounds are only evaluated once
+        assert len(evaluations) == len(set(evaluations))
+
+def test_expanding_solver_gives_up():
+    def model_fn(intermediate : My_Intermediate):
+        return math.atan(intermediate.my_float)
+
+    solver = solve.get_expanding_solver(solve.binary_solver, growth_factor=3, max_expansion_count=4)
+    x_t, i_t, s_t, msg = solver(transform, model_fn, 2, 0, 10, 0.00001)
+
+    assert x_t == 810
+    assert x_t == i_t.my_float
+    assert not s_t
+    assert "(0.00 and 810.00)" in msg
+
 def test_optimizing_solver_no_optimized_value():
     def model_fn(intermediate : My_Intermediate):
         x = intermediate.my_float
@@ -94,4 +145,463 @@ def test_optimizing_solver_bounded():
     assert math.isclose(10.4, x_t, rel_tol=0.0001) # t = -10.3, 2x - 7 - (10.3 - 8.5) = 12, 2x = 20.8, x = 10.4
     assert s_t
     assert math.isclose(3.1, opt.get_optimized_value("Rugosity"), rel_tol=0.0001)
-    assert math.isclose(-10.3, opt.get_optimized_value("Tripticity"), rel_tol=0.0001)
\ No newline at end of file
+    assert math.isclose(-10.3, opt.get_optimized_value("Tripticity"), rel_tol=0.0001)
+
+def test_warm_started_solver():
+    evaluations = []
+    def model_fn(intermediate : My_Intermediate):
+        evaluations.append(intermediate.my_float)
+        return 2 * intermediate.my_float - 7
+
+    solve.binary_solver(transform, model_fn, 12, -100, 100, 0.00001)
+    cold_evaluations = len(evaluations)
+    evaluations.clear()
+    solver = solve.get_warm_started_solver(solve.binary_solver, 9.7)
+    x_t, i_t, s_t, msg = solver(transform, model_fn, 12, -100, 100, 0.00001)
+
+    assert x_t == i_t.my_float
+    assert math.isclose(9.5, x_t, rel_tol=0.0001)
+    assert s_t
+    assert "Success" == msg
+    assert len(evaluations) < cold_evaluations
+
+def test_warm_started_solver_falls_back_to_full_range():
+    def model_fn(intermediate : My_Intermediate):
+        return -3.6 * intermediate.my_float + 19.2
+
+    solver = solve.get_warm_started_solver(solve.binary_solver, 40)
+    x_t, i_t, s_t, msg = solver(transform, model_fn, 44.7, -122, 217, 0.00001)
+
+    assert x_t == i_t.my_float
+    assert math.isclose(-7.08333333333, x_t, rel_tol=0.0001)
+    assert s_t
+    assert "Success" == msg
+
+def test_k_section_solver():
+    def model_fn(intermediate : My_Intermediate):
+        x = intermediate.my_float
+        return -3.6 * x + 19.2
+
+    for interior_point_count in [1, 2, 7]:
+        solver = solve.get_k_section_solver(interior_point_count)
+        x_t, i_t, s_t, msg = solver(transform, model_fn, 44.7, -122, 217, 0.00001)
+
+        assert x_t == i_t.my_float
+        assert math.isclose(-7.08333333333, x_t, rel_tol=0.0001)
+        assert s_t
+        assert "Success" == msg
+
+def test_k_section_solver_with_one_interior_point_is_binary_solver():
+    def model_fn(intermediate : My_Intermediate):
+        x = intermediate.my_float
+        return x ** 3 + 2 * x - 7
+
+    for target, tolerance in [(12, 1e-5), (3.3, 1), (1e9, 1e-3)]:
+        binary_x, _, binary_s, binary_msg = solve.binary_solver(transform, model_fn, target, -100, 100, tolerance)
+        x_t, _, s_t, msg = solve.get_k_section_solver(1)(transform, model_fn, target, -100, 100, tolerance)
+
+        assert (x_t, s_t, msg) == (binary_x, binary_s, binary_msg)
+
+def test_k_section_solver_evaluates_interior_points_together():
+    rounds = []
+    def evaluate_inputs(intermediate_fn, model_fn, inputs):
+        rounds.append(len(inputs))
+        return [2 * x - 7 for x in inputs]
+    def model_fn(intermediate : My_Intermediate):
+        return 2 * intermediate.my_float - 7
+
+    evaluations = []
+    def counting_model_fn(intermediate : My_Intermediate):
+        evaluations.append(intermediate.my_float)
+        return model_fn(intermediate)
+    solve.binary_solver(transform, counting_model_fn, 12, -100, 100, 0.00001)
+
+    solver = solve.get_k_section_solver(7, evaluate_inputs)
+    x_t, i_t, s_t, msg = solver(transform, model_fn, 12, -100, 100, 0.00001)
+
+    assert x_t == i_t.my_float
+    assert math.isclose(9.5, x_t, rel_tol=0.0001)
+    assert s_t
+    assert "Success" == msg
+    assert rounds[0] == 2
+    assert all(count == 7 for count in rounds[1:])
+    # Each round narrows the bracket 8 times, ie 3 rounds of bisection
+    assert len(rounds) - 1 <= (len(evaluations) - 2) / 3 + 1
+
+def test_k_section_solver_no_solution():
+    def model_fn(intermediate : My_Intermediate):
+        return 1 if intermediate.my_float > 0 else -1
+
+    x_t, i_t, s_t, msg = solve.get_k_section_solver(3)(transform, model_fn, 0, -100, 100, 0.00001)
+
+    assert x_t == i_t.my_float
+    assert not s_t
+    assert "Exhausted value range and no solution found" == msg
+    with pytest.raises(ValueError):
+        solve.get_k_section_solver(0)
+
+def test_optimizing_solver_k_section_inner_solver():
+    opt = solve.Optimizing_Solver(solve.binary_solver, should_invert = False)
+    opt.inner_solver = solve.get_k_section_solver(3)
+    model_fn = _get_memory_problem(opt)
+
+    x_t, i_t, s_t, _ = opt.solve(transform, model_fn, 12, -100, 100, 1e-5)
+
+    assert x_t == i_t.my_float
+    assert math.isclose(9.5, x_t, rel_tol=0.0001)
+    assert s_t
+    assert math.isclose(3.1, opt.get_optimized_value("Rugosity"), rel_tol=0.0001)
+    assert math.isclose(-8.5, opt.get_optimized_value("Tripticity"), rel_tol=0.0001)
+
+def test_optimizing_solver_current_values():
+    opt = solve.Optimizing_Solver(solve.binary_solver, should_invert = False)
+    model_fn = _get_memory_problem(opt)
+    evaluate_points = []
+    def inner_solver(intermediate_fn, model_fn, target_output, initial_lower_bound, initial_upper_bound, tolerance):
+        evaluate_points.append(dict(opt.get_all_current_values()))
+        return solve.binary_solver(intermediate_fn, model_fn, target_output, initial_lower_bound, initial_upper_bound, tolerance)
+    opt.inner_solver = inner_solver
+
+    opt.solve(transform, model_fn, 12, -100, 100, 1e-5)
+
+    assert len(evaluate_points) > 1
+    assert evaluate_points[0] != evaluate_points[-1]
+    assert dict(opt.get_all_optimized_values()) in evaluate_points
+
+def _get_memory_problem(opt):
+    optimized_scalar1 = opt.subscribe_optimized_scalar("Rugosity", lower_bound=-20, upper_bound=10)
+    optimized_scalar2 = opt.subscribe_optimized_scalar("Tripticity", lower_bound=-90, upper_bound=10)
+
+    def model_fn(intermediate : My_Intermediate):
+        x = intermediate.my_float
+        r = optimized_scalar1()
+        t = optimized_scalar2()
+        return 2 * x - 7 - abs(r - 3.1)  - abs (t + 8.5)
+    return model_fn
+
+def test_optimizing_solver_memory():
+    memory = solve.Solution_Memory()
+    opt = solve.Optimizing_Solver(solve.binary_solver, should_invert = False)
+    opt.memory = memory
+    x_t, _, s_t, _ = opt.solve(transform, _get_memory_problem(opt), 12, -100, 100, 1e-5)
+
+    assert s_t
+    assert not memory.was_warm_started
+    assert memory.evaluations_saved is None
+    assert math.isclose(9.5, memory.solution_input, rel_tol=0.0001)
+    assert math.isclose(3.1, memory.optimized_values["Rugosity"], rel_tol=0.0001)
+    cold_evaluation_count = memory.evaluation_count
+
+    # Solve a slightly changed problem with a new optimizer, as when a simulation is set up again
+    opt = solve.Optimizing_Solver(solve.binary_solver, should_invert = False)
+    opt.memory = memory
+    x_t, i_t, s_t, msg = opt.solve(transform, _get_memory_problem(opt), 12.5, -100, 100, 1e-5)
+
+    assert x_t == i_t.my_float
+    assert math.isclose(9.75, x_t, rel_tol=0.0001)
+    assert s_t
+    assert "Success" == msg
+    assert memory.was_warm_started
+    assert memory.evaluation_count < cold_evaluation_count
+    assert memory.evaluations_saved == cold_evaluation_count - memory.evaluation_count
+    assert math.isclose(-8.5, opt.get_optimized_value("Tripticity"), rel_tol=0.0001)
+    assert math.isclose(9.75, memory.solution_input, rel_tol=0.0001)
+    # The remembered optimized values are optimized again, rather than taken as final
+    assert memory.evaluation_count > 50
+
+    memory.clear()
+    assert memory.solution_input is None
+
+def test_optimizing_solver_memory_reuse_optimized_values():
+    memory = solve.Solution_Memory(should_reuse_optimized_values = True)
+    opt = solve.Optimizing_Solver(solve.binary_solver, should_invert = False)
+    opt.memory = memory
+    opt.solve(transform, _get_memory_problem(opt), 12, -100, 100, 1e-5)
+    cold_evaluation_count = memory.evaluation_count
+
+    opt = solve.Optimizing_Solver(solve.binary_solver, should_invert = False)
+    opt.memory = memory
+    x_t, _, s_t, _ = opt.solve(transform, _get_memory_problem(opt), 12.5, -100, 100, 1e-5)
+
+    assert s_t
+    assert math.isclose(9.75, x_t, rel_tol=0.0001)
+    assert math.isclose(3.1, opt.get_optimized_value("Rugosity"), rel_tol=0.0001)
+    assert memory.evaluations_saved > 0
+    # A single inner solve, within the narrow bracket
+    assert memory.evaluation_count < 50
+
+def test_adaptive_tolerance_stages():
+    schedule = solve.Adaptive_Tolerance(initial_factor = 1000, contraction = 10)
+    stages = schedule.get_stage_tolerances(1e-3, 50000)
+
+    assert len(stages) == 4
+    assert math.isclose(1, stages[0])
+    assert stages[-1] == 1e-3
+
+    schedule = solve.Adaptive_Tolerance(initial_factor = 1000, contraction = 10, relative_tolerance = 1e-6)
+    assert schedule.get_full_tolerance(1e-3, 500) == 1e-3
+    assert math.isclose(10, schedule.get_full_tolerance(1e-3, 1e7))
+
+def test_optimizing_solver_adaptive_tolerance():
+    evaluation_counts = []
+    for schedule in [None, solve.Adaptive_Tolerance()]:
+        evaluations = 0
+        opt = solve.Optimizing_Solver(solve.binary_solver, should_invert = False)
+        opt.tolerance_schedule = schedule
+        problem_fn = _get_memory_problem(opt)
+        def model_fn(intermediate : My_Intermediate):
+            nonlocal evaluations
+            evaluations += 1
+            return problem_fn(intermediate)
+
+        x_t, i_t, s_t, msg = opt.solve(transform, model_fn, 12, -100, 100, 1e-5)
+
+        assert x_t == i_t.my_float
+        assert math.isclose(9.5, x_t, rel_tol=0.0001)
+        assert s_t
+        assert "Success" == msg
+        assert math.isclose(3.1, opt.get_optimized_value("Rugosity"), rel_tol=0.0001)
+        assert opt.achieved_precision <= 1e-5
+        evaluation_counts.append(evaluations)
+
+    assert evaluation_counts[1] < evaluation_counts[0]
+
+def test_optimizing_solver_relative_tolerance():
+    opt = solve.Optimizing_Solver(solve.binary_solver, should_invert = False)
+    opt.tolerance_schedule = solve.Adaptive_Tolerance(relative_tolerance = 1e-3)
+
+    x_t, _, s_t, _ = opt.solve(transform, lambda intermediate: 2 * intermediate.my_float - 7, 1e6, 0, 1e7, 1e-5)
+
+    assert s_t
+    assert 1e-5 < opt.achieved_precision <= 1e3
+    assert math.isclose(500003.5, x_t, rel_tol=1e-3)
+
+    opt.solve(transform, lambda intermediate: 5.0, 12, -100, 100, 1e-5)
+    assert opt.achieved_precision is None
+
+def test_coarse_search_points():
+    coarse_search = solve.Coarse_Search(sample_count = 16)
+    points = coarse_search.get_points([0.5, 3, -1], [(0, 1), (None, None), (-2, 2)])
+
+    assert len(points) == 17
+    assert list(points[0]) == [0.5, 3, -1]
+    # Unbounded scalars aren't sampled
+    assert all(point[1] == 3 for point in points)
+    assert all(0 <= point[0] <= 1 and -2 <= point[2] <= 2 for point in points)
+    assert coarse_search.get_initial_simplex(points, [abs(point[0] - 0.2) for point in points]) is None
+
+def test_optimizing_solver_coarse_search():
+    evaluation_counts = []
+    for coarse_search in [None, solve.Coarse_Search(sample_count = 16)]:
+        evaluations = 0
+        opt = solve.Optimizing_Solver(solve.binary_solver, should_invert = False)
+        opt.coarse_search = coarse_search
+        problem_fn = _get_memory_problem(opt)
+        def model_fn(intermediate : My_Intermediate):
+            nonlocal evaluations
+            evaluations += 1
+            return problem_fn(intermediate)
+
+        x_t, i_t, s_t, msg = opt.solve(transform, model_fn, 12, -100, 100, 1e-5)
+
+        assert x_t == i_t.my_float
+        assert math.isclose(9.5, x_t, rel_tol=0.0001)
+        assert s_t
+        assert "Success" == msg
+        assert math.isclose(3.1, opt.get_optimized_value("Rugosity"), rel_tol=0.0001)
+        assert math.isclose(-8.5, opt.get_optimized_value("Tripticity"), rel_tol=0.0001)
+        evaluation_counts.append(evaluations)
+
+    assert evaluation_counts[1] < evaluation_counts[0]
+
+def test_optimizing_solver_surrogate_search():
+    evaluation_counts = []
+    inner_solve_counts = []
+    for surrogate_search in [None, solve.Surrogate_Search()]:
+        evaluations = 0
+        inner_solves = 0
+        def inner_solver(*args):
+            nonlocal inner_solves
+            inner_solves += 1
+            return solve.binary_solver(*args)
+        opt = solve.Optimizing_Solver(inner_solver, should_invert = False)
+        opt.surrogate_search = surrogate_search
+        problem_fn = _get_memory_problem(opt)
+        def model_fn(intermediate : My_Intermediate):
+            nonlocal evaluations
+            evaluations += 1
+            return problem_fn(intermediate)
+
+        x_t, i_t, s_t, msg = opt.solve(transform, model_fn, 12, -100, 100, 1e-5)
+
+        assert x_t == i_t.my_float
+        assert math.isclose(9.5, x_t, rel_tol=0.001)
+        assert s_t
+        assert "Success" == msg
+        assert math.isclose(3.1, opt.get_optimized_value("Rugosity"), abs_tol=0.01)
+        assert math.isclose(-8.5, opt.get_optimized_value("Tripticity"), abs_tol=0.01)
+        evaluation_counts.append(evaluations)
+        inner_solve_counts.append(inner_solves)
+
+    assert evaluation_counts[1] < evaluation_counts[0]
+    assert surrogate_search.evaluation_count <= surrogate_search.max_evaluations
+    assert surrogate_search.mean_prediction_error > 0
+    # The best point is solved again at the end
+    assert inner_solve_counts[1] == surrogate_search.evaluation_count + 1
+    avoided_fraction = surrogate_search.get_avoided_fraction(inner_solve_counts[0])
+    assert math.isclose(avoided_fraction, 1 - surrogate_search.evaluation_count / inner_solve_counts[0])
+    assert 0 < avoided_fraction < 1
+
+def _get_multimodal_problem(opt, initial_guess):
+    optimized_scalar = opt.subscribe_optimized_scalar("Rugosity", lower_bound=-20, upper_bound=10, initial_guess=initial_guess)
+
+    def model_fn(intermediate : My_Intermediate):
+        x = intermediate.my_float
+        r = optimized_scalar()
+        # A global optimum at r = 3.1, and a local optimum at r = -12
+        return 2 * x - 7 - min(abs(r - 3.1), abs(r + 12) + 1)
+    return model_fn
+
+def test_optimizing_solver_multi_start():
+    opt = solve.Optimizing_Solver(solve.binary_solver, should_invert = False)
+    model_fn = _get_multimodal_problem(opt, -11)
+
+    x_t, _, s_t, _ = opt.solve(transform, model_fn, 12, -100, 100, 1e-5)
+
+    assert s_t
+    assert math.isclose(10, x_t, rel_tol=0.0001)
+    assert math.isclose(-12, opt.get_optimized_value("Rugosity"), rel_tol=0.0001)
+
+    opt = solve.Optimizing_Solver(solve.binary_solver, should_invert = False)
+    opt.multi_start = solve.Multi_Start(start_count = 4, grace_iterations = 100)
+    model_fn = _get_multimodal_problem(opt, -11)
+    progress = []
+    opt.progress_callback = lambda iteration, best_output: progress.append(best_output)
+
+    x_t, i_t, s_t, msg = opt.solve(transform, model_fn, 12, -100, 100, 1e-5)
+
+    assert x_t == i_t.my_float
+    assert math.isclose(9.5, x_t, rel_tol=0.0001)
+    assert s_t
+    assert "Success" == msg
+    assert math.isclose(3.1, opt.get_optimized_value("Rugosity"), rel_tol=0.0001)
+    assert progress[-1] == opt.local_optima[0]["output"]
+
+    local_optima = opt.local_optima
+    assert len(local_optima) == 4
+    assert [optimum["output"] for optimum in local_optima] == sorted(optimum["output"] for optimum in local_optima)
+    assert all(optimum["was_converged"] and not optimum["was_pruned"] for optimum in local_optima)
+    assert any(math.isclose(-12, optimum["optimized_values"]["Rugosity"], rel_tol=0.0001) for optimum in local_optima)
+
+def test_optimizing_solver_multi_start_pruning():
+    opt = solve.Optimizing_Solver(solve.binary_solver, should_invert = False)
+    # The first start, from the global optimum, leaves the others behind
+    opt.multi_start = solve.Multi_Start(start_count = 4, grace_iterations = 3)
+    model_fn = _get_multimodal_problem(opt, 3.1)
+
+    x_t, _, s_t, _ = opt.solve(transform, model_fn, 12, -100, 100, 1e-5)
+
+    assert s_t
+    assert math.isclose(9.5, x_t, rel_tol=0.0001)
+    pruned = [optimum for optimum in opt.local_optima if optimum["was_pruned"]]
+    assert len(pruned) > 0
+    assert all(optimum["iteration_count"] == 3 and not optimum["was_converged"] for optimum in pruned)
+
+def test_optimizing_solver_bound_transform():
+    penalized_evaluation_counts = []
+    for bound_transform in [None, "sine", "logistic"]:
+        opt = solve.Optimizing_Solver(solve.binary_solver, should_invert = False)
+        opt.bound_transform = bound_transform
+
+        optimized_scalar1 = opt.subscribe_optimized_scalar("Rugosity", lower_bound=-20, upper_bound=10)
+        optimized_scalar2 = opt.subscribe_optimized_scalar("Tripticity", lower_bound=-90, upper_bound=-10.3)
+        values = []
+
+        def model_fn(intermediate : My_Intermediate):
+            x = intermediate.my_float
+            r = optimized_scalar1()
+            t = optimized_scalar2()
+            values.append((r, t))
+            return 2 * x - 7 - abs(r - 3.1)  - abs (t + 8.5)
+
+        x_t, i_t, s_t, _ = opt.solve(transform, model_fn, 12, -100, 100, 1e-5)
+
+        assert x_t == i_t.my_float
+        assert math.isclose(10.4, x_t, rel_tol=0.001)
+        assert s_t
+        assert math.isclose(3.1, opt.get_optimized_value("Rugosity"), abs_tol=0.01)
+        assert math.isclose(-10.3, opt.get_optimized_value("Tripticity"), abs_tol=0.01)
+        if bound_transform is not None:
+            assert all(-20 <= r <= 10 and -90 <= t <= -10.3 for r, t in values)
+        penalized_evaluation_counts.append(opt.penalized_evaluation_count)
+
+    assert penalized_evaluation_counts[0] > 0
+    assert penalized_evaluation_counts[1:] == [0, 0]
+
+def test_optimizing_solver_rejects_unknown_bound_transform():
+    opt = solve.Optimizing_Solver(solve.binary_solver, should_invert = False)
+    with pytest.raises(ValueError):
+        opt.bound_transform = "cosine"
+
+def test_optimizing_solver_fail_fast():
+    results = []
+    for is_fail_fast in [False, True]:
+        opt = solve.Optimizing_Solver(solve.binary_solver, should_invert = False)
+        opt.is_fail_fast = is_fail_fast
+
+        optimized_scalar = opt.subscribe_optimized_scalar("Rugosity", lower_bound=-20, upper_bound=10)
+        model_calls = []
+
+        def model_fn(intermediate : My_Intermediate):
+            x = intermediate.my_float
+            r = optimized_scalar()
+            if r > 5:
+                opt.set_failed("Rugosity is too high")
+            model_calls.append(r)
+            return 2 * x - 7 - abs(r - 3.1)
+
+        x_t, i_t, s_t, _ = opt.solve(transform, model_fn, 12, -100, 100, 1e-5)
+
+        assert x_t == i_t.my_float
+        assert s_t
+        assert math.isclose(3.1, opt.get_optimized_value("Rugosity"), abs_tol=0.01)
+        results.append((x_t, len(model_calls), opt.aborted_solve_count))
+
+    (x_default, calls_default, aborted_default), (x_fail_fast, calls_fail_fast, aborted_fail_fast) = results
+    assert math.isclose(x_default, x_fail_fast, rel_tol=0.001)
+    assert aborted_default == 0
+    assert aborted_fail_fast > 0
+    assert calls_fail_fast < calls_default
+
+def test_optimizing_solver_fail_fast_completes_unoptimized_solve():
+    opt = solve.Optimizing_Solver(solve.binary_solver, should_invert = False)
+    opt.is_fail_fast = True
+    opt.is_optimization_disabled = True
+
+    optimized_scalar = opt.subscribe_optimized_scalar("Rugosity", lower_bound=-20, upper_bound=10, initial_guess=7)
+
+    def model_fn(intermediate : My_Intermediate):
+        opt.set_failed("Rugosity is too high")
+        return 2 * intermediate.my_float - 7 - abs(optimized_scalar() - 3.1)
+
+    x_t, i_t, _, _ = opt.solve(transform, model_fn, 12, -100, 100, 1e-5)
+
+    assert x_t == i_t.my_float
+    assert math.isclose(11.45, x_t, rel_tol=0.001)
+    assert opt.aborted_solve_count == 0
+
+def test_optimizing_solver_bound_transform_from_lower_bound():
+    for bound_transform in ["sine", "logistic"]:
+        opt = solve.Optimizing_Solver(solve.binary_solver, should_invert = False)
+        opt.bound_transform = bound_transform
+        # The guess sits on a negative lower bound, so a 5% step from it goes below the bound
+        optimized_scalar = opt.subscribe_optimized_scalar("Rugosity", lower_bound=-1, upper_bound=10, initial_guess=-1)
+
+        def model_fn(intermediate : My_Intermediate):
+            return 2 * intermediate.my_float - 7 - abs(optimized_scalar() - 3.1)
+
+        x_t, _, s_t, _ = opt.solve(transform, model_fn, 12, -100, 100, 1e-5)
+
+        assert s_t
+        assert math.isclose(9.5, x_t, rel_tol=0.001)
+        assert math.isclose(3.1, opt.get_optimized_value("Rugosity"), abs_tol=0.01)
@@ -1,6 +1,7 @@
 import tax
 import math
 import datetime
+import pytest
 
 def test_get_income_tax():
     correct_answers = [ #Calculated at https://www.calculconversion.com/income-tax-calculator-quebec.html and https://www.taxtips.ca/calculators/enhanced-basic/basic-tax-calculator.htm
@@ -22,3 +23,73 @@ def test_get_income_tax():
         expected = pair[1]
         actual = tax.get_income_tax(pair[0])
         assert math.isclose(expected, actual, abs_tol=2)
+
+def test_get_income_tax_remembers_recent_incomes():
+    tax._get_remembered_income_tax.cache_clear()
+
+    first = tax.get_income_tax(61234.5)
+    second = tax.get_income_tax(61234.5)
+
+    assert first == second == tax._get_remembered_income_tax.__wrapped__(61234.5)
+    assert tax._get_remembered_income_tax.cache_info().hits == 1
+
+def test_get_income_tax_checks_brackets_are_current_for_remembered_incomes(monkeypatch):
+    tax.get_income_tax(61234.5)
+
+    class Stale_Datetime(datetime.datetime):
+        @classmethod
+        def now(cls, tz = None):
+            return datetime.datetime(2027, 1, 1)
+    monkeypatch.setattr(tax.datetime, "datetime", Stale_Datetime)
+
+    with pytest.raises(AssertionError):
+        tax.get_income_tax(61234.5)
+
+def test_get_gross_income_round_trip():
+    incomes = [-500, 0, 10000, 15000, 16452.1, 20000, 56000, 100000, 120000, 140000, 200000, 250000, 300000, 1000000]
+
+    for income in incomes:
+        net_income = income - tax.get_income_tax(income)
+        assert math.isclose(income, tax.get_gross_income(net_income), abs_tol=1e-6)
+
+def test_get_gross_incomes_matches_scalar():
+    net_incomes = [-500, 0, 12000, 18659.77, 30000, 45000, 80000, 100000, 200000]
+
+    gross_incomes = tax.get_gross_incomes(net_incomes)
+
+    assert gross_incomes.shape == (len(net_incomes),)
+    for net_income, gross_income in zip(net_incomes, gross_incomes):
+        assert math.isclose(tax.get_gross_income(net_income), gross_income, abs_tol=1e-6)
+
+def test_get_income_taxes_matches_scalar():
+    incomes = [-500, 0, 12000, 16452.1, 30000, 58523.01, 100000, 200000, 258482, 300000]
+
+    income_taxes = tax.get_income_taxes(incomes)
+
+    assert income_taxes.shape == (len(incomes),)
+    for income, income_tax in zip(incomes, income_taxes):
+        assert math.isclose(tax.get_income_tax(income), income_tax, abs_tol=1e-6)
+
+def test_tax_rates():
+    for income in [10000, 17000, 30000, 56000, 100000, 125000, 150000, 200000, 300000]:
+        marginal_rate = tax.get_marginal_tax_rate(income)
+        assert math.isclose(tax.get_income_tax(income + 1) - tax.get_income_tax(income), marginal_rate, abs_tol=1e-6)
+        assert math.isclose(tax.get_income_tax(income) / income, tax.get_average_tax_rate(income), rel_tol=1e-9)
+
+        distance = tax.get_distance_to_next_bracket(income)
+        if distance == math.inf:
+            assert income > 258482
+        else:
+            assert distance > 0
+            assert tax.get_marginal_tax_rate(income + distance - 0.5) == marginal_rate
+            assert tax.get_marginal_tax_rate(income + distance + 0.5) != marginal_rate
+
+def test_get_tax_rates_matches_scalar():
+    incomes = [-500, 0, 12000, 18952, 30000, 58523, 100000, 200000, 300000]
+
+    marginal_rates, average_rates, distances = tax.get_tax_rates(incomes)
+
+    for i, income in enumerate(incomes):
+        assert math.isclose(tax.get_marginal_tax_rate(income), marginal_rates[i], abs_tol=1e-12)
+        assert math.isclose(tax.get_average_tax_rate(income), average_rates[i], abs_tol=1e-12)
+        assert tax.get_distance_to_next_bracket(income) == distances[i]